@@ -0,0 +1,27 @@
+"""activity log keyset indexes
+
+Revision ID: b3c1d7e24a90
+Revises: 9f89047e077a
+Create Date: 2026-10-16 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c1d7e24a90'
+down_revision: Union[str, None] = '9f89047e077a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_activity_log_created_at_log_id', 'activity_log', ['created_at', 'log_id'], unique=False)
+    op.create_index('ix_activity_log_user_id_created_at_log_id', 'activity_log', ['user_id', 'created_at', 'log_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_activity_log_user_id_created_at_log_id', table_name='activity_log')
+    op.drop_index('ix_activity_log_created_at_log_id', table_name='activity_log')
@@ -0,0 +1,97 @@
+"""
+Benchmark: validated requests per second with and without the revocation filter
+
+Needs Redis (uses the REDIS_* settings) and JWT_SECRET_KEY. Validates TOKENS distinct tokens
+issued before revocation epochs (no uep / sep claims) as a request would: decode the JWT, then
+check_revocations, which reads their token, JTI, session, user and user refresh blacklist keys
+and the two epoch keys. Epochs are served from L1; blacklist lookups are kept out of L1, so
+each one the filter does not rule out costs a Redis round trip. REVOKED other tokens are
+blacklisted first (blacklist:* keys with a short TTL, deleted at the end) and must still be
+reported revoked.
+Run from the api directory:
+    python -m benchmarks.blacklist_filter
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from jose import jwt
+
+from src.authenticate.authenticate import SECRET_KEY, ALGORITHM
+from src.authenticate.revocation_filter import revocation_filter
+from src.authenticate.session_manager import check_revocations, hash_token
+from src.cache.cache import cache
+
+# Two epoch keys per token must fit in L1 (CACHE_L1_MAX_ENTRIES)
+TOKENS = 4000
+REVOKED = 1000
+REVOKED_TTL = 600
+
+
+def make_token():
+    """An access token as issued before revocation epochs"""
+    now = datetime.utcnow()
+    payload = {
+        "sub": str(uuid.uuid4()),
+        "session_id": str(uuid.uuid4()),
+        "exp": now + timedelta(minutes=60),
+        "iat": now,
+        "jti": str(uuid.uuid4()),
+        "type": "access",
+        "aud": "authenticated",
+    }
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+async def validate(token):
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], audience="authenticated")
+    return await check_revocations(token, payload) is None
+
+
+async def run(tokens, use_filter):
+    revocation_filter.enabled = use_filter
+    start = time.perf_counter()
+    valid = 0
+    for token in tokens:
+        valid += await validate(token)
+    elapsed = time.perf_counter() - start
+    assert valid == len(tokens), "a token that was never blacklisted was reported revoked"
+    return len(tokens) / elapsed
+
+
+async def main():
+    await cache.init()
+    if not cache.use_redis:
+        raise SystemExit("Redis is not available (check REDIS_HOST / REDIS_PORT)")
+    cache.set_policy("blacklist:", l1_ttl=0, negative_ttl=0)
+
+    revoked = [make_token() for _ in range(REVOKED)]
+    keys = [f"blacklist:access:{hash_token(token)}" for token in revoked]
+    await cache.set_many({key: "revoked" for key in keys}, ttl=REVOKED_TTL)
+    try:
+        # Epochs are read from L1 once the invalidation listener is subscribed
+        while not cache.listening:
+            await asyncio.sleep(0.05)
+        await revocation_filter.build()
+
+        tokens = [make_token() for _ in range(TOKENS)]
+        # Load the (absent) epochs of every token into L1, as for users seen before
+        for token in tokens:
+            await validate(token)
+        without_filter = await run(tokens, use_filter=False)
+        with_filter = await run(tokens, use_filter=True)
+        still_revoked = sum([not await validate(token) for token in revoked])
+        assert still_revoked == REVOKED, "a blacklisted token was reported valid"
+
+        print(f"{TOKENS} validations of tokens without epochs, {REVOKED} tokens blacklisted")
+        print(f"without filter: {without_filter:10.0f} requests/s")
+        print(f"with filter:    {with_filter:10.0f} requests/s ({with_filter / without_filter:.1f}x)")
+        print(f"filter: {revocation_filter.stats()}")
+    finally:
+        await cache.delete_many(keys)
+        await cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: QueryBuilder SQL build time with and without the compiled SQL cache
+
+Run from the api directory (no database needed):
+    python -m benchmarks.query_builder_sql
+"""
+import timeit
+
+from src.db.postgres import postgres
+from src.db.postgres.postgres import QueryBuilder
+
+ITERATIONS = 20000
+
+COMPILERS = ("_compile_select", "_compile_insert", "_compile_update", "_compile_delete")
+
+
+def build_select():
+    return (
+        QueryBuilder(None, "activity_log")
+        .select("log_id", "user_id", "level", "message", "created_at")
+        .eq("user_id", "8c1d2e4f-0000-4000-8000-000000000001")
+        .in_("level", ["info", "warning", "error"])
+        .gte("created_at", "2024-01-01")
+        .order("created_at", ascending=False)
+        .limit(100)
+        .offset(0)
+        ._build_query()
+    )
+
+
+def build_join_search():
+    return (
+        QueryBuilder(None, "activity_log al")
+        .select("al.log_id", "al.action", "al.created_at", "u.email", "u.user_name")
+        .left_join('public."user" u', "al.user_id = u.user_id")
+        .eq("al.level", "error")
+        .between("al.created_at", "2024-01-01", "2024-02-01")
+        .search("timeout", "al.message", "al.action", "al.module")
+        .order("al.created_at", ascending=False)
+        .range(0, 49)
+        ._build_query()
+    )
+
+
+def build_update():
+    return (
+        QueryBuilder(None, "user")
+        .update({"last_sign_in_at": "2024-01-01", "status": "active"})
+        .eq("user_id", "8c1d2e4f-0000-4000-8000-000000000001")
+        .returning("*")
+        ._build_query()
+    )
+
+
+def measure(func) -> float:
+    """Microseconds per build (best of 5 runs)"""
+    best = min(timeit.repeat(func, number=ITERATIONS, repeat=5))
+    return best / ITERATIONS * 1_000_000
+
+
+def main():
+    cached = {name: getattr(postgres, name) for name in COMPILERS}
+
+    # Uncached: call the undecorated compilers so every build compiles SQL from scratch
+    for name, compiler in cached.items():
+        setattr(postgres, name, compiler.__wrapped__)
+    try:
+        uncached_results = {func.__name__: measure(func) for func in (build_select, build_join_search, build_update)}
+    finally:
+        for name, compiler in cached.items():
+            setattr(postgres, name, compiler)
+
+    cached_results = {func.__name__: measure(func) for func in (build_select, build_join_search, build_update)}
+
+    print(f"{'query':<20}{'uncached (us)':>15}{'cached (us)':>15}{'speedup':>10}")
+    for name, before in uncached_results.items():
+        after = cached_results[name]
+        print(f"{name:<20}{before:>15.2f}{after:>15.2f}{before / after:>9.2f}x")
+    print()
+    print("cache:", postgres.sql_cache_info())
+
+
+if __name__ == "__main__":
+    main()
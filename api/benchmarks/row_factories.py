@@ -0,0 +1,78 @@
+"""
+Micro-benchmark: converting fetched rows with each QueryBuilder row factory
+
+Compares the previous DictCursor path (DictRow per row, then dict(row)) with the
+row_factory() formats, on synthetic activity_log-shaped rows.
+
+Run from the api directory (no database needed):
+    python -m benchmarks.row_factories
+"""
+import datetime
+import gc
+import time
+import tracemalloc
+import uuid
+
+from psycopg2.extras import DictRow
+
+from src.db.postgres.postgres import ROW_FACTORIES, _shape_rows
+
+ROW_COUNT = 100000
+
+COLUMNS = ("log_id", "user_id", "level", "message", "action", "module", "status_code", "duration_ms", "created_at")
+
+
+class _Description:
+    """Minimal cursor stand-in for DictRow (index map + description)"""
+
+    def __init__(self, columns):
+        self.index = {column: position for position, column in enumerate(columns)}
+        self.description = [(column,) for column in columns]
+
+
+def make_rows():
+    now = datetime.datetime.now(datetime.timezone.utc)
+    user_id = str(uuid.uuid4())
+    return [
+        (str(uuid.uuid4()), user_id, "info", f"message {i}", "login", "auth", 200, i % 500, now)
+        for i in range(ROW_COUNT)
+    ]
+
+
+def dict_cursor_rows(rows):
+    cursor = _Description(COLUMNS)
+    dict_rows = []
+    for values in rows:
+        row = DictRow(cursor)
+        row[:] = values
+        dict_rows.append(row)
+    return [dict(row) for row in dict_rows]
+
+
+def measure(func):
+    """(milliseconds, MB retained by the converted rows)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    retained = tracemalloc.get_traced_memory()[0] / 2 ** 20
+    tracemalloc.stop()
+    del result
+    return elapsed, retained
+
+
+def main():
+    rows = make_rows()
+    results = {"DictCursor": measure(lambda: dict_cursor_rows(rows))}
+    for factory in ROW_FACTORIES:
+        results[factory] = measure(lambda: _shape_rows(rows, COLUMNS, factory))
+
+    print(f"{ROW_COUNT} rows x {len(COLUMNS)} columns")
+    print(f"{'format':<12}{'time (ms)':>12}{'retained (MB)':>16}")
+    for name, (elapsed, retained) in results.items():
+        print(f"{name:<12}{elapsed:>12.1f}{retained:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
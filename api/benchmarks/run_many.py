@@ -0,0 +1,70 @@
+"""
+Benchmark: sequential statements vs db.run_many / run_many_async
+
+Needs a database (uses the DATABASE_* settings); runs dashboard-style COUNT queries against
+the existing activity_log table, then statements that only wait (pg_sleep) to stand in for
+network round trips to a remote server. The COUNT speedup depends on the server's free CPU
+cores; waiting time overlaps regardless.
+Run from the api directory:
+    python -m benchmarks.run_many
+"""
+import asyncio
+import time
+
+from src.db.postgres.postgres import connection as db
+
+ROUNDS = 5
+ROUND_TRIP_MS = 20
+
+QUERIES = {
+    "total": "SELECT COUNT(*) FROM activity_log",
+    "errors": ("SELECT COUNT(*) FROM activity_log WHERE level = %s", ("error",)),
+    "warnings": ("SELECT COUNT(*) FROM activity_log WHERE level = %s", ("warning",)),
+    "with_user": "SELECT COUNT(*) FROM activity_log WHERE user_id IS NOT NULL",
+    "slow": "SELECT COUNT(*) FROM activity_log WHERE duration_ms > 1000",
+    "by_level": "SELECT level, COUNT(*) FROM activity_log GROUP BY level",
+    "by_module": "SELECT module, COUNT(*) FROM activity_log GROUP BY module",
+    "by_method": "SELECT method, COUNT(*) FROM activity_log GROUP BY method",
+}
+
+ROUND_TRIPS = {f"wait_{i}": ("SELECT pg_sleep(%s)", (ROUND_TRIP_MS / 1000,)) for i in range(len(QUERIES))}
+
+
+def sequential(queries):
+    with db as cursor:
+        for query in queries.values():
+            sql, params = (query, None) if isinstance(query, str) else query
+            cursor.execute(sql, params)
+            cursor.fetchall()
+
+
+def batched(queries):
+    db.run_many(queries)
+
+
+def batched_async(queries):
+    asyncio.run(db.run_many_async(queries))
+
+
+def timed(func, queries) -> float:
+    """Best of ROUNDS, in milliseconds"""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(queries)
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def main():
+    sequential(QUERIES)  # warm up the pool and the table cache
+    print(f"{'workload':>12}{'sequential (ms)':>17}{'run_many (ms)':>15}{'async (ms)':>12}{'speedup':>10}")
+    for label, queries in (("counts", QUERIES), (f"{ROUND_TRIP_MS} ms RTT", ROUND_TRIPS)):
+        sequential_ms = timed(sequential, queries)
+        batched_ms = timed(batched, queries)
+        async_ms = timed(batched_async, queries)
+        print(f"{label:>12}{sequential_ms:>17.1f}{batched_ms:>15.1f}{async_ms:>12.1f}{sequential_ms / batched_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
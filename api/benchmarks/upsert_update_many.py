@@ -0,0 +1,97 @@
+"""
+Benchmark: per-row INSERT/UPDATE loops vs QueryBuilder.upsert / update_many
+
+Needs a database (uses the DATABASE_* settings); creates and drops a scratch table.
+Run from the api directory:
+    python -m benchmarks.upsert_update_many
+"""
+import time
+import uuid
+
+from src.db.postgres.postgres import connection as db
+
+TABLE = "_bench_upsert"
+ROW_COUNTS = (100, 1000, 10000)
+
+
+def reset_table():
+    with db as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.execute(f"""
+            CREATE TABLE {TABLE} (
+                id uuid PRIMARY KEY,
+                code text NOT NULL UNIQUE,
+                counter integer NOT NULL,
+                updated_at timestamptz
+            )
+        """)
+
+
+def make_rows(count: int, counter: int):
+    return [{"id": str(uuid.uuid4()), "code": f"code-{i}", "counter": counter} for i in range(count)]
+
+
+def upsert_loop(rows):
+    with db as cursor:
+        for row in rows:
+            cursor.execute(
+                f"""
+                    INSERT INTO {TABLE} (id, code, counter) VALUES (%s, %s, %s)
+                    ON CONFLICT (code) DO UPDATE SET counter = EXCLUDED.counter
+                """,
+                (row["id"], row["code"], row["counter"])
+            )
+
+
+def upsert_builder(rows):
+    db.table(TABLE).upsert(rows, "code", ["counter"]).execute()
+
+
+def update_loop(rows):
+    with db as cursor:
+        for row in rows:
+            cursor.execute(
+                f"UPDATE {TABLE} SET counter = %s, updated_at = NOW() WHERE code = %s",
+                (row["counter"], row["code"])
+            )
+
+
+def update_builder(rows):
+    db.table(TABLE).update_many(
+        [{"code": row["code"], "counter": row["counter"], "updated_at": "now"} for row in rows],
+        "code"
+    ).execute()
+
+
+def timed(func, rows) -> float:
+    """Milliseconds for one call"""
+    start = time.perf_counter()
+    func(rows)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(f"{'rows':>8}{'operation':>12}{'loop (ms)':>12}{'builder (ms)':>14}{'speedup':>10}")
+    try:
+        for count in ROW_COUNTS:
+            # Upsert: half the rows exist, half are new
+            reset_table()
+            upsert_builder(make_rows(count // 2, 0))
+            loop_ms = timed(upsert_loop, make_rows(count, 1))
+            reset_table()
+            upsert_builder(make_rows(count // 2, 0))
+            builder_ms = timed(upsert_builder, make_rows(count, 1))
+            print(f"{count:>8}{'upsert':>12}{loop_ms:>12.1f}{builder_ms:>14.1f}{loop_ms / builder_ms:>9.1f}x")
+
+            # Update: every row exists
+            rows = make_rows(count, 2)
+            loop_ms = timed(update_loop, rows)
+            builder_ms = timed(update_builder, make_rows(count, 3))
+            print(f"{count:>8}{'update':>12}{loop_ms:>12.1f}{builder_ms:>14.1f}{loop_ms / builder_ms:>9.1f}x")
+    finally:
+        with db as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Check: hot id lookups compare typed uuid columns and can use their indexes
+
+EXPLAINs each query with sequential scans disabled, so a Seq Scan in the plan means no index
+could serve it (the planner would otherwise pick a Seq Scan on small tables anyway). The same
+query with the old `column::text = %s` comparison is shown next to it. Exits with status 1 if
+any typed query cannot use an index.
+
+Needs a database (uses the DATABASE_* settings); nothing is modified.
+Run from the api directory:
+    python -m benchmarks.uuid_index_usage
+"""
+import re
+import sys
+import uuid
+
+from src.authenticate.checkpoint import USER_BY_ID_STATEMENT
+from src.db.postgres.binding import uuid_param, uuid_params
+from src.db.postgres.postgres import connection as db
+from src.db.postgres.prepared import prepared_statements
+from src.permissions.permissions import USER_GROUPS_STATEMENT, USER_HAS_PERMISSION_STATEMENT
+
+ID = uuid.uuid4()
+
+QUERIES = {
+    "user by id": (prepared_statements.get(USER_BY_ID_STATEMENT).sql, (uuid_param(ID),)),
+    "user groups": (prepared_statements.get(USER_GROUPS_STATEMENT).sql, (uuid_param(ID),)),
+    "user has permission": (prepared_statements.get(USER_HAS_PERMISSION_STATEMENT).sql, (uuid_param(ID), "view_dashboard")),
+    "group permissions": (
+        """
+            SELECT gp.group_id, p.permission_id, p.codename
+            FROM permission p
+            INNER JOIN group_permission gp ON p.permission_id = gp.permission_id
+            WHERE gp.group_id = ANY(%s)
+        """,
+        (uuid_params([ID, uuid.uuid4()]),)
+    ),
+    "group by id": ('SELECT group_id, name FROM "group" WHERE group_id = %s', (uuid_param(ID),)),
+    "permission by id": ("SELECT permission_id, name FROM permission WHERE permission_id = %s", (uuid_param(ID),)),
+    "activity log by id": (
+        """
+            SELECT al.log_id, u.email
+            FROM activity_log al
+            LEFT JOIN public."user" u ON al.user_id = u.user_id
+            WHERE al.log_id = %s
+        """,
+        (uuid_param(ID),)
+    ),
+    "activity logs of user": (
+        "SELECT log_id FROM activity_log al WHERE al.user_id = %s ORDER BY al.created_at DESC LIMIT 100",
+        (uuid_param(ID),)
+    ),
+    "update last sign in": ('UPDATE public."user" SET last_sign_in_at = NOW() WHERE user_id = %s', (uuid_param(ID),)),
+}
+
+# Typed comparison -> the previous text comparison
+_TYPED_ID = re.compile(r"\b((?:\w+\.)?\w+_id) (=|!=) (%s|ANY\(%s\))")
+
+
+def as_text_comparison(sql: str, params):
+    sql = _TYPED_ID.sub(r"\1::text \2 \3", sql)
+    params = tuple(
+        [str(item) for item in param] if isinstance(param, list) else str(param) if isinstance(param, uuid.UUID) else param
+        for param in params
+    )
+    return sql, params
+
+
+def scans(cursor, sql: str, params) -> list:
+    """
+    (description, searched) per table scan of the plan
+
+    searched is False for Seq Scans and for index scans that read the whole index (no index
+    condition), which is what the planner falls back to when the column is cast.
+    """
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    plan = cursor.fetchone()[0]
+    found = []
+
+    def walk(node):
+        if "Relation Name" in node and node["Node Type"] != "ModifyTable":
+            # Bitmap Heap Scans carry the condition of their Bitmap Index Scan as Recheck Cond
+            searched = node["Node Type"] != "Seq Scan" and bool(node.get("Index Cond") or node.get("Recheck Cond"))
+            index = f" using {node['Index Name']}" if "Index Name" in node else ""
+            found.append((f"{node['Node Type']} on {node['Relation Name']}{index}" + ("" if searched else " (full)"), searched))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return found
+
+
+def main() -> int:
+    failures = []
+    with db as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        for name, (sql, params) in QUERIES.items():
+            typed = scans(cursor, sql, params)
+            text = scans(cursor, *as_text_comparison(sql, params))
+            ok = all(searched for _, searched in typed)
+            if not ok:
+                failures.append(name)
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+            print(f"       uuid: {', '.join(scan for scan, _ in typed)}")
+            print(f"       text: {', '.join(scan for scan, _ in text)}")
+        cursor.execute("ROLLBACK")
+    if failures:
+        print(f"\n{len(failures)} queries cannot use an index: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -353,6 +353,9 @@ def seed():
             # HEALTH ROUTER (/health/*)
             # ====================================================================
             "GET /health/database": "view_system_health",
+            "GET /health/database/queries": "view_system_health",
+            "DELETE /health/database/queries": "view_system_health",
+            "GET /health/database/n-plus-one": "view_system_health",
             "GET /health/storage": "view_system_health",
             "GET /health/system": None,  # Public endpoint
             "GET /health/test-sentry": "test_sentry",
@@ -709,6 +712,9 @@ def list_endpoints():
 
         # Health Router
         "GET /health/database": "view_system_health",
+        "GET /health/database/queries": "view_system_health",
+        "DELETE /health/database/queries": "view_system_health",
+        "GET /health/database/n-plus-one": "view_system_health",
         "GET /health/storage": "view_system_health",
         "GET /health/system": None,
         "GET /health/test-sentry": "test_sentry",
@@ -853,6 +859,9 @@ def list_permissions_with_endpoints():
 
         # Health Router
         "GET /health/database": "view_system_health",
+        "GET /health/database/queries": "view_system_health",
+        "DELETE /health/database/queries": "view_system_health",
+        "GET /health/database/n-plus-one": "view_system_health",
         "GET /health/storage": "view_system_health",
         "GET /health/system": None,
         "GET /health/test-sentry": "test_sentry",
@@ -0,0 +1,20 @@
+"""
+Gunicorn server hooks (start.sh passes this file with --config)
+
+With --preload the app is imported once in the master and the workers are forked from it.
+Freezing the objects allocated by that import moves them into the permanent generation, so
+worker GC passes don't write to (and copy) the pages shared with the master.
+Database pool and Redis client reset themselves in each forked worker.
+"""
+import gc
+
+# Loaded before the preloaded app is imported: no collections during the import, so the
+# frozen objects are not interleaved with pages freed by GC passes
+gc.disable()
+
+
+def when_ready(server):
+    """Master is set up (app imported with --preload), workers are not forked yet"""
+    if server.cfg.preload_app:
+        gc.freeze()
+    gc.enable()
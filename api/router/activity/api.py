@@ -6,16 +6,18 @@ Handles activity logging endpoints
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from src.authenticate.models import User
 from src.middleware.permission_middleware import check_permission
+from src.db.postgres.postgres import RequestConnection, get_request_connection
 from src.response.success import SUCCESS
 from src.response.error import ERROR
 from src.logger.logger import logger
 from src.multilingual.multilingual import normalize_language
 from .models import ActivityLogCreate
 from .query import (
-    create_activity_log, get_activity_logs, get_activity_log_by_id,
+    create_activity_log, get_activity_logs as query_get_activity_logs, get_activity_log_by_id,
     get_user_activity_logs, get_activity_statistics,
-    delete_old_activity_logs, parse_user_agent
+    delete_old_activity_logs, parse_user_agent, activity_log_cursors, count_activity_logs
 )
+from src.db.postgres.deadline import db_budget
 from typing import Optional
 
 router = APIRouter()
@@ -24,7 +26,8 @@ router = APIRouter()
 async def create_activity_log(
     payload: ActivityLogCreate,
     request: Request,
-    current_user: User = Depends(check_permission("create_activity_log"))
+    current_user: User = Depends(check_permission("create_activity_log")),
+    conn: RequestConnection = Depends(get_request_connection)
 ):
     """
     Create activity log entry.
@@ -64,6 +67,7 @@ async def create_activity_log(
 
         activity_log = create_activity_log(log_data)
 
+        await conn.commit()
         return SUCCESS.response(
             message="Activity log created successfully",
             data={"activity_log": activity_log},
@@ -91,8 +95,12 @@ async def get_activity_logs(
     end_date: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    after: Optional[str] = Query(None, description="Cursor from next_cursor (keyset pagination)"),
+    before: Optional[str] = Query(None, description="Cursor from prev_cursor (keyset pagination)"),
     order_by: str = Query("created_at"),
     order: str = Query("desc", regex="^(asc|desc)$"),
+    include_total: bool = Query(False, description="Add the total number of matching logs"),
+    exact_total: bool = Query(False, description="Count the total exactly instead of estimating it on large results"),
     current_user: User = Depends(check_permission("view_activity_log"))
 ):
     """
@@ -100,6 +108,8 @@ async def get_activity_logs(
 
     Required Permission: view_activity_log
     Allows users to view all activity logs with filtering options.
+    With include_total, totals over DB_COUNT_ESTIMATE_THRESHOLD rows are planner estimates
+    (count_is_estimate) unless exact_total=true.
     """
     try:
         filters = {
@@ -112,20 +122,36 @@ async def get_activity_logs(
             "end_date": end_date,
             "limit": limit,
             "offset": offset,
+            "after": after,
+            "before": before,
             "orderBy": order_by,
             "order": order
         }
 
-        logs = get_activity_logs(filters)
+        logs = query_get_activity_logs(filters)
+        data = {
+            "activity_logs": logs,
+            "count": len(logs),
+            **activity_log_cursors(logs, filters)
+        }
+        if include_total:
+            data["total"], data["count_is_estimate"] = count_activity_logs(filters, estimate=not exact_total)
 
         return SUCCESS.response(
             message="Activity logs retrieved successfully",
-            data={
-                "activity_logs": logs,
-                "count": len(logs)
-            },
+            data=data,
             language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR.build(
+                "INVALID_QUERY",
+                details={"cursor": after or before},
+                exception=str(e),
+                language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
+            )
+        )
     except Exception as e:
         logger.error(f"Error getting activity logs: {e}", exc_info=True, module="ActivityLog", label="GET_ACTIVITY_LOGS")
         raise HTTPException(
@@ -177,6 +203,8 @@ async def get_user_activity_logs(
     end_date: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    after: Optional[str] = Query(None, description="Cursor from next_cursor (keyset pagination)"),
+    before: Optional[str] = Query(None, description="Cursor from prev_cursor (keyset pagination)"),
     current_user: User = Depends(check_permission("view_activity_log"))
 ):
     """
@@ -190,7 +218,9 @@ async def get_user_activity_logs(
             "start_date": start_date,
             "end_date": end_date,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "after": after,
+            "before": before
         }
 
         logs = get_user_activity_logs(user_id, filters)
@@ -200,10 +230,21 @@ async def get_user_activity_logs(
             data={
                 "user_id": user_id,
                 "activity_logs": logs,
-                "count": len(logs)
+                "count": len(logs),
+                **activity_log_cursors(logs, filters)
             },
             language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR.build(
+                "INVALID_QUERY",
+                details={"cursor": after or before},
+                exception=str(e),
+                language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
+            )
+        )
     except Exception as e:
         logger.error(f"Error getting user activity logs: {e}", exc_info=True, module="ActivityLog", label="GET_USER_ACTIVITY_LOGS")
         raise HTTPException(
@@ -221,6 +262,8 @@ async def get_my_activity_logs(
     end_date: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    after: Optional[str] = Query(None, description="Cursor from next_cursor (keyset pagination)"),
+    before: Optional[str] = Query(None, description="Cursor from prev_cursor (keyset pagination)"),
     current_user: User = Depends(check_permission("view_own_activity_log"))
 ):
     """
@@ -234,7 +277,9 @@ async def get_my_activity_logs(
             "start_date": start_date,
             "end_date": end_date,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "after": after,
+            "before": before
         }
 
         logs = get_user_activity_logs(str(current_user.uid), filters)
@@ -243,10 +288,21 @@ async def get_my_activity_logs(
             message="Your activity logs retrieved successfully",
             data={
                 "activity_logs": logs,
-                "count": len(logs)
+                "count": len(logs),
+                **activity_log_cursors(logs, filters)
             },
             language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR.build(
+                "INVALID_QUERY",
+                details={"cursor": after or before},
+                exception=str(e),
+                language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
+            )
+        )
     except Exception as e:
         logger.error(f"Error getting current user activity logs: {e}", exc_info=True, module="ActivityLog", label="GET_MY_ACTIVITY_LOGS")
         raise HTTPException(
@@ -259,6 +315,7 @@ async def get_my_activity_logs(
         )
 
 @router.get("/activity/statistics")
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
 async def get_activity_statistics(
     user_id: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
@@ -299,7 +356,8 @@ async def get_activity_statistics(
 @router.delete("/activity/logs/cleanup")
 async def delete_old_activity_logs(
     days: int = Query(90, ge=1, le=365),
-    current_user: User = Depends(check_permission("delete_activity_log"))
+    current_user: User = Depends(check_permission("delete_activity_log")),
+    conn: RequestConnection = Depends(get_request_connection)
 ):
     """
     Delete old activity logs.
@@ -310,6 +368,7 @@ async def delete_old_activity_logs(
     try:
         deleted_count = delete_old_activity_logs(days)
 
+        await conn.commit()
         return SUCCESS.response(
             message="Old activity logs deleted successfully",
             data={
@@ -2,12 +2,19 @@
 Activity Router - Database Queries
 All database operations for activity logs
 """
-from typing import Optional, Dict, Any, List
-from src.db.postgres.postgres import connection as db
+from typing import Optional, Dict, Any, List, Tuple
+from src.db.postgres.postgres import connection as db, decode_cursor, keyset_predicate, page_cursors
+from src.db.postgres.binding import uuid_param
+from src.db.postgres.replica import read_only
+from src.db.postgres.estimates import count_rows
 from src.logger.logger import logger
 import uuid
 import json
 
+# Sort columns that can be paged with cursors: NOT NULL and indexed together with log_id, which
+# breaks ties (see ix_activity_log_created_at_log_id)
+KEYSET_ORDER_COLUMNS = ("created_at",)
+
 
 def create_activity_log(log_data: Dict[str, Any]) -> Dict[str, Any]:
     """Create activity log entry"""
@@ -72,41 +79,68 @@ def create_activity_log(log_data: Dict[str, Any]) -> Dict[str, Any]:
         raise
 
 
+def _activity_log_filters(filters: Dict[str, Any]):
+    """WHERE clauses (on alias al) and params for the filters of get_activity_logs()"""
+    where_clauses = []
+    params = []
+    if filters.get("user_id"):
+        where_clauses.append("al.user_id = %s")
+        params.append(uuid_param(filters["user_id"]))
+    if filters.get("level"):
+        where_clauses.append("al.level = %s")
+        params.append(filters["level"])
+    if filters.get("action"):
+        where_clauses.append("al.action = %s")
+        params.append(filters["action"])
+    if filters.get("module"):
+        where_clauses.append("al.module = %s")
+        params.append(filters["module"])
+    if filters.get("ip_address"):
+        where_clauses.append("al.ip_address = %s")
+        params.append(filters["ip_address"])
+    if filters.get("start_date"):
+        where_clauses.append("al.created_at >= %s")
+        params.append(filters["start_date"])
+    if filters.get("end_date"):
+        where_clauses.append("al.created_at <= %s")
+        params.append(filters["end_date"])
+    return where_clauses, params
+
+
+@read_only
 def get_activity_logs(filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-    """Get activity logs with filters"""
+    """
+    Get activity logs with filters
+
+    Pages with `limit`/`offset`, or with an `after`/`before` cursor from
+    activity_log_cursors() whose cost does not grow with page depth.
+    """
     try:
         if filters is None:
             filters = {}
-        where_clauses = []
-        params = []
-        if filters.get("user_id"):
-            where_clauses.append("al.user_id::text = %s")
-            params.append(filters["user_id"])
-        if filters.get("level"):
-            where_clauses.append("al.level = %s")
-            params.append(filters["level"])
-        if filters.get("action"):
-            where_clauses.append("al.action = %s")
-            params.append(filters["action"])
-        if filters.get("module"):
-            where_clauses.append("al.module = %s")
-            params.append(filters["module"])
-        if filters.get("ip_address"):
-            where_clauses.append("al.ip_address = %s")
-            params.append(filters["ip_address"])
-        if filters.get("start_date"):
-            where_clauses.append("al.created_at >= %s")
-            params.append(filters["start_date"])
-        if filters.get("end_date"):
-            where_clauses.append("al.created_at <= %s")
-            params.append(filters["end_date"])
-        where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+        where_clauses, params = _activity_log_filters(filters)
         order_by = filters.get("orderBy", "created_at")
         if order_by not in ["created_at", "level", "action", "module"]:
             order_by = "created_at"
         order = "DESC" if filters.get("order", "desc").upper() == "DESC" else "ASC"
         limit = filters.get("limit", 100)
         offset = filters.get("offset", 0)
+        cursor_token = filters.get("after") or filters.get("before")
+        backwards = bool(filters.get("before")) and not filters.get("after")
+        query_order = order
+        if cursor_token:
+            if order_by not in KEYSET_ORDER_COLUMNS:
+                raise ValueError(f"Cursor pagination is not supported when ordering by {order_by}")
+            keyset_sql, keyset_param = keyset_predicate(
+                [f"al.{order_by}", "al.log_id"], order == "ASC", decode_cursor(cursor_token, 2), before=backwards
+            )
+            where_clauses.append(keyset_sql)
+            params.append(keyset_param)
+            offset = 0
+            if backwards:
+                # Walk backwards from the cursor, then restore the requested order
+                query_order = "ASC" if order == "DESC" else "DESC"
+        where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
         params.extend([limit, offset])
         with db as cursor:
             query = f"""
@@ -118,11 +152,13 @@ def get_activity_logs(filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
                 FROM activity_log al
                 LEFT JOIN public."user" u ON al.user_id = u.user_id
                 WHERE {where_sql}
-                ORDER BY al.{order_by} {order}
+                ORDER BY al.{order_by} {query_order}, al.log_id {query_order}
                 LIMIT %s OFFSET %s
             """
             cursor.execute(query, params)
             rows = cursor.fetchall()
+            if backwards:
+                rows.reverse()
             logs = []
             for row in rows:
                 logs.append({
@@ -161,6 +197,41 @@ def get_activity_logs(filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         raise
 
 
+@read_only
+def count_activity_logs(filters: Dict[str, Any] = None, estimate: bool = True) -> Tuple[int, bool]:
+    """
+    (total, is_estimate) of the activity logs matching the filters of get_activity_logs()
+
+    Large totals are planner estimates unless estimate=False (see src/db/postgres/estimates.py).
+    """
+    try:
+        where_clauses, params = _activity_log_filters(filters or {})
+        with db as cursor:
+            return count_rows(cursor, "activity_log al", " AND ".join(where_clauses), params, estimate=estimate)
+    except Exception as e:
+        logger.error(f"Error counting activity logs: {e}", exc_info=True, module="ActivityLog")
+        raise
+
+
+def activity_log_cursors(logs: List[Dict[str, Any]], filters: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Next/previous page cursors for a page returned by get_activity_logs()"""
+    order_by = filters.get("orderBy") or "created_at"
+    if not logs or order_by not in KEYSET_ORDER_COLUMNS:
+        return {"next_cursor": None, "prev_cursor": None}
+    if filters.get("before") and not filters.get("after"):
+        direction = "before"
+    else:
+        direction = "after" if filters.get("after") or filters.get("offset") else None
+    next_cursor, prev_cursor = page_cursors(
+        [logs[0][order_by], logs[0]["log_id"]],
+        [logs[-1][order_by], logs[-1]["log_id"]],
+        len(logs) >= filters.get("limit", 100),
+        direction
+    )
+    return {"next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+
+@read_only
 def get_activity_log_by_id(log_id: str) -> Optional[Dict[str, Any]]:
     """Get activity log by ID"""
     try:
@@ -173,9 +244,9 @@ def get_activity_log_by_id(log_id: str) -> Optional[Dict[str, Any]]:
                     u.user_id as u_user_id, u.email, u.user_name, u.first_name, u.last_name
                 FROM activity_log al
                 LEFT JOIN public."user" u ON al.user_id = u.user_id
-                WHERE al.log_id::text = %s
+                WHERE al.log_id = %s
             """
-            cursor.execute(query, (log_id,))
+            cursor.execute(query, (uuid_param(log_id),))
             row = cursor.fetchone()
             if not row:
                 return None
@@ -214,6 +285,7 @@ def get_activity_log_by_id(log_id: str) -> Optional[Dict[str, Any]]:
         raise
 
 
+@read_only
 def get_user_activity_logs(user_id: str, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
     """Get user activity logs"""
     try:
@@ -226,6 +298,7 @@ def get_user_activity_logs(user_id: str, filters: Dict[str, Any] = None) -> List
         raise
 
 
+@read_only
 def get_activity_statistics(filters: Dict[str, Any] = None) -> Dict[str, Any]:
     """Get activity statistics"""
     try:
@@ -234,8 +307,8 @@ def get_activity_statistics(filters: Dict[str, Any] = None) -> Dict[str, Any]:
         where_clauses = []
         params = []
         if filters.get("user_id"):
-            where_clauses.append("user_id::text = %s")
-            params.append(filters["user_id"])
+            where_clauses.append("user_id = %s")
+            params.append(uuid_param(filters["user_id"]))
         if filters.get("start_date"):
             where_clauses.append("created_at >= %s")
             params.append(filters["start_date"])
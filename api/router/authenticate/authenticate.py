@@ -1,7 +1,7 @@
 from src.authenticate.checkpoint import (
     authenticate_user_token, authenticate_user_with_data,
-    update_user_password, get_user_by_email_or_phone,
-    create_user_in_db, update_last_sign_in,
+    update_user_password, get_user_by_email_or_phone_async,
+    create_user_in_db, update_last_sign_in_async,
     update_user_verification_status
 )
 from src.authenticate.session_manager import (
@@ -18,7 +18,7 @@ from src.multilingual.multilingual import normalize_language
 from src.authenticate.authenticate import validate_request, SECRET_KEY, ALGORITHM
 from src.middleware.permission_middleware import check_permission
 from fastapi.security import OAuth2PasswordRequestForm
-from src.db.postgres.postgres import connection as db
+from src.db.postgres.postgres import connection as db, RequestConnection, get_request_connection
 from src.sms.sms import (send_sms, send_whatsapp)
 from src.authenticate.models import User
 from src.email.email import (send_otp_email)
@@ -58,9 +58,9 @@ async def login_with_password(request: Request, form: OAuth2PasswordRequestForm
             )
 
         # Authenticate user first (without generating tokens yet) to get user_id
-        from src.authenticate.checkpoint import authenticate_user
+        from src.authenticate.checkpoint import authenticate_user_async
         origin = _extract_origin(request)
-        user = authenticate_user(form.username, form.password)
+        user = await authenticate_user_async(form.username, form.password)
 
         if not user:
             raise HTTPException(
@@ -83,22 +83,13 @@ async def login_with_password(request: Request, form: OAuth2PasswordRequestForm
                 detail=ERROR.build("AUTH_INVALID_CREDENTIALS", details={"message": "User account is not verified"}),
             )
 
-        # Clear user-level blacklist entries BEFORE generating tokens
-        # This ensures that after logout and re-login, the new tokens work immediately
-        try:
-            from src.authenticate.session_manager import (
-                clear_user_blacklist,
-                clear_user_refresh_token_blacklist
-            )
-            await clear_user_blacklist(user_id)
-            await clear_user_refresh_token_blacklist(user_id)
-        except Exception as clear_error:
-            # Log but don't fail login if clearing blacklist fails
-            logger.warning(f"Failed to clear user blacklist (non-blocking): {clear_error}", module="Auth", label="LOGIN")
+        # New tokens carry the user's current revocation epoch, so after logout and
+        # re-login they work immediately while the tokens revoked by the logout stay revoked
+        from src.authenticate.session_manager import get_token_epochs
+        epochs = await get_token_epochs(user_id)
 
-        # Now generate tokens (after clearing blacklist)
         from src.authenticate.checkpoint import generate_all_tokens
-        tokens = generate_all_tokens(user, origin=origin, request=request)
+        tokens = generate_all_tokens(user, origin=origin, request=request, epochs=epochs)
 
         # Build auth_result for compatibility
         auth_result = {
@@ -162,7 +153,7 @@ async def login_with_otp(request: Request, payload: OTPVERIFYRequest):
             )
 
         # Get user from database
-        user = get_user_by_email_or_phone(user_id_clean)
+        user = await get_user_by_email_or_phone_async(user_id_clean)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -215,25 +206,16 @@ async def login_with_otp(request: Request, payload: OTPVERIFYRequest):
             update_user_verification_status(str(user['user_id']), channel)
 
         # Update last sign in
-        update_last_sign_in(str(user['user_id']))
+        await update_last_sign_in_async(str(user['user_id']))
 
-        # Clear user-level blacklist entries to allow new sessions after logout
-        # This ensures that after logout and re-login, the new session works
-        try:
-            from src.authenticate.session_manager import (
-                clear_user_blacklist,
-                clear_user_refresh_token_blacklist
-            )
-            await clear_user_blacklist(str(user['user_id']))
-            await clear_user_refresh_token_blacklist(str(user['user_id']))
-        except Exception as clear_error:
-            # Log but don't fail login if clearing blacklist fails
-            logger.warning(f"Failed to clear user blacklist (non-blocking): {clear_error}", module="Auth", label="LOGIN_OTP")
+        # New tokens carry the user's current revocation epoch (works right after a logout)
+        from src.authenticate.session_manager import get_token_epochs
+        epochs = await get_token_epochs(str(user['user_id']))
 
         # Generate tokens directly (don't use authenticate_user_with_data with OTP as password)
         from src.authenticate.checkpoint import generate_all_tokens
         origin = _extract_origin(request)
-        tokens = generate_all_tokens(user, origin=origin, request=request)
+        tokens = generate_all_tokens(user, origin=origin, request=request, epochs=epochs)
 
         # Serialize user data
         user_model = User(**user)
@@ -288,7 +270,7 @@ async def check_user_availability(payload: CheckUserAvailabilityRequest):
             )
 
 
-        user = get_user_by_email_or_phone(payload.user_id)
+        user = await get_user_by_email_or_phone_async(payload.user_id)
         if user:
             return SUCCESS.response(
                     data={
@@ -398,7 +380,7 @@ async def signup(request: Request, payload: OTPVERIFYRequest):
             )
 
 
-        existing_user = get_user_by_email_or_phone(payload.user_id)
+        existing_user = await get_user_by_email_or_phone_async(payload.user_id)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
@@ -449,61 +431,64 @@ async def signup(request: Request, payload: OTPVERIFYRequest):
             user_data_dict["status"] = UserStatusAuthEnum.ACTIVE
 
 
-            created_user_id = create_user_in_db(user_data_dict)
-            if not created_user_id:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=ERROR.build(
-                        "AUTH_SIGNUP_FAILED",
-                        details={"user_id": payload.user_id, "channel": payload.channel},
-                    ),
-                )
+            # User row, group assignment and the check commit together: a failed
+            # assignment leaves no half-created account behind
+            with db.transaction():
+                created_user_id = create_user_in_db(user_data_dict)
+                if not created_user_id:
+                    raise HTTPException(
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        detail=ERROR.build(
+                            "AUTH_SIGNUP_FAILED",
+                            details={"user_id": payload.user_id, "channel": payload.channel},
+                        ),
+                    )
 
-            # Assign group based on OTP type (master OTP = super_admin, normal OTP = user)
-            # This is CRITICAL - user must have a group to have permissions
-            try:
-                from src.permissions.permissions import assign_groups_to_user
+                # Assign group based on OTP type (master OTP = super_admin, normal OTP = user)
+                # This is CRITICAL - user must have a group to have permissions
+                try:
+                    from src.permissions.permissions import assign_groups_to_user
 
-                if is_master_otp(payload.otp):
-                    # Master OTP used - assign super_admin group
-                    assign_groups_to_user(created_user_id, ["super_admin"])
-                else:
-                    # Normal OTP - assign user group (required for basic permissions like edit_profile)
-                    assign_groups_to_user(created_user_id, ["user"])
+                    if is_master_otp(payload.otp):
+                        # Master OTP used - assign super_admin group
+                        assign_groups_to_user(created_user_id, ["super_admin"])
+                    else:
+                        # Normal OTP - assign user group (required for basic permissions like edit_profile)
+                        assign_groups_to_user(created_user_id, ["user"])
+
+                    # Verify group was assigned successfully
+                    from src.permissions.permissions import get_user_groups_async
+                    user_groups = await get_user_groups_async(created_user_id)
+                    if not user_groups:
+                        raise HTTPException(
+                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail=ERROR.build(
+                                "AUTH_SIGNUP_FAILED",
+                                details={
+                                    "message": "Failed to assign user group. The account was not created.",
+                                    "user_id": created_user_id
+                                }
+                            )
+                        )
 
-                # Verify group was assigned successfully
-                from src.permissions.permissions import get_user_groups
-                user_groups = get_user_groups(created_user_id)
-                if not user_groups:
+                except HTTPException:
+                    raise
+                except Exception as group_error:
+                    # Group assignment is critical - fail signup if it fails
+                    logger.error(f"CRITICAL: Failed to assign group to user {created_user_id}: {group_error}", exc_info=True, module="Auth", label="SIGNUP")
                     raise HTTPException(
                         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                         detail=ERROR.build(
                             "AUTH_SIGNUP_FAILED",
                             details={
-                                "message": "Failed to assign user group. User created but group assignment failed.",
-                                "user_id": created_user_id
+                                "message": f"Failed to assign user group: {str(group_error)}",
+                                "user_id": created_user_id,
+                                "error": str(group_error)
                             }
                         )
                     )
 
-            except HTTPException:
-                raise
-            except Exception as group_error:
-                # Group assignment is critical - fail signup if it fails
-                logger.error(f"CRITICAL: Failed to assign group to user {created_user_id}: {group_error}", exc_info=True, module="Auth", label="SIGNUP")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=ERROR.build(
-                        "AUTH_SIGNUP_FAILED",
-                        details={
-                            "message": f"Failed to assign user group: {str(group_error)}",
-                            "user_id": created_user_id,
-                            "error": str(group_error)
-                        }
-                    )
-                )
-
-            user_data = get_user_by_email_or_phone(payload.user_id)
+            user_data = await get_user_by_email_or_phone_async(payload.user_id)
             if not user_data:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -558,7 +543,7 @@ async def signup(request: Request, payload: OTPVERIFYRequest):
         )
 
 @router.post("/auth/set-password")
-async def set_password(payload: SetPassword, current_user: User = Depends(check_permission("edit_profile"))):
+async def set_password(payload: SetPassword, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
     try:
         success = update_user_password(current_user.uid, payload.confirm_password)
         if not success:
@@ -571,6 +556,7 @@ async def set_password(payload: SetPassword, current_user: User = Depends(check_
                 ),
             )
 
+        await conn.commit()
         return SUCCESS.message("Password set successfully", language=normalize_language(getattr(current_user, 'language', None)) if current_user else None)
     except HTTPException:
         raise
@@ -587,7 +573,7 @@ async def set_password(payload: SetPassword, current_user: User = Depends(check_
         )
 
 @router.post("/auth/change-password")
-async def change_password(payload: PasswordChange, current_user: User = Depends(check_permission("edit_profile"))):
+async def change_password(payload: PasswordChange, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
     try:
         user = authenticate_user_token(payload.user_id, payload.old_password)
         if not user:
@@ -603,6 +589,7 @@ async def change_password(payload: PasswordChange, current_user: User = Depends(
                 detail=ERROR.build("AUTH_PASSWORD_UPDATE_FAILED", details={"user_id": payload.user_id}),
             )
 
+        await conn.commit()
         return SUCCESS.message("Password updated successfully", language=normalize_language(getattr(current_user, 'language', None)) if current_user else None)
     except HTTPException:
         raise
@@ -643,7 +630,7 @@ async def forget_password(payload: ForgetPassword):
 
 
 
-        user = get_user_by_email_or_phone(user_id)
+        user = await get_user_by_email_or_phone_async(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -696,18 +683,14 @@ async def refresh_token(request: Request, payload: RefreshTokenRequest):
     Security:
     - Validates refresh_token signature and expiration
     - Checks if token is blacklisted or revoked
-    - Implements complete token rotation (all old tokens are blacklisted)
-    - Creates new session_id for all new tokens
-    - Old session is invalidated, ensuring old tokens cannot be used
+    - Implements complete token rotation (all old tokens of the session are revoked)
+    - New tokens keep the session_id with the session's new revocation epoch
+    - Old tokens of the session are invalidated, ensuring they cannot be used
     """
     from jose import JWTError, jwt
-    from src.authenticate.session_manager import (
-        is_token_blacklisted, is_session_blacklisted,
-        blacklist_token, blacklist_session,
-        is_user_refresh_token_revoked
-    )
+    from src.authenticate.session_manager import check_revocations, revoke_session_tokens
     from src.authenticate.checkpoint import (
-        get_user_by_id, generate_all_tokens
+        get_user_by_id_async, generate_all_tokens
     )
 
     try:
@@ -777,9 +760,11 @@ async def refresh_token(request: Request, payload: RefreshTokenRequest):
                 ),
             )
 
-        # Security checks (in order of speed - fastest first)
+        # Security checks - resolved in one cache round trip
+        revoked = await check_revocations(payload.refresh_token, token_payload)
+
         # 1. Check if refresh token is blacklisted
-        if await is_token_blacklisted(payload.refresh_token, token_type="refresh"):
+        if revoked == "token":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ERROR.build(
@@ -789,7 +774,7 @@ async def refresh_token(request: Request, payload: RefreshTokenRequest):
             )
 
         # 2. Check if session is blacklisted
-        if session_id and await is_session_blacklisted(session_id):
+        if revoked == "session":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ERROR.build(
@@ -799,7 +784,7 @@ async def refresh_token(request: Request, payload: RefreshTokenRequest):
             )
 
         # 3. Check if all refresh tokens for user are revoked (complete logout)
-        if await is_user_refresh_token_revoked(user_id):
+        if revoked == "user_refresh":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ERROR.build(
@@ -809,7 +794,7 @@ async def refresh_token(request: Request, payload: RefreshTokenRequest):
             )
 
         # Get user data
-        user = get_user_by_id(user_id)
+        user = await get_user_by_id_async(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -819,16 +804,23 @@ async def refresh_token(request: Request, payload: RefreshTokenRequest):
         # Get origin for new tokens
         origin = _extract_origin(request)
 
-        # Token rotation: Blacklist old tokens and session before generating new ones
-        # This invalidates all old tokens (access, session, refresh) with the old session_id
-        await blacklist_token(payload.refresh_token, token_type="refresh")
-        if session_id:
-            # Blacklisting session_id invalidates ALL tokens (access, session, refresh) with that session_id
-            await blacklist_session(session_id)
+        # Token rotation: bump the session's epoch before generating new tokens
+        # This invalidates all old tokens (access, session, refresh) of the session
+        # Tokens issued before epochs existed may carry no session_id: they get a new session
+        session_epoch = await revoke_session_tokens(session_id) if session_id else 0
+        if session_epoch is None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=ERROR.build("AUTH_REFRESH_FAILED", details={"message": "Could not revoke the old tokens"}),
+            )
 
-        # Generate NEW tokens with NEW session_id (complete token rotation)
+        # Generate NEW tokens for the session (complete token rotation)
         # This updates ALL tokens: access_token, session_token, and refresh_token
-        tokens = generate_all_tokens(user, origin=origin, request=request)
+        # The refresh token passed the user epoch check, so its user epoch is still current
+        tokens = generate_all_tokens(
+            user, origin=origin, request=request, session_id=session_id,
+            epochs={"uep": int(token_payload.get("uep", 0)), "sep": session_epoch},
+        )
 
         return SUCCESS.response(
             message="Tokens refreshed successfully",
@@ -836,7 +828,7 @@ async def refresh_token(request: Request, payload: RefreshTokenRequest):
                 "access_token": tokens['access_token'],      # NEW access token
                 "refresh_token": tokens['refresh_token'],    # NEW refresh token (rotated)
                 "session_token": tokens['session_token'],    # NEW session token
-                "session_id": tokens['session_id'],          # NEW session ID
+                "session_id": tokens['session_id'],          # Session ID (unchanged)
                 "token_type": "bearer"
             }
         )
@@ -856,10 +848,8 @@ async def logout(request: Request, current_user: User = Depends(check_permission
     Logout user and revoke all tokens and sessions.
 
     Client must send access_token or session_token in Authorization header.
-    This endpoint:
-    - Blacklists the current access token
-    - Revokes all refresh tokens for the user
-    - Revokes all sessions for the user (complete logout from all devices)
+    This endpoint revokes every access, refresh and session token of the user
+    (complete logout from all devices) by bumping the user's revocation epoch.
 
     Returns detailed revocation status for each operation.
 
@@ -869,12 +859,7 @@ async def logout(request: Request, current_user: User = Depends(check_permission
     - All tokens are immediately invalidated
     """
     import uuid
-    from src.authenticate.session_manager import (
-        blacklist_access_token_by_jti,
-        revoke_all_user_refresh_tokens,
-        blacklist_all_user_sessions
-    )
-    from jose import jwt, JWTError
+    from src.authenticate.session_manager import revoke_user_tokens
 
     user_id = str(current_user.uid)
     response_id = str(uuid.uuid4())
@@ -886,91 +871,11 @@ async def logout(request: Request, current_user: User = Depends(check_permission
     tokens_revoked = False
 
     try:
-        # Extract access token from request header (same as old project)
-        auth_header = request.headers.get("Authorization", "")
-        token = None
-        token_jti = None
-
-        if auth_header.startswith("Bearer "):
-            token = auth_header.replace("Bearer ", "").strip()
-        else:
-            # Try X-Session-Token header as fallback
-            token = request.headers.get("X-Session-Token", "").strip()
-
-        # Decode token to get JTI (for logout, we need to decode even expired tokens)
-        if token:
-            try:
-
-                if not SECRET_KEY:
-                    logger.error("JWT_SECRET_KEY not set in environment", module="Auth", label="LOGOUT")
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=ERROR.build("AUTH_LOGOUT_FAILED", details={"message": "JWT configuration error"}),
-                    )
-
-                # Try to decode with audience first, without expiration check (for expired tokens)
-                try:
-                    payload = jwt.decode(
-                        token,
-                        SECRET_KEY,
-                        algorithms=[ALGORITHM],
-                        audience="authenticated",
-                        options={"verify_signature": True, "verify_exp": False}
-                    )
-                    token_jti = payload.get("jti")
-                except JWTError:
-                    # Fallback: try without audience
-                    try:
-                        payload = jwt.decode(
-                            token,
-                            SECRET_KEY,
-                            algorithms=[ALGORITHM],
-                            options={"verify_signature": True, "verify_exp": False}
-                        )
-                        token_jti = payload.get("jti")
-                    except JWTError:
-                        # Last resort: decode without signature verification (for corrupted tokens)
-                        try:
-                            payload = jwt.decode(
-                                token,
-                                SECRET_KEY,
-                                algorithms=[ALGORITHM],
-                                options={"verify_signature": False, "verify_exp": False}
-                            )
-                            token_jti = payload.get("jti")
-                        except Exception:
-                            token_jti = None
-                            logger.warning(f"Could not decode token for user: {user_id}", module="Auth", label="LOGOUT")
-
-                # Blacklist current access token if JTI is available (same as old project)
-                if token_jti:
-                    # Use 45 days expiry (same as old project: 3888000 seconds = 45 days)
-                    access_token_revoked = await blacklist_access_token_by_jti(
-                        token_jti,
-                        user_id,
-                        expires_in_seconds=3888000  # 45 days
-                    )
-                    if not access_token_revoked:
-                        logger.warning(f"Failed to blacklist access token for user: {user_id}, jti: {token_jti}", module="Auth", label="LOGOUT")
-                else:
-                    logger.warning(f"Token JTI not found in token payload for user: {user_id}", module="Auth", label="LOGOUT")
-
-            except HTTPException:
-                raise
-            except Exception as e:
-                logger.error(f"Could not extract or blacklist access token: {e}", exc_info=True, module="Auth", label="LOGOUT")
-                # Continue with logout even if token extraction fails
-
-        # Revoke all refresh tokens for this user (same as old project)
-        refresh_tokens_revoked = await revoke_all_user_refresh_tokens(user_id)
-        if not refresh_tokens_revoked:
-            logger.warning(f"Failed to revoke refresh tokens for user: {user_id}", module="Auth", label="LOGOUT")
-
-        # Revoke all sessions for this user (complete logout from all devices - same as old project)
-        sessions_revoked_count = await blacklist_all_user_sessions(user_id)
-        sessions_revoked = sessions_revoked_count > 0
-        if not sessions_revoked:
-            logger.warning(f"Failed to revoke sessions for user: {user_id}", module="Auth", label="LOGOUT")
+        # One epoch bump revokes the current access token along with every other token of the user
+        revoked = await revoke_user_tokens(user_id)
+        access_token_revoked = refresh_tokens_revoked = sessions_revoked = revoked
+        if not revoked:
+            logger.warning(f"Failed to revoke tokens for user: {user_id}", module="Auth", label="LOGOUT")
 
         # Determine overall tokens_revoked status
         tokens_revoked = access_token_revoked and refresh_tokens_revoked and sessions_revoked
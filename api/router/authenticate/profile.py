@@ -10,7 +10,8 @@ from .models import (
     ChangeEmailRequest, ChangePhoneRequest, UserProfileAccessibility,
     UserProfileLanguage
 )
-from src.db.postgres.postgres import connection as db
+from src.db.postgres.postgres import connection as db, RequestConnection, get_request_connection
+from src.db.postgres.binding import uuid_param
 from src.authenticate.models import User
 from .query import get_user_by_user_id
 from src.logger.logger import logger
@@ -122,7 +123,7 @@ async def get_user_profile_by_id(
 
 
 @router.post("/settings/update-profile-picture", response_model=dict)
-async def update_profile_picture( file: UploadFile = File(None), current_user: User = Depends(check_permission("edit_profile")),):
+async def update_profile_picture( file: UploadFile = File(None), current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection),):
     """
     Update profile picture using file upload or URL.
     Calls the /upload endpoint internally to get the public URL.
@@ -149,10 +150,10 @@ async def update_profile_picture( file: UploadFile = File(None), current_user: U
             query = """
                 UPDATE public."user"
                 SET profile_picture_url = %s, last_updated = NOW()
-                WHERE user_id::text = %s
+                WHERE user_id = %s
                 RETURNING user_id
             """
-            cursor.execute(query, (public_url, str(current_user.uid)))
+            cursor.execute(query, (public_url, uuid_param(current_user.uid)))
             result = cursor.fetchone()
 
         if not result:
@@ -164,6 +165,7 @@ async def update_profile_picture( file: UploadFile = File(None), current_user: U
                     language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
                 )
             )
+        await conn.commit()
         return SUCCESS.response(
             message="Profile picture updated successfully",
             data={
@@ -187,7 +189,7 @@ async def update_profile_picture( file: UploadFile = File(None), current_user: U
         )
 
 @router.post("/settings/update-profile", response_model=User)
-async def update_profile(payload: User, current_user: User = Depends(check_permission("edit_profile"))):
+async def update_profile(payload: User, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Partially update user profile fields.
     Only provided fields will be updated.
@@ -231,13 +233,13 @@ async def update_profile(payload: User, current_user: User = Depends(check_permi
                 update_values.append(value)
 
         set_clauses.append('last_updated = NOW()')
-        update_values.append(str(current_user.uid))
+        update_values.append(uuid_param(current_user.uid))
 
         with db as cursor:
             query = f"""
                 UPDATE public."user"
                 SET {', '.join(set_clauses)}
-                WHERE user_id::text = %s
+                WHERE user_id = %s
                 RETURNING user_id
             """
             cursor.execute(query, update_values)
@@ -259,6 +261,7 @@ async def update_profile(payload: User, current_user: User = Depends(check_permi
         context = User(**user_data)
 
         serialized_data = serialize_data(context)
+        await conn.commit()
         return SUCCESS.response(
             data=serialized_data,
             message="User profile update successfully",
@@ -280,7 +283,7 @@ async def update_profile(payload: User, current_user: User = Depends(check_permi
         )
 
 @router.post("/settings/profile-accessibility", response_model=User)
-async def profile_accessibility(payload: UserProfileAccessibility, current_user: User = Depends(check_permission("edit_profile"))):
+async def profile_accessibility(payload: UserProfileAccessibility, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
 
     try:
 
@@ -288,13 +291,13 @@ async def profile_accessibility(payload: UserProfileAccessibility, current_user:
         update_data = payload.dict()
         set_clauses = [f'"{k}" = %s' for k in update_data.keys()]
         set_clauses.append('last_updated = NOW()')
-        update_values = list(update_data.values()) + [str(current_user.uid)]
+        update_values = list(update_data.values()) + [uuid_param(current_user.uid)]
 
         with db as cursor:
             query = f"""
                 UPDATE public."user"
                 SET {', '.join(set_clauses)}
-                WHERE user_id::text = %s
+                WHERE user_id = %s
             """
             cursor.execute(query, update_values)
 
@@ -304,6 +307,7 @@ async def profile_accessibility(payload: UserProfileAccessibility, current_user:
         context = User(**user_data)
 
         serialized_data = serialize_data(context)
+        await conn.commit()
         return SUCCESS.response(
             data=serialized_data,
             message="Profile accessibility update successfully",
@@ -314,20 +318,20 @@ async def profile_accessibility(payload: UserProfileAccessibility, current_user:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/settings/profile-language", response_model=User)
-async def profile_language(payload: UserProfileLanguage, current_user: User = Depends(check_permission("edit_profile"))):
+async def profile_language(payload: UserProfileLanguage, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
 
     try:
 
         update_data = payload.dict()
         set_clauses = [f'"{k}" = %s' for k in update_data.keys()]
         set_clauses.append('last_updated = NOW()')
-        update_values = list(update_data.values()) + [str(current_user.uid)]
+        update_values = list(update_data.values()) + [uuid_param(current_user.uid)]
 
         with db as cursor:
             query = f"""
                 UPDATE public."user"
                 SET {', '.join(set_clauses)}
-                WHERE user_id::text = %s
+                WHERE user_id = %s
             """
             cursor.execute(query, update_values)
 
@@ -337,6 +341,7 @@ async def profile_language(payload: UserProfileLanguage, current_user: User = De
         context = User(**user_data)
 
         serialized_data = serialize_data(context)
+        await conn.commit()
         return SUCCESS.response(
             data=serialized_data,
             message="Profile language update successfully",
@@ -348,7 +353,7 @@ async def profile_language(payload: UserProfileLanguage, current_user: User = De
 
 
 @router.post("/settings/change-email")
-async def change_email(payload: ChangeEmailRequest, current_user: User = Depends(check_permission("edit_profile"))):
+async def change_email(payload: ChangeEmailRequest, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Verify OTP and change email for the logged-in user.
     """
@@ -374,9 +379,9 @@ async def change_email(payload: ChangeEmailRequest, current_user: User = Depends
             check_query = """
                 SELECT user_id, email
                 FROM public."user"
-                WHERE email = %s AND user_id::text != %s
+                WHERE email = %s AND user_id != %s
             """
-            cursor.execute(check_query, (new_email, str(user_id)))
+            cursor.execute(check_query, (new_email, uuid_param(user_id)))
             existing_user = cursor.fetchone()
 
         if existing_user:
@@ -397,10 +402,10 @@ async def change_email(payload: ChangeEmailRequest, current_user: User = Depends
                     is_email_verified = TRUE,
                     email_verified_at = NOW(),
                     last_updated = NOW()
-                WHERE user_id::text = %s
+                WHERE user_id = %s
                 RETURNING user_id, email, is_email_verified, email_verified_at
             """
-            cursor.execute(query, (new_email, str(user_id)))
+            cursor.execute(query, (new_email, uuid_param(user_id)))
             result = cursor.fetchone()
 
         if not result:
@@ -419,6 +424,8 @@ async def change_email(payload: ChangeEmailRequest, current_user: User = Depends
         email_verified_at = result_dict.get('email_verified_at')
 
 
+        # Commit before the OTP is used up, so a failed commit can be retried with it
+        await conn.commit()
         await verify_otp(new_email, payload.otp, delete_after_verify=True)
 
         return SUCCESS.response(
@@ -449,7 +456,7 @@ async def change_email(payload: ChangeEmailRequest, current_user: User = Depends
         )
 
 @router.post("/settings/change-phone")
-async def change_phone(payload: ChangePhoneRequest, current_user: User = Depends(check_permission("edit_profile"))):
+async def change_phone(payload: ChangePhoneRequest, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
     """Verify OTP and change phone number for the logged-in user."""
     try:
         from router.authenticate.utils import validate_phone
@@ -484,9 +491,9 @@ async def change_phone(payload: ChangePhoneRequest, current_user: User = Depends
         with db as cursor:
             check_query = """
                 SELECT user_id FROM public."user"
-                WHERE phone_number->>'phone' = %s AND user_id::text != %s
+                WHERE phone_number->>'phone' = %s AND user_id != %s
             """
-            cursor.execute(check_query, (phone_clean, str(user_id)))
+            cursor.execute(check_query, (phone_clean, uuid_param(user_id)))
             if cursor.fetchone():
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -501,10 +508,10 @@ async def change_phone(payload: ChangePhoneRequest, current_user: User = Depends
                 UPDATE public."user"
                 SET phone_number = %s::jsonb, is_phone_verified = TRUE,
                     phone_number_verified_at = NOW(), last_updated = NOW()
-                WHERE user_id::text = %s
+                WHERE user_id = %s
                 RETURNING user_id, phone_number, is_phone_verified, phone_number_verified_at
             """
-            cursor.execute(query, (phone_number_json, str(user_id)))
+            cursor.execute(query, (phone_number_json, uuid_param(user_id)))
             result = cursor.fetchone()
 
         if not result:
@@ -517,6 +524,8 @@ async def change_phone(payload: ChangePhoneRequest, current_user: User = Depends
                 )
             )
 
+        # Commit before the OTP is used up, so a failed commit can be retried with it
+        await conn.commit()
         await verify_otp(new_phone, payload.otp, delete_after_verify=True)
         result_dict = dict(result)
         return SUCCESS.response(
@@ -588,7 +597,7 @@ async def send_phone_otp(phone: str, channel: str, current_user: User = Depends(
         )
 
 @router.post("/settings/update-theme")
-async def update_theme(theme: str, current_user: User = Depends(check_permission("edit_profile"))):
+async def update_theme(theme: str, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
     """Update user theme"""
     try:
         if not theme or theme not in ["light", "dark"]:
@@ -599,14 +608,15 @@ async def update_theme(theme: str, current_user: User = Depends(check_permission
 
         with db as cursor:
             cursor.execute(
-                "UPDATE public.\"user\" SET theme = %s, last_updated = NOW() WHERE user_id::text = %s",
-                (theme, str(current_user.uid))
+                "UPDATE public.\"user\" SET theme = %s, last_updated = NOW() WHERE user_id = %s",
+                (theme, uuid_param(current_user.uid))
             )
 
         with db as cursor:
             user_data = await get_user_by_user_id(cursor, current_user.uid)
         serialized_data = serialize_data(User(**user_data))
 
+        await conn.commit()
         return SUCCESS.response(
             message="Theme updated successfully",
             data=serialized_data,
@@ -622,15 +632,16 @@ async def update_theme(theme: str, current_user: User = Depends(check_permission
         )
 
 @router.post("/settings/deactivate-account")
-async def deactivate_account(current_user: User = Depends(check_permission("edit_profile"))):
+async def deactivate_account(current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
     """Deactivate user account"""
     try:
         with db as cursor:
             cursor.execute(
-                "UPDATE public.\"user\" SET is_active = FALSE, status = 'INACTIVE', last_updated = NOW() WHERE user_id::text = %s",
-                (str(current_user.uid),)
+                "UPDATE public.\"user\" SET is_active = FALSE, status = 'INACTIVE', last_updated = NOW() WHERE user_id = %s",
+                (uuid_param(current_user.uid),)
             )
 
+        await conn.commit()
         return SUCCESS.response(
             message="Account deactivated successfully",
             data={"user_id": current_user.uid, "is_active": False, "status": "INACTIVE"},
@@ -644,7 +655,7 @@ async def deactivate_account(current_user: User = Depends(check_permission("edit
         )
 
 @router.post("/settings/delete-account")
-async def delete_account(confirm: bool, current_user: User = Depends(check_permission("edit_profile"))):
+async def delete_account(confirm: bool, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
     """Delete user account"""
     try:
         if confirm is not True:
@@ -655,10 +666,11 @@ async def delete_account(confirm: bool, current_user: User = Depends(check_permi
 
         with db as cursor:
             cursor.execute(
-                "UPDATE public.\"user\" SET is_active = FALSE, status = 'INACTIVE', last_updated = NOW() WHERE user_id::text = %s",
-                (str(current_user.uid),)
+                "UPDATE public.\"user\" SET is_active = FALSE, status = 'INACTIVE', last_updated = NOW() WHERE user_id = %s",
+                (uuid_param(current_user.uid),)
             )
 
+        await conn.commit()
         return SUCCESS.response(
             message="Account deactivated successfully",
             data={"user_id": current_user.uid, "is_active": False},
@@ -681,8 +693,8 @@ async def get_settings(current_user: User = Depends(check_permission("view_profi
             cursor.execute("""
                 SELECT user_id, theme, language, profile_accessibility, timezone, country, bio,
                     is_email_verified, is_phone_verified, is_active, is_verified, status
-                FROM public."user" WHERE user_id::text = %s
-            """, (str(current_user.uid),))
+                FROM public."user" WHERE user_id = %s
+            """, (uuid_param(current_user.uid),))
             row = cursor.fetchone()
 
         if not row:
@@ -713,7 +725,7 @@ async def get_settings(current_user: User = Depends(check_permission("view_profi
         )
 
 @router.post("/settings/update-timezone")
-async def update_timezone(timezone: str, current_user: User = Depends(check_permission("edit_profile"))):
+async def update_timezone(timezone: str, current_user: User = Depends(check_permission("edit_profile")), conn: RequestConnection = Depends(get_request_connection)):
     """Update user timezone"""
     try:
         if not timezone:
@@ -724,14 +736,15 @@ async def update_timezone(timezone: str, current_user: User = Depends(check_perm
 
         with db as cursor:
             cursor.execute(
-                "UPDATE public.\"user\" SET timezone = %s, last_updated = NOW() WHERE user_id::text = %s",
-                (timezone, str(current_user.uid))
+                "UPDATE public.\"user\" SET timezone = %s, last_updated = NOW() WHERE user_id = %s",
+                (timezone, uuid_param(current_user.uid))
             )
 
         with db as cursor:
             user_data = await get_user_by_user_id(cursor, current_user.uid)
         serialized_data = serialize_data(User(**user_data))
 
+        await conn.commit()
         return SUCCESS.response(
             message="Timezone updated successfully",
             data=serialized_data,
@@ -1,6 +1,7 @@
 from fastapi import HTTPException, status
 from src.response.error import ERROR
 from src.logger.logger import logger
+from src.db.postgres.binding import uuid_param
 
 
 async def get_user_by_user_id(cursor, user_id: str):
@@ -28,9 +29,9 @@ async def get_user_by_user_id(cursor, user_id: str):
                 invited_by_user_id, is_protected, is_trashed, last_sign_in_at, email_verified_at, phone_number_verified_at,
                 created_at, last_updated, auth_type, is_email_verified, is_phone_verified
             FROM public."user"
-            WHERE user_id::text = %s
+            WHERE user_id = %s
         """
-        cursor.execute(query, (user_id,))
+        cursor.execute(query, (uuid_param(user_id),))
         row = cursor.fetchone()
 
         if not row:
@@ -0,0 +1,130 @@
+"""
+Token Revocation Tests
+Revocation epochs (logout, refresh token rotation) and the blacklist fallback for tokens
+issued before epochs existed. Uses the in-memory cache; no database or Redis needed.
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+os.environ.setdefault("JWT_SECRET_KEY", "revocation-test-secret")
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from router.authenticate.authenticate import router as authenticate_router
+from src.authenticate.authenticate import ALGORITHM, SECRET_KEY, validate_user
+from src.authenticate.checkpoint import generate_all_tokens
+from src.authenticate.models import User
+from src.authenticate.session_manager import (
+    check_revocations, get_token_epochs, revoke_session_tokens, revoke_user_tokens
+)
+from src.cache.cache import cache
+
+
+app = FastAPI()
+app.include_router(authenticate_router)
+
+
+@app.get("/whoami")
+async def whoami(current_user: User = Depends(validate_user)):
+    return {"uid": current_user.uid}
+
+
+@pytest.fixture
+def client():
+    cache.local_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _user():
+    return {"user_id": str(uuid.uuid4()), "user_name": "revocation-test", "email": "revocation@test.local"}
+
+
+def _issue(user, session_id=None):
+    epochs = asyncio.run(get_token_epochs(user["user_id"], session_id))
+    return generate_all_tokens(user, session_id=session_id, epochs=epochs)
+
+
+def _decode(token):
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], audience="authenticated")
+
+
+def _legacy_token(user, token_type="access"):
+    """A token as issued before revocation epochs: no uep / sep claims"""
+    now = datetime.utcnow()
+    payload = {
+        "sub": user["user_id"],
+        "exp": now + timedelta(minutes=5),
+        "iat": now,
+        "jti": str(uuid.uuid4()),
+        "type": token_type,
+        "aud": "authenticated",
+        "session_id": str(uuid.uuid4()),
+    }
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def _whoami(client, token):
+    return client.get("/whoami", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_revoked_user_token_is_rejected(client):
+    user = _user()
+    tokens = _issue(user)
+    assert _whoami(client, tokens["access_token"]).status_code == 200
+    assert _whoami(client, tokens["session_token"]).status_code == 200
+
+    assert asyncio.run(revoke_user_tokens(user["user_id"]))
+
+    for token_type in ("access_token", "session_token"):
+        response = _whoami(client, tokens[token_type])
+        assert response.status_code == 401, token_type
+    assert asyncio.run(check_revocations(tokens["refresh_token"], _decode(tokens["refresh_token"]))) == "user_refresh"
+
+    # Tokens issued after the logout carry the new epoch
+    assert _whoami(client, _issue(user)["access_token"]).status_code == 200
+
+
+def test_rotated_session_refresh_token_is_rejected(client):
+    user = _user()
+    old = _issue(user)
+    session_id = old["session_id"]
+
+    # What /auth/refresh-token does before issuing the new tokens
+    session_epoch = asyncio.run(revoke_session_tokens(session_id))
+    assert session_epoch
+    new = generate_all_tokens(user, session_id=session_id, epochs={"uep": 0, "sep": session_epoch})
+
+    response = client.post("/auth/refresh-token", json={"refresh_token": old["refresh_token"]})
+    assert response.status_code == 401
+    assert "Session has been revoked" in response.text
+    assert _whoami(client, old["access_token"]).status_code == 401
+
+    assert asyncio.run(check_revocations(new["refresh_token"], _decode(new["refresh_token"]))) is None
+    assert _whoami(client, new["access_token"]).status_code == 200
+
+
+def test_legacy_token_without_epochs(client):
+    user = _user()
+    token = _legacy_token(user)
+    assert _whoami(client, token).status_code == 200
+
+    # Legacy tokens are still checked against the blacklist keys...
+    asyncio.run(cache.set(f"blacklist:user:{user['user_id']}", "1", ttl=60))
+    assert asyncio.run(check_revocations(token, _decode(token))) == "user"
+    assert _whoami(client, token).status_code == 401
+    asyncio.run(cache.delete(f"blacklist:user:{user['user_id']}"))
+    assert _whoami(client, token).status_code == 200
+
+    # ...and count as issued at epoch 0, so a logout revokes them too
+    assert asyncio.run(revoke_user_tokens(user["user_id"]))
+    assert _whoami(client, token).status_code == 401
+
+    refresh = _legacy_token(user, "refresh")
+    assert asyncio.run(check_revocations(refresh, _decode(refresh))) == "user_refresh"
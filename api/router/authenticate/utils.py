@@ -1,6 +1,7 @@
 from src.enum.enum import LanguageStatusEnum, ProfileAccessibilityEnum, UserTypeEnum, ThemeEnum, AuthTypeEnum
 from src.authenticate.checkpoint import get_user_by_email_or_phone, create_user_in_db
 from src.db.postgres.postgres import connection as db
+from src.db.postgres.binding import uuid_param
 
 import datetime, re
 from typing import Dict
@@ -121,13 +122,13 @@ def update_user_by_email(email: str, data: dict):
         set_clauses = [f'"{k}" = %s' for k in data.keys() if k != 'user_id']
         if set_clauses:
             set_clauses.append('last_updated = NOW()')
-            update_values = [v for k, v in data.items() if k != 'user_id'] + [str(user_id)]
+            update_values = [v for k, v in data.items() if k != 'user_id'] + [uuid_param(user_id)]
 
             with db as cursor:
                 query = f"""
                     UPDATE public."user"
                     SET {', '.join(set_clauses)}
-                    WHERE user_id::text = %s
+                    WHERE user_id = %s
                     RETURNING user_id
                 """
                 cursor.execute(query, update_values)
@@ -154,13 +155,13 @@ def update_user_by_phone(phone: str, data: dict):
         set_clauses = [f'"{k}" = %s' for k in data.keys() if k != 'user_id']
         if set_clauses:
             set_clauses.append('last_updated = NOW()')
-            update_values = [v for k, v in data.items() if k != 'user_id'] + [str(user_id)]
+            update_values = [v for k, v in data.items() if k != 'user_id'] + [uuid_param(user_id)]
 
             with db as cursor:
                 query = f"""
                     UPDATE public."user"
                     SET {', '.join(set_clauses)}
-                    WHERE user_id::text = %s
+                    WHERE user_id = %s
                     RETURNING user_id
                 """
                 cursor.execute(query, update_values)
@@ -240,10 +241,10 @@ def update_email_and_phone_verification(user_id: str, channel: str):
                 query = f"""
                     UPDATE public."user"
                     SET is_email_verified = %s, email_verified_at = NOW()
-                    WHERE user_id::text = %s
+                    WHERE user_id = %s
                     RETURNING user_id
                 """
-                cursor.execute(query, (user['is_email_verified'], user_id))
+                cursor.execute(query, (user['is_email_verified'], uuid_param(user_id)))
                 result = cursor.fetchone()
                 return dict(result) if result else None
         elif channel == "phone":
@@ -253,10 +254,10 @@ def update_email_and_phone_verification(user_id: str, channel: str):
                 query = f"""
                     UPDATE public."user"
                     SET is_email_verified = %s, email_verified_at = NOW(), is_phone_verified = %s, phone_number_verified_at = NOW()
-                    WHERE user_id::text = %s
+                    WHERE user_id = %s
                     RETURNING user_id
                 """
-                cursor.execute(query, (user['is_email_verified'], user['is_phone_verified'], user_id))
+                cursor.execute(query, (user['is_email_verified'], user['is_phone_verified'], uuid_param(user_id)))
                 result = cursor.fetchone()
                 return dict(result) if result else None
         return True
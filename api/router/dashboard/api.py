@@ -10,18 +10,56 @@ from src.response.success import SUCCESS
 from src.response.error import ERROR
 from src.logger.logger import logger
 from src.multilingual.multilingual import normalize_language
-from src.db.postgres.postgres import connection as db
+from src.db.postgres.postgres import connection as db, QueryResult
+from src.db.postgres.replica import read_only
+from src.db.postgres.deadline import db_budget
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
+# Whole-table user counts, estimated from planner statistics on large tables unless ?exact=true
+USER_TOTALS = {
+    "total_users": lambda query: query,
+    "active_users": lambda query: query.eq("is_active", True),
+    "verified_users": lambda query: query.eq("is_verified", True),
+    "email_verified": lambda query: query.eq("is_email_verified", True),
+    "phone_verified": lambda query: query.eq("is_phone_verified", True),
+    "users_with_sign_in": lambda query: query.is_not_null("last_sign_in_at"),
+}
+
+
+def user_total_queries(keys, exact: bool = False):
+    """Count queries for the given USER_TOTALS keys, for db.run_many_async()"""
+    return {key: USER_TOTALS[key](db.table('public."user"').count(estimate=not exact)) for key in keys}
+
+
+def count_results(results):
+    """Counts from db.run_many_async() results of COUNT queries and the keys that are estimates"""
+    counts, estimated = {}, []
+    for key, result in results.items():
+        if isinstance(result, QueryResult):
+            counts[key] = result.data[0]["count"] if result.data else 0
+            if result.count_is_estimate:
+                estimated.append(key)
+        else:
+            counts[key] = result[0][0] if result else 0
+    return counts, estimated
+
+
 @router.get("/dashboard/overview")
-async def dashboard_overview(current_user: User = Depends(check_permission("view_dashboard"))):
+@read_only
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
+async def dashboard_overview(
+    exact: bool = Query(False, description="Count totals exactly instead of estimating them on large tables"),
+    current_user: User = Depends(check_permission("view_dashboard"))
+):
     """
     Get dashboard overview statistics.
 
     Required Permission: view_dashboard
     Returns comprehensive user statistics including totals, active users, verified users, and more.
+    Totals over DB_COUNT_ESTIMATE_THRESHOLD users are planner estimates (listed in
+    estimated_counts) unless exact=true.
     """
     try:
         # Get today's date boundaries
@@ -30,32 +68,13 @@ async def dashboard_overview(current_user: User = Depends(check_permission("view
         week_ago = datetime.now() - timedelta(days=7)
         month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-        with db as cursor:
-            # Get all statistics
-            queries = {
-                "total_users": "SELECT COUNT(*) as count FROM public.\"user\"",
-                "active_users": "SELECT COUNT(*) as count FROM public.\"user\" WHERE is_active = TRUE",
-                "verified_users": "SELECT COUNT(*) as count FROM public.\"user\" WHERE is_verified = TRUE",
-                "email_verified": "SELECT COUNT(*) as count FROM public.\"user\" WHERE is_email_verified = TRUE",
-                "phone_verified": "SELECT COUNT(*) as count FROM public.\"user\" WHERE is_phone_verified = TRUE",
-                "new_users_today": "SELECT COUNT(*) as count FROM public.\"user\" WHERE created_at >= %s AND created_at < %s",
-                "new_users_week": "SELECT COUNT(*) as count FROM public.\"user\" WHERE created_at >= %s",
-                "new_users_month": "SELECT COUNT(*) as count FROM public.\"user\" WHERE created_at >= %s",
-                "users_with_sign_in": "SELECT COUNT(*) as count FROM public.\"user\" WHERE last_sign_in_at IS NOT NULL"
-            }
-
-            results = {}
-            for key, query in queries.items():
-                if key in ["new_users_today"]:
-                    cursor.execute(query, (today, tomorrow))
-                elif key in ["new_users_week"]:
-                    cursor.execute(query, (week_ago,))
-                elif key in ["new_users_month"]:
-                    cursor.execute(query, (month_start,))
-                else:
-                    cursor.execute(query)
-                row = cursor.fetchone()
-                results[key] = row[0] if row else 0
+        # All counts run concurrently; new users are counted exactly (recent rows, created_at index)
+        results, estimated = count_results(await db.run_many_async({
+            **user_total_queries(USER_TOTALS, exact=exact),
+            "new_users_today": ("SELECT COUNT(*) as count FROM public.\"user\" WHERE created_at >= %s AND created_at < %s", (today, tomorrow)),
+            "new_users_week": ("SELECT COUNT(*) as count FROM public.\"user\" WHERE created_at >= %s", (week_ago,)),
+            "new_users_month": ("SELECT COUNT(*) as count FROM public.\"user\" WHERE created_at >= %s", (month_start,))
+        }))
 
         overview = {
             "total_users": results["total_users"],
@@ -68,7 +87,8 @@ async def dashboard_overview(current_user: User = Depends(check_permission("view
                 "this_week": results["new_users_week"],
                 "this_month": results["new_users_month"]
             },
-            "users_with_sign_in": results["users_with_sign_in"]
+            "users_with_sign_in": results["users_with_sign_in"],
+            "estimated_counts": estimated
         }
 
         return SUCCESS.response(
@@ -89,6 +109,8 @@ async def dashboard_overview(current_user: User = Depends(check_permission("view
         )
 
 @router.get("/dashboard/users-by-status")
+@read_only
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
 async def users_by_status(current_user: User = Depends(check_permission("view_dashboard"))):
     """
     Get user statistics by status.
@@ -97,15 +119,15 @@ async def users_by_status(current_user: User = Depends(check_permission("view_da
     Returns count of users grouped by status (ACTIVE, INACTIVE, etc.).
     """
     try:
-        with db as cursor:
+        async with db as cursor:
             query = """
                 SELECT status, COUNT(*) as count
                 FROM public."user"
                 GROUP BY status
                 ORDER BY count DESC
             """
-            cursor.execute(query)
-            rows = cursor.fetchall()
+            await cursor.execute(query)
+            rows = await cursor.fetchall()
 
             stats = [{"status": row[0], "count": row[1]} for row in rows]
 
@@ -127,6 +149,8 @@ async def users_by_status(current_user: User = Depends(check_permission("view_da
         )
 
 @router.get("/dashboard/users-by-type")
+@read_only
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
 async def users_by_type(current_user: User = Depends(check_permission("view_dashboard"))):
     """
     Get user statistics by user type.
@@ -135,15 +159,15 @@ async def users_by_type(current_user: User = Depends(check_permission("view_dash
     Returns count of users grouped by user_type (customer, business, etc.).
     """
     try:
-        with db as cursor:
+        async with db as cursor:
             query = """
                 SELECT COALESCE(user_type, 'unknown') as user_type, COUNT(*) as count
                 FROM public."user"
                 GROUP BY user_type
                 ORDER BY count DESC
             """
-            cursor.execute(query)
-            rows = cursor.fetchall()
+            await cursor.execute(query)
+            rows = await cursor.fetchall()
 
             stats = [{"user_type": row[0], "count": row[1]} for row in rows]
 
@@ -165,6 +189,8 @@ async def users_by_type(current_user: User = Depends(check_permission("view_dash
         )
 
 @router.get("/dashboard/users-by-auth-type")
+@read_only
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
 async def users_by_auth_type(current_user: User = Depends(check_permission("view_dashboard"))):
     """
     Get user statistics by authentication type.
@@ -173,15 +199,15 @@ async def users_by_auth_type(current_user: User = Depends(check_permission("view
     Returns count of users grouped by auth_type (email, phone, etc.).
     """
     try:
-        with db as cursor:
+        async with db as cursor:
             query = """
                 SELECT COALESCE(auth_type, 'unknown') as auth_type, COUNT(*) as count
                 FROM public."user"
                 GROUP BY auth_type
                 ORDER BY count DESC
             """
-            cursor.execute(query)
-            rows = cursor.fetchall()
+            await cursor.execute(query)
+            rows = await cursor.fetchall()
 
             stats = [{"auth_type": row[0], "count": row[1]} for row in rows]
 
@@ -203,6 +229,8 @@ async def users_by_auth_type(current_user: User = Depends(check_permission("view
         )
 
 @router.get("/dashboard/users-by-country")
+@read_only
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
 async def users_by_country(current_user: User = Depends(check_permission("view_dashboard"))):
     """
     Get user statistics by country.
@@ -211,7 +239,7 @@ async def users_by_country(current_user: User = Depends(check_permission("view_d
     Returns count of users grouped by country.
     """
     try:
-        with db as cursor:
+        async with db as cursor:
             query = """
                 SELECT COALESCE(country, 'unknown') as country, COUNT(*) as count
                 FROM public."user"
@@ -219,8 +247,8 @@ async def users_by_country(current_user: User = Depends(check_permission("view_d
                 ORDER BY count DESC
                 LIMIT 20
             """
-            cursor.execute(query)
-            rows = cursor.fetchall()
+            await cursor.execute(query)
+            rows = await cursor.fetchall()
 
             stats = [{"country": row[0], "count": row[1]} for row in rows]
 
@@ -242,6 +270,8 @@ async def users_by_country(current_user: User = Depends(check_permission("view_d
         )
 
 @router.get("/dashboard/users-by-language")
+@read_only
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
 async def users_by_language(current_user: User = Depends(check_permission("view_dashboard"))):
     """
     Get user statistics by language.
@@ -250,15 +280,15 @@ async def users_by_language(current_user: User = Depends(check_permission("view_
     Returns count of users grouped by language preference.
     """
     try:
-        with db as cursor:
+        async with db as cursor:
             query = """
                 SELECT COALESCE(language, 'unknown') as language, COUNT(*) as count
                 FROM public."user"
                 GROUP BY language
                 ORDER BY count DESC
             """
-            cursor.execute(query)
-            rows = cursor.fetchall()
+            await cursor.execute(query)
+            rows = await cursor.fetchall()
 
             stats = [{"language": row[0], "count": row[1]} for row in rows]
 
@@ -280,6 +310,8 @@ async def users_by_language(current_user: User = Depends(check_permission("view_
         )
 
 @router.get("/dashboard/user-growth")
+@read_only
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
 async def user_growth(
     period: str = Query("daily", regex="^(daily|weekly|monthly)$"),
     days: int = Query(30, ge=1, le=365),
@@ -292,7 +324,7 @@ async def user_growth(
     Returns user sign-up statistics over time (daily, weekly, monthly).
     """
     try:
-        with db as cursor:
+        async with db as cursor:
             if period == "daily":
                 days_limit = min(max(1, days), 365)
                 query = f"""
@@ -319,8 +351,8 @@ async def user_growth(
                     ORDER BY month ASC
                 """
 
-            cursor.execute(query)
-            rows = cursor.fetchall()
+            await cursor.execute(query)
+            rows = await cursor.fetchall()
 
             growth = []
             for row in rows:
@@ -353,6 +385,8 @@ async def user_growth(
         )
 
 @router.get("/dashboard/recent-sign-ins")
+@read_only
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
 async def recent_sign_ins(
     hours: int = Query(24, ge=1, le=168),
     current_user: User = Depends(check_permission("view_dashboard"))
@@ -369,26 +403,12 @@ async def recent_sign_ins(
         hours_ago = datetime.now() - timedelta(hours=hours_limit)
         today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
-        with db as cursor:
-            queries = {
-                "total": "SELECT COUNT(*) as count FROM public.\"user\" WHERE last_sign_in_at IS NOT NULL",
-                "last_hour": "SELECT COUNT(*) as count FROM public.\"user\" WHERE last_sign_in_at >= %s",
-                "last_period": "SELECT COUNT(*) as count FROM public.\"user\" WHERE last_sign_in_at >= %s",
-                "today": "SELECT COUNT(*) as count FROM public.\"user\" WHERE last_sign_in_at >= %s"
-            }
-
-            results = {}
-            cursor.execute(queries["total"])
-            results["total"] = cursor.fetchone()[0]
-
-            cursor.execute(queries["last_hour"], (one_hour_ago,))
-            results["last_hour"] = cursor.fetchone()[0]
-
-            cursor.execute(queries["last_period"], (hours_ago,))
-            results[f"last_{hours_limit}_hours"] = cursor.fetchone()[0]
-
-            cursor.execute(queries["today"], (today,))
-            results["today"] = cursor.fetchone()[0]
+        results, _ = count_results(await db.run_many_async({
+            "total": "SELECT COUNT(*) as count FROM public.\"user\" WHERE last_sign_in_at IS NOT NULL",
+            "last_hour": ("SELECT COUNT(*) as count FROM public.\"user\" WHERE last_sign_in_at >= %s", (one_hour_ago,)),
+            f"last_{hours_limit}_hours": ("SELECT COUNT(*) as count FROM public.\"user\" WHERE last_sign_in_at >= %s", (hours_ago,)),
+            "today": ("SELECT COUNT(*) as count FROM public.\"user\" WHERE last_sign_in_at >= %s", (today,))
+        }))
 
         stats = {
             "total_with_sign_in": results["total"],
@@ -415,12 +435,18 @@ async def recent_sign_ins(
         )
 
 @router.get("/dashboard/all-statistics")
-async def all_statistics(current_user: User = Depends(check_permission("view_dashboard"))):
+@read_only
+@db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
+async def all_statistics(
+    exact: bool = Query(False, description="Count totals exactly instead of estimating them on large tables"),
+    current_user: User = Depends(check_permission("view_dashboard"))
+):
     """
     Get all dashboard statistics.
 
     Required Permission: view_dashboard
     Returns comprehensive dashboard statistics including all metrics.
+    Overview totals may be estimates, see dashboard_overview.
     """
     try:
         # Get date boundaries
@@ -429,51 +455,37 @@ async def all_statistics(current_user: User = Depends(check_permission("view_das
         week_ago = datetime.now() - timedelta(days=7)
         month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-        with db as cursor:
-            # Get overview statistics
-            overview_queries = {
-                "total_users": "SELECT COUNT(*) FROM public.\"user\"",
-                "active_users": "SELECT COUNT(*) FROM public.\"user\" WHERE is_active = TRUE",
-                "verified_users": "SELECT COUNT(*) FROM public.\"user\" WHERE is_verified = TRUE",
-                "email_verified": "SELECT COUNT(*) FROM public.\"user\" WHERE is_email_verified = TRUE",
-                "phone_verified": "SELECT COUNT(*) FROM public.\"user\" WHERE is_phone_verified = TRUE",
-                "new_today": "SELECT COUNT(*) FROM public.\"user\" WHERE created_at >= %s AND created_at < %s",
-                "new_week": "SELECT COUNT(*) FROM public.\"user\" WHERE created_at >= %s",
-                "new_month": "SELECT COUNT(*) FROM public.\"user\" WHERE created_at >= %s"
-            }
-
-            overview_results = {}
-            for key, query in overview_queries.items():
-                if key == "new_today":
-                    cursor.execute(query, (today, tomorrow))
-                elif key == "new_week":
-                    cursor.execute(query, (week_ago,))
-                elif key == "new_month":
-                    cursor.execute(query, (month_start,))
-                else:
-                    cursor.execute(query)
-                overview_results[key] = cursor.fetchone()[0]
-
-            # Get grouped statistics
-            cursor.execute("SELECT status, COUNT(*) as count FROM public.\"user\" GROUP BY status")
-            by_status = [{"status": row[0], "count": row[1]} for row in cursor.fetchall()]
-
-            cursor.execute("SELECT COALESCE(user_type, 'unknown') as user_type, COUNT(*) as count FROM public.\"user\" GROUP BY user_type")
-            by_type = [{"user_type": row[0], "count": row[1]} for row in cursor.fetchall()]
-
-            cursor.execute("SELECT COALESCE(auth_type, 'unknown') as auth_type, COUNT(*) as count FROM public.\"user\" GROUP BY auth_type")
-            by_auth_type = [{"auth_type": row[0], "count": row[1]} for row in cursor.fetchall()]
-
-            # Get role statistics (simplified - would need permissions module for full implementation)
-            # For now, return empty roles
-            roles = {
-                "superusers": 0,
-                "admins": 0,
-                "business": 0,
-                "developers": 0,
-                "accountants": 0,
-                "regular_users": 0
-            }
+        # Overview counts and grouped statistics run concurrently
+        grouped = {
+            "by_status": "SELECT status, COUNT(*) as count FROM public.\"user\" GROUP BY status",
+            "by_type": "SELECT COALESCE(user_type, 'unknown') as user_type, COUNT(*) as count FROM public.\"user\" GROUP BY user_type",
+            "by_auth_type": "SELECT COALESCE(auth_type, 'unknown') as auth_type, COUNT(*) as count FROM public.\"user\" GROUP BY auth_type"
+        }
+        results = await db.run_many_async({
+            **user_total_queries(
+                ("total_users", "active_users", "verified_users", "email_verified", "phone_verified"), exact=exact
+            ),
+            "new_today": ("SELECT COUNT(*) FROM public.\"user\" WHERE created_at >= %s AND created_at < %s", (today, tomorrow)),
+            "new_week": ("SELECT COUNT(*) FROM public.\"user\" WHERE created_at >= %s", (week_ago,)),
+            "new_month": ("SELECT COUNT(*) FROM public.\"user\" WHERE created_at >= %s", (month_start,)),
+            **grouped
+        })
+        overview_results, estimated = count_results({key: value for key, value in results.items() if key not in grouped})
+
+        by_status = [{"status": row[0], "count": row[1]} for row in results["by_status"]]
+        by_type = [{"user_type": row[0], "count": row[1]} for row in results["by_type"]]
+        by_auth_type = [{"auth_type": row[0], "count": row[1]} for row in results["by_auth_type"]]
+
+        # Get role statistics (simplified - would need permissions module for full implementation)
+        # For now, return empty roles
+        roles = {
+            "superusers": 0,
+            "admins": 0,
+            "business": 0,
+            "developers": 0,
+            "accountants": 0,
+            "regular_users": 0
+        }
 
         stats = {
             "overview": {
@@ -486,7 +498,8 @@ async def all_statistics(current_user: User = Depends(check_permission("view_das
                     "today": overview_results["new_today"],
                     "this_week": overview_results["new_week"],
                     "this_month": overview_results["new_month"]
-                }
+                },
+                "estimated_counts": estimated
             },
             "by_status": by_status,
             "by_type": by_type,
@@ -1,8 +1,15 @@
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from src.middleware.permission_middleware import check_permission
 from src.multilingual.multilingual import normalize_language
 from src.db.postgres.postgres import connection as db
+from src.db.postgres.prepared import prepared_statements
+from src.db.postgres.replica import replicas
+from src.db.postgres.change_feed import change_feed
+from src.permissions.permissions import permission_cache_stats
+from src.db.postgres.query_stats import query_stats, SORT_KEYS
+from src.cache.cache import cache
+from src.authenticate.revocation_filter import revocation_filter
 from src.authenticate.models import User
 from src.response.success import SUCCESS
 from src.storage import media_storage
@@ -82,10 +89,10 @@ async def check_database() -> Dict[str, Any]:
     try:
         start_time = asyncio.get_event_loop().time()
 
-        with db as cursor:
+        async with db as cursor:
             # Test basic database connectivity
-            cursor.execute("SELECT 1 as test")
-            result = cursor.fetchone()
+            await cursor.execute("SELECT 1 as test")
+            result = await cursor.fetchone()
 
         end_time = asyncio.get_event_loop().time()
         response_time = round((end_time - start_time) * 1000, 2)
@@ -95,7 +102,11 @@ async def check_database() -> Dict[str, Any]:
                 "status": "healthy",
                 "message": "Database connection is working",
                 "response_time": response_time,
-                "database_type": "PostgreSQL"
+                "database_type": "PostgreSQL",
+                "prepared_statements": prepared_statements.stats(),
+                "replicas": replicas.stats(),
+                "change_feed": change_feed.stats(),
+                "permission_cache": permission_cache_stats()
             }
         else:
             return {
@@ -258,6 +269,96 @@ async def health_check_database(current_user: User = Depends(check_permission("v
         )
 
 
+@router.get("/health/database/queries", response_model=Dict[str, Any])
+async def database_query_statistics(
+    sort: str = Query("total_time", description=f"Sort by: {', '.join(SORT_KEYS)}"),
+    limit: int = Query(50, ge=1, le=500),
+    plans: bool = Query(False, description="Include captured EXPLAIN plans of slow statements"),
+    current_user: User = Depends(check_permission("view_system_health"))
+) -> Dict[str, Any]:
+    """
+    Per-statement query statistics of this worker process.
+
+    Required Permission: view_system_health
+    Statements are grouped by normalized SQL (fingerprint) with call counts, rows,
+    latency percentiles and histogram, the last route that ran them and, for slow
+    statements, the captured plan.
+    """
+    if sort not in SORT_KEYS:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR.build(
+                "INVALID_QUERY",
+                details={"sort": sort, "allowed": list(SORT_KEYS)},
+                language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
+            )
+        )
+    try:
+        return SUCCESS.response(
+            message="Query statistics retrieved successfully",
+            data=query_stats.snapshot(sort=sort, limit=limit, include_plans=plans)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=ERROR.build(
+                error_key="HEALTH_CHECK_FAILED",
+                details={"user_id": current_user.uid},
+                exception=str(e),
+                language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
+            )
+        )
+
+
+@router.delete("/health/database/queries", response_model=Dict[str, Any])
+async def reset_database_query_statistics(
+    current_user: User = Depends(check_permission("view_system_health"))
+) -> Dict[str, Any]:
+    """
+    Reset the query statistics of this worker process (e.g. before measuring a release).
+
+    Required Permission: view_system_health
+    """
+    query_stats.reset()
+    return SUCCESS.response(message="Query statistics reset", data={"since": query_stats.started_at})
+
+
+@router.get("/health/database/n-plus-one", response_model=Dict[str, Any])
+async def database_n_plus_one_report(
+    limit: int = Query(10, ge=1, le=100, description="Statements per route"),
+    current_user: User = Depends(check_permission("view_system_health"))
+) -> Dict[str, Any]:
+    """
+    N+1 query report of this worker process.
+
+    Required Permission: view_system_health
+    Per route, the statements that ran more than DB_N_PLUS_ONE_THRESHOLD times within
+    one request, worst first. Cleared with DELETE /health/database/queries.
+    """
+    return SUCCESS.response(
+        message="N+1 query report retrieved successfully",
+        data=query_stats.n_plus_one_report(limit=limit)
+    )
+
+
+@router.get("/health/cache", response_model=Dict[str, Any])
+async def cache_statistics(
+    current_user: User = Depends(check_permission("view_system_health"))
+) -> Dict[str, Any]:
+    """
+    Cache statistics of this worker process.
+
+    Required Permission: view_system_health
+    Backend in use (redis or memory), hit / miss / eviction counters of the in-process L1
+    and of the in-memory fallback store, the L1 policy per key prefix, and the revocation
+    filter in front of blacklist lookups.
+    """
+    return SUCCESS.response(
+        message="Cache statistics retrieved successfully",
+        data={**cache.stats(), "revocation_filter": revocation_filter.stats()}
+    )
+
+
 @router.get("/health/storage", response_model=Dict[str, Any])
 async def health_check_storage(current_user: User = Depends(check_permission("view_system_health"))) -> Dict[str, Any]:
     """
@@ -3,13 +3,15 @@ Permissions Router
 Handles permissions and groups management
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from src.middleware.permission_middleware import check_permission
+from src.db.postgres.postgres import RequestConnection, get_request_connection
 from src.authenticate.models import User
 from src.response.success import SUCCESS
 from src.response.error import ERROR
 from src.logger.logger import logger
 from src.multilingual.multilingual import normalize_language
+from typing import Optional
 from .models import (
     PermissionCreate, PermissionUpdate,
     GroupCreate, GroupUpdate,
@@ -18,7 +20,7 @@ from .models import (
 from .query import (
     get_all_permissions, get_permission_by_id, create_permission,
     update_permission, delete_permission,
-    get_all_groups, get_group_by_id, create_group,
+    get_all_groups, group_list_cursors, get_group_by_id, create_group,
     update_group, delete_group,
     assign_permissions_to_group,
     get_user_groups as query_get_user_groups, get_user_permissions, assign_groups_to_user
@@ -78,7 +80,7 @@ async def get_permission(permission_id: str, current_user: User = Depends(check_
         )
 
 @router.post("/permissions")
-async def create_permission(payload: PermissionCreate, current_user: User = Depends(check_permission("add_permission"))):
+async def create_permission(payload: PermissionCreate, current_user: User = Depends(check_permission("add_permission")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Create new permission.
 
@@ -87,6 +89,7 @@ async def create_permission(payload: PermissionCreate, current_user: User = Depe
     """
     try:
         perm = create_permission(payload.dict())
+        await conn.commit()
         return SUCCESS.response(
             message="Permission created successfully",
             data={"permission": perm},
@@ -100,7 +103,7 @@ async def create_permission(payload: PermissionCreate, current_user: User = Depe
         )
 
 @router.put("/permissions/{permission_id}")
-async def update_permission(permission_id: str, payload: PermissionUpdate, current_user: User = Depends(check_permission("edit_permission"))):
+async def update_permission(permission_id: str, payload: PermissionUpdate, current_user: User = Depends(check_permission("edit_permission")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Update permission.
 
@@ -114,6 +117,7 @@ async def update_permission(permission_id: str, payload: PermissionUpdate, curre
                 status_code=404,
                 detail=ERROR.build("PERMISSION_NOT_FOUND", details={"permission_id": permission_id})
             )
+        await conn.commit()
         return SUCCESS.response(
             message="Permission updated successfully",
             data={"permission": perm},
@@ -129,7 +133,7 @@ async def update_permission(permission_id: str, payload: PermissionUpdate, curre
         )
 
 @router.delete("/permissions/{permission_id}")
-async def delete_permission(permission_id: str, current_user: User = Depends(check_permission("delete_permission"))):
+async def delete_permission(permission_id: str, current_user: User = Depends(check_permission("delete_permission")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Delete permission.
 
@@ -143,6 +147,7 @@ async def delete_permission(permission_id: str, current_user: User = Depends(che
                 status_code=404,
                 detail=ERROR.build("PERMISSION_NOT_FOUND", details={"permission_id": permission_id})
             )
+        await conn.commit()
         return SUCCESS.response(
             message="Permission deleted successfully",
             data={"permission_id": permission_id},
@@ -158,20 +163,31 @@ async def delete_permission(permission_id: str, current_user: User = Depends(che
         )
 
 @router.get("/groups")
-async def get_groups(current_user: User = Depends(check_permission("view_group"))):
+async def get_groups(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Cursor from next_cursor (keyset pagination)"),
+    before: Optional[str] = Query(None, description="Cursor from prev_cursor (keyset pagination)"),
+    current_user: User = Depends(check_permission("view_group"))
+):
     """
     Get all groups.
 
     Required Permission: view_group
     Returns list of all groups with their permissions.
+    Pass `limit` to page through groups by name with `after`/`before` cursors.
     """
     try:
-        groups = get_all_groups()
+        groups = get_all_groups(limit, after, before)
         return SUCCESS.response(
             message="Groups retrieved successfully",
-            data={"groups": groups},
+            data={"groups": groups, **group_list_cursors(groups, limit, after, before)},
             language=normalize_language(getattr(current_user, 'language', None)) if current_user else None
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR.build("INVALID_QUERY", details={"cursor": after or before}, exception=str(e))
+        )
     except Exception as e:
         logger.error(f"Error getting groups: {e}", exc_info=True, module="Permissions", label="GET_GROUPS")
         raise HTTPException(
@@ -209,7 +225,7 @@ async def get_group(group_id: str, current_user: User = Depends(check_permission
         )
 
 @router.post("/groups")
-async def create_group_endpoint(payload: GroupCreate, current_user: User = Depends(check_permission("add_group"))):
+async def create_group_endpoint(payload: GroupCreate, current_user: User = Depends(check_permission("add_group")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Create new group.
 
@@ -218,6 +234,7 @@ async def create_group_endpoint(payload: GroupCreate, current_user: User = Depen
     """
     try:
         group = create_group(payload.dict())
+        await conn.commit()
         return SUCCESS.response(
             message="Group created successfully",
             data={"group": group},
@@ -231,7 +248,7 @@ async def create_group_endpoint(payload: GroupCreate, current_user: User = Depen
         )
 
 @router.put("/groups/{group_id}")
-async def update_group_endpoint(group_id: str, payload: GroupUpdate, current_user: User = Depends(check_permission("edit_group"))):
+async def update_group_endpoint(group_id: str, payload: GroupUpdate, current_user: User = Depends(check_permission("edit_group")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Update group.
 
@@ -245,6 +262,7 @@ async def update_group_endpoint(group_id: str, payload: GroupUpdate, current_use
                 status_code=404,
                 detail=ERROR.build("GROUP_NOT_FOUND", details={"group_id": group_id})
             )
+        await conn.commit()
         return SUCCESS.response(
             message="Group updated successfully",
             data={"group": group},
@@ -260,7 +278,7 @@ async def update_group_endpoint(group_id: str, payload: GroupUpdate, current_use
         )
 
 @router.delete("/groups/{group_id}")
-async def delete_group(group_id: str, current_user: User = Depends(check_permission("delete_group"))):
+async def delete_group(group_id: str, current_user: User = Depends(check_permission("delete_group")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Delete group.
 
@@ -274,6 +292,7 @@ async def delete_group(group_id: str, current_user: User = Depends(check_permiss
                 status_code=400,
                 detail=ERROR.build("GROUP_DELETE_FAILED", details={"message": "Group not found or is a system group"})
             )
+        await conn.commit()
         return SUCCESS.response(
             message="Group deleted successfully",
             data={"group_id": group_id},
@@ -289,7 +308,7 @@ async def delete_group(group_id: str, current_user: User = Depends(check_permiss
         )
 
 @router.post("/groups/{group_id}/permissions")
-async def assign_permissions_to_group(group_id: str, payload: AssignPermissionsRequest, current_user: User = Depends(check_permission("edit_group"))):
+async def assign_permissions_to_group(group_id: str, payload: AssignPermissionsRequest, current_user: User = Depends(check_permission("edit_group")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Assign permissions to group.
 
@@ -299,6 +318,7 @@ async def assign_permissions_to_group(group_id: str, payload: AssignPermissionsR
     try:
         assign_permissions_to_group(group_id, payload.permission_ids)
         group = get_group_by_id(group_id)
+        await conn.commit()
         return SUCCESS.response(
             message="Permissions assigned successfully",
             data={"group": group},
@@ -356,7 +376,7 @@ async def get_user_permissions(user_id: str, current_user: User = Depends(check_
         )
 
 @router.post("/users/{user_id}/groups")
-async def assign_groups_to_user(user_id: str, payload: AssignGroupsRequest, current_user: User = Depends(check_permission("assign_groups"))):
+async def assign_groups_to_user(user_id: str, payload: AssignGroupsRequest, current_user: User = Depends(check_permission("assign_groups")), conn: RequestConnection = Depends(get_request_connection)):
     """
     Assign groups to user.
 
@@ -367,6 +387,7 @@ async def assign_groups_to_user(user_id: str, payload: AssignGroupsRequest, curr
         assigned_by = current_user.uid if current_user else None
         assign_groups_to_user(user_id, payload.group_codenames, assigned_by)
         groups = get_user_groups(user_id)
+        await conn.commit()
         return SUCCESS.response(
             message="Groups assigned successfully (user role flags updated)",
             data={"user_id": user_id, "groups": groups},
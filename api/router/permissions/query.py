@@ -3,11 +3,14 @@ Permissions Router - Database Queries
 All database operations for permissions and groups
 """
 from typing import Optional, Dict, Any, List
-from src.db.postgres.postgres import connection as db
+from src.db.postgres.postgres import connection as db, decode_cursor, keyset_predicate, page_cursors
+from src.db.postgres.binding import array_literal, uuid_param, uuid_params
+from src.db.postgres.replica import read_only
 from src.logger.logger import logger
 import uuid
 
 
+@read_only
 def get_all_permissions() -> List[Dict[str, Any]]:
     """Get all permissions"""
     try:
@@ -43,9 +46,9 @@ def get_permission_by_id(permission_id: str) -> Optional[Dict[str, Any]]:
             query = """
                 SELECT permission_id, name, codename, description, category, created_at, last_updated
                 FROM permission
-                WHERE permission_id::text = %s
+                WHERE permission_id = %s
             """
-            cursor.execute(query, (permission_id,))
+            cursor.execute(query, (uuid_param(permission_id),))
             row = cursor.fetchone()
             if not row:
                 return None
@@ -115,12 +118,12 @@ def update_permission(permission_id: str, permission_data: Dict[str, Any]) -> Op
         if not set_clauses:
             return get_permission_by_id(permission_id)
         set_clauses.append("last_updated = NOW()")
-        values.append(permission_id)
+        values.append(uuid_param(permission_id))
         with db as cursor:
             query = f"""
                 UPDATE permission
                 SET {', '.join(set_clauses)}
-                WHERE permission_id::text = %s
+                WHERE permission_id = %s
                 RETURNING permission_id, name, codename, description, category, created_at, last_updated
             """
             cursor.execute(query, values)
@@ -145,37 +148,62 @@ def delete_permission(permission_id: str) -> bool:
     """Delete permission"""
     try:
         with db as cursor:
-            query = "DELETE FROM permission WHERE permission_id::text = %s"
-            cursor.execute(query, (permission_id,))
+            query = "DELETE FROM permission WHERE permission_id = %s"
+            cursor.execute(query, (uuid_param(permission_id),))
             return cursor.rowcount > 0
     except Exception as e:
         logger.error(f"Error deleting permission: {e}", exc_info=True, module="Permissions")
         raise
 
 
-def get_all_groups() -> List[Dict[str, Any]]:
-    """Get all groups with their permissions"""
+@read_only
+def get_all_groups(limit: Optional[int] = None, after: Optional[str] = None, before: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get all groups with their permissions, ordered by name
+
+    With `limit`, returns one page; `after`/`before` take cursors from group_list_cursors().
+    """
     try:
+        where_clauses = ["g.is_active = TRUE"]
+        params = []
+        backwards = bool(before) and not after
+        if after or before:
+            # Group names are unique and NOT NULL, so the name alone is a valid keyset
+            keyset_sql, keyset_param = keyset_predicate(["g.name"], True, decode_cursor(after or before, 1), before=backwards)
+            where_clauses.append(keyset_sql)
+            params.append(keyset_param)
+        limit_sql = ""
+        if limit is not None:
+            limit_sql = "LIMIT %s"
+            params.append(limit)
         with db as cursor:
-            query = """
+            query = f"""
                 SELECT g.group_id, g.name, g.codename, g.description, g.is_system, g.is_active, g.created_at, g.last_updated
                 FROM "group" g
-                WHERE g.is_active = TRUE
-                ORDER BY g.name ASC
+                WHERE {" AND ".join(where_clauses)}
+                ORDER BY g.name {"DESC" if backwards else "ASC"}
+                {limit_sql}
             """
-            cursor.execute(query)
+            cursor.execute(query, params)
             groups = cursor.fetchall()
+            if backwards:
+                groups.reverse()
+            # Permissions of every listed group in one query (not one per group)
+            permissions_by_group: Dict[str, List[Any]] = {str(group[0]): [] for group in groups}
+            if groups:
+                cursor.execute("""
+                    SELECT gp.group_id, p.permission_id, p.name, p.codename, p.description, p.category
+                    FROM permission p
+                    INNER JOIN group_permission gp ON p.permission_id = gp.permission_id
+                    WHERE gp.group_id = ANY(%s)
+                """, (uuid_params(permissions_by_group),))
+                for row in cursor.fetchall():
+                    permissions_by_group[str(row[0])].append(row[1:])
+
             result = []
             for group in groups:
                 group_id = str(group[0])
-                perm_query = """
-                    SELECT p.permission_id, p.name, p.codename, p.description, p.category
-                    FROM permission p
-                    INNER JOIN group_permission gp ON p.permission_id = gp.permission_id
-                    WHERE gp.group_id::text = %s
-                """
-                cursor.execute(perm_query, (group_id,))
-                permissions = cursor.fetchall()
+                permissions = permissions_by_group[group_id]
                 result.append({
                     "group_id": group_id,
                     "name": group[1],
@@ -202,6 +230,16 @@ def get_all_groups() -> List[Dict[str, Any]]:
         raise
 
 
+def group_list_cursors(groups: List[Dict[str, Any]], limit: Optional[int], after: Optional[str] = None,
+                       before: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """Next/previous page cursors for a page returned by get_all_groups()"""
+    if not groups or limit is None:
+        return {"next_cursor": None, "prev_cursor": None}
+    direction = "before" if before and not after else ("after" if after else None)
+    next_cursor, prev_cursor = page_cursors([groups[0]["name"]], [groups[-1]["name"]], len(groups) >= limit, direction)
+    return {"next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+
 def get_group_by_id(group_id: str) -> Optional[Dict[str, Any]]:
     """Get group by ID with permissions"""
     try:
@@ -209,9 +247,9 @@ def get_group_by_id(group_id: str) -> Optional[Dict[str, Any]]:
             query = """
                 SELECT group_id, name, codename, description, is_system, is_active, created_at, last_updated
                 FROM "group"
-                WHERE group_id::text = %s
+                WHERE group_id = %s
             """
-            cursor.execute(query, (group_id,))
+            cursor.execute(query, (uuid_param(group_id),))
             group = cursor.fetchone()
             if not group:
                 return None
@@ -219,9 +257,9 @@ def get_group_by_id(group_id: str) -> Optional[Dict[str, Any]]:
                 SELECT p.permission_id, p.name, p.codename, p.description, p.category
                 FROM permission p
                 INNER JOIN group_permission gp ON p.permission_id = gp.permission_id
-                WHERE gp.group_id::text = %s
+                WHERE gp.group_id = %s
             """
-            cursor.execute(perm_query, (group_id,))
+            cursor.execute(perm_query, (uuid_param(group_id),))
             permissions = cursor.fetchall()
             return {
                 "group_id": str(group[0]),
@@ -303,12 +341,12 @@ def update_group(group_id: str, group_data: Dict[str, Any]) -> Optional[Dict[str
         if not set_clauses:
             return get_group_by_id(group_id)
         set_clauses.append("last_updated = NOW()")
-        values.append(group_id)
+        values.append(uuid_param(group_id))
         with db as cursor:
             query = f"""
                 UPDATE "group"
                 SET {', '.join(set_clauses)}
-                WHERE group_id::text = %s
+                WHERE group_id = %s
                 RETURNING group_id, name, codename, description, is_system, is_active, created_at, last_updated
             """
             cursor.execute(query, values)
@@ -325,13 +363,13 @@ def delete_group(group_id: str) -> bool:
     """Delete group (system groups cannot be deleted)"""
     try:
         with db as cursor:
-            check_query = "SELECT is_system FROM \"group\" WHERE group_id::text = %s"
-            cursor.execute(check_query, (group_id,))
+            check_query = "SELECT is_system FROM \"group\" WHERE group_id = %s"
+            cursor.execute(check_query, (uuid_param(group_id),))
             row = cursor.fetchone()
             if not row or row[0]:
                 return False
-            query = "DELETE FROM \"group\" WHERE group_id::text = %s"
-            cursor.execute(query, (group_id,))
+            query = "DELETE FROM \"group\" WHERE group_id = %s"
+            cursor.execute(query, (uuid_param(group_id),))
             return cursor.rowcount > 0
     except Exception as e:
         logger.error(f"Error deleting group: {e}", exc_info=True, module="Permissions")
@@ -341,21 +379,28 @@ def delete_group(group_id: str) -> bool:
 def assign_permissions_to_group(group_id: str, permission_ids: List[str]) -> None:
     """Assign permissions to group (replaces existing permissions)"""
     try:
-        with db as cursor:
-            delete_query = "DELETE FROM group_permission WHERE group_id::text = %s"
-            cursor.execute(delete_query, (group_id,))
+        permission_ids = list(dict.fromkeys(permission_ids or []))
+        with db:
+            # Remove permissions that are no longer assigned, then add the missing ones in one statement
+            stale = db.table("group_permission").delete().eq("group_id", group_id)
             if permission_ids:
-                insert_query = """
-                    INSERT INTO group_permission (group_id, permission_id)
-                    VALUES (%s, %s)
-                """
-                for perm_id in permission_ids:
-                    cursor.execute(insert_query, (group_id, perm_id))
+                stale = stale.not_in("permission_id", permission_ids)
+            stale.execute()
+            if permission_ids:
+                db.table("group_permission").upsert(
+                    [
+                        {"id": str(uuid.uuid4()), "group_id": group_id, "permission_id": perm_id}
+                        for perm_id in permission_ids
+                    ],
+                    ["group_id", "permission_id"],
+                    update_columns=[]
+                ).execute()
     except Exception as e:
         logger.error(f"Error assigning permissions to group: {e}", exc_info=True, module="Permissions")
         raise
 
 
+@read_only
 def get_user_groups(user_id: str) -> List[Dict[str, Any]]:
     """Get all groups assigned to a user"""
     try:
@@ -364,9 +409,9 @@ def get_user_groups(user_id: str) -> List[Dict[str, Any]]:
                 SELECT g.group_id, g.name, g.codename, g.description, g.is_system, g.is_active
                 FROM "group" g
                 INNER JOIN user_group ug ON g.group_id = ug.group_id
-                WHERE ug.user_id::text = %s AND g.is_active = TRUE
+                WHERE ug.user_id = %s AND g.is_active = TRUE
             """
-            cursor.execute(query, (user_id,))
+            cursor.execute(query, (uuid_param(user_id),))
             rows = cursor.fetchall()
             return [
                 {
@@ -384,6 +429,7 @@ def get_user_groups(user_id: str) -> List[Dict[str, Any]]:
         raise
 
 
+@read_only
 def get_user_permissions(user_id: str) -> List[Dict[str, Any]]:
     """Get all permissions for a user (from all groups)"""
     try:
@@ -393,9 +439,9 @@ def get_user_permissions(user_id: str) -> List[Dict[str, Any]]:
                 FROM permission p
                 INNER JOIN group_permission gp ON p.permission_id = gp.permission_id
                 INNER JOIN user_group ug ON gp.group_id = ug.group_id
-                WHERE ug.user_id::text = %s
+                WHERE ug.user_id = %s
             """
-            cursor.execute(query, (user_id,))
+            cursor.execute(query, (uuid_param(user_id),))
             rows = cursor.fetchall()
             return [
                 {
@@ -416,24 +462,30 @@ def assign_groups_to_user(user_id: str, group_codenames: List[str], assigned_by_
     """Assign groups to user (replaces existing groups)"""
     try:
         with db as cursor:
-            delete_query = "DELETE FROM user_group WHERE user_id::text = %s"
-            cursor.execute(delete_query, (user_id,))
+            group_ids = []
             if group_codenames:
-                placeholders = ','.join(['%s'] * len(group_codenames))
-                group_query = f"""
+                group_query = """
                     SELECT group_id FROM "group"
-                    WHERE codename IN ({placeholders})
+                    WHERE codename = ANY(%s)
                 """
-                cursor.execute(group_query, tuple(group_codenames))
+                cursor.execute(group_query, (array_literal(group_codenames),))
                 group_rows = cursor.fetchall()
                 group_ids = [str(row[0]) for row in group_rows]
-                if group_ids:
-                    insert_query = """
-                        INSERT INTO user_group (user_id, group_id, assigned_by_user_id)
-                        VALUES (%s, %s, %s)
-                    """
-                    for group_id in group_ids:
-                        cursor.execute(insert_query, (user_id, group_id, assigned_by_user_id))
+
+            # Remove groups that are no longer assigned, then add the missing ones in one statement
+            stale = db.table("user_group").delete().eq("user_id", user_id)
+            if group_ids:
+                stale = stale.not_in("group_id", group_ids)
+            stale.execute()
+            if group_ids:
+                db.table("user_group").upsert(
+                    [
+                        {"id": str(uuid.uuid4()), "user_id": user_id, "group_id": group_id, "assigned_by_user_id": assigned_by_user_id}
+                        for group_id in group_ids
+                    ],
+                    ["user_id", "group_id"],
+                    update_columns=["assigned_by_user_id"]
+                ).execute()
     except Exception as e:
         logger.error(f"Error assigning groups to user: {e}", exc_info=True, module="Permissions")
         raise
@@ -11,9 +11,13 @@ from router.dashboard.api import router as dashboard_router
 from router.permissions.api import router as permissions_router
 from router.activity.api import router as activity_router
 from fastapi.middleware.cors import CORSMiddleware
+from src.middleware.replica_middleware import ReplicaSessionMiddleware
+from src.middleware.query_context_middleware import QueryContextMiddleware
+from src.middleware.db_deadline_middleware import DatabaseDeadlineMiddleware
 from src.response.success import SUCCESS
 from fastapi import FastAPI
 from src.logger.logger import logger
+import asyncio
 import os
 import sentry_sdk
 
@@ -38,6 +42,9 @@ app = FastAPI(
     redoc_url=None if os.environ.get('API_MODE') == "production" else f"/redoc"
 )
 
+# Per-request database time budget; inside CORS so 503/504 responses carry CORS headers
+app.add_middleware(DatabaseDeadlineMiddleware)
+
 # CORS Configuration
 origins = (
     r"https?://(.*\.)?winsta\.(ai|pro)$|"  # Base domain and all subdomains
@@ -52,6 +59,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Read-your-writes for read replica routing (no-op without DATABASE_REPLICA_URLS)
+app.add_middleware(ReplicaSessionMiddleware)
+
+# Request route for query statistics and the slow-query log
+app.add_middleware(QueryContextMiddleware)
+
 # ============================================================
 # ROUTERS - Matching fastapi Backend
 # ============================================================
@@ -125,15 +138,34 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"Trigger initialization skipped (will retry later): {e}", module="Server")
 
-    # Test database connection (non-blocking)
+    # Listen for row changes made by other workers and pods (cache invalidation)
+    try:
+        from src.db.postgres.change_feed import change_feed
+        await change_feed.start()
+    except Exception as e:
+        logger.warning(f"Change feed listener failed to start: {e}", module="Server")
+
+    # Warm up the database connection pool (non-blocking)
     try:
         from src.db.postgres.postgres import get_db_connection
-        conn = get_db_connection()
-        if not conn:
+        pool = get_db_connection()
+        if not pool:
             logger.warning("⚠️  Database connection not available yet (will retry on first use)", module="Server")
+        else:
+            await pool.run(pool.warm_up)
+            pool.start_maintenance()
     except Exception as e:
         logger.warning(f"Database connection check failed (will retry on first use): {e}", module="Server")
 
+    # Warm up read replica pools (unreachable replicas are skipped until they recover)
+    try:
+        from src.db.postgres.replica import replicas
+        if replicas.enabled:
+            await asyncio.get_running_loop().run_in_executor(None, replicas.warm_up)
+            replicas.start_maintenance()
+    except Exception as e:
+        logger.warning(f"Read replica warm-up failed (reads fall back to the primary): {e}", module="Server")
+
     # Initialize cache (for token blacklisting)
     try:
         from src.cache.cache import cache
@@ -141,6 +173,43 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"Cache initialization failed (will use in-memory fallback): {e}", module="Server")
 
+    # Bloom filter in front of the blacklist lookups of tokens issued before revocation epochs
+    try:
+        from src.authenticate.revocation_filter import revocation_filter
+        await revocation_filter.start()
+    except Exception as e:
+        logger.warning(f"Revocation filter failed to start (blacklist lookups use the cache): {e}", module="Server")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Release pooled database connections on application shutdown
+    """
+    try:
+        from src.db.postgres.change_feed import change_feed
+        await change_feed.stop()
+    except Exception as e:
+        logger.warning(f"Change feed shutdown failed: {e}", module="Server")
+
+    try:
+        from src.authenticate.revocation_filter import revocation_filter
+        await revocation_filter.stop()
+    except Exception as e:
+        logger.warning(f"Revocation filter shutdown failed: {e}", module="Server")
+
+    try:
+        from src.cache.cache import cache
+        await cache.close()
+    except Exception as e:
+        logger.warning(f"Cache shutdown failed: {e}", module="Server")
+
+    try:
+        from src.db.postgres.postgres import LazyPostgresConnection
+        LazyPostgresConnection.reset_connection()
+    except Exception as e:
+        logger.warning(f"Database pool shutdown failed: {e}", module="Server")
+
 
 # ============================================================
 # HEALTH CHECK
@@ -157,8 +226,8 @@ async def health():
         db_status = "unknown"
         try:
             from src.db.postgres.postgres import get_db_connection
-            conn = get_db_connection()
-            if conn and conn.connection and not conn.connection.closed:
+            pool = get_db_connection()
+            if pool and pool.stats()["size"] > 0:
                 db_status = "connected"
             else:
                 db_status = "disconnected"
@@ -5,6 +5,7 @@ Handles user activity logging operations
 
 from typing import Optional, Dict, Any, List
 from src.db.postgres.postgres import connection as db
+from src.db.postgres.binding import uuid_param
 from src.logger.logger import logger
 import json
 
@@ -114,8 +115,8 @@ def get_activity_logs(filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         params = []
 
         if user_id:
-            where_clauses.append("al.user_id::text = %s")
-            params.append(user_id)
+            where_clauses.append("al.user_id = %s")
+            params.append(uuid_param(user_id))
         if level:
             where_clauses.append("al.level = %s")
             params.append(level)
@@ -212,9 +213,9 @@ def get_activity_log_by_id(log_id: str) -> Optional[Dict[str, Any]]:
                     u.user_id as u_user_id, u.email, u.user_name, u.first_name, u.last_name
                 FROM activity_log al
                 LEFT JOIN public."user" u ON al.user_id = u.user_id
-                WHERE al.log_id::text = %s
+                WHERE al.log_id = %s
             """
-            cursor.execute(query, (log_id,))
+            cursor.execute(query, (uuid_param(log_id),))
             row = cursor.fetchone()
 
             if not row:
@@ -279,8 +280,8 @@ def get_activity_statistics(filters: Dict[str, Any] = None) -> Dict[str, Any]:
         params = []
 
         if user_id:
-            where_clauses.append("user_id::text = %s")
-            params.append(user_id)
+            where_clauses.append("user_id = %s")
+            params.append(uuid_param(user_id))
         if start_date:
             where_clauses.append("created_at >= %s")
             params.append(start_date)
@@ -17,10 +17,7 @@ from typing import Optional
 from .models import TokenData, User
 
 from src.response.error import ERROR
-from src.authenticate.session_manager import (
-    is_token_blacklisted, is_session_blacklisted, is_user_blacklisted,
-    is_access_token_blacklisted_by_jti, is_user_refresh_token_revoked
-)
+from src.authenticate.session_manager import check_revocations
 # JWT Configuration - all configurable via .env
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
 ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')  # Default: HS256
@@ -134,10 +131,8 @@ async def validate_user(request: Request, token: Optional[str] = Depends(extract
         if uid is None:
             raise credentials_exception
 
-        # Get token type, session_id, and user_id
+        # Get token type
         token_type = payload.get("type", "access")
-        session_id = payload.get("session_id")
-        user_id = payload.get("sub")
 
         # Validate token type - only accept access or session tokens for authentication
         if token_type not in ["access", "session"]:
@@ -156,9 +151,12 @@ async def validate_user(request: Request, token: Optional[str] = Depends(extract
                 )
             )
 
-        # Fast blacklist checks - optimized order (fastest checks first)
-        # 1. Check token blacklist first (most common, fastest check)
-        if await is_token_blacklisted(token, token_type=token_type):
+        # Blacklist checks - all resolved in one cache round trip, reported in this order:
+        # token, JTI, session, user, user refresh tokens
+        revoked = await check_revocations(token, payload)
+
+        # 1. Token blacklist (by hash, or by JTI for access tokens)
+        if revoked in ("token", "jti"):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ERROR.build(
@@ -174,27 +172,8 @@ async def validate_user(request: Request, token: Optional[str] = Depends(extract
                 )
             )
 
-        # 1b. Check JTI-based blacklist for access tokens (more efficient)
-        if token_type == "access":
-            token_jti = payload.get("jti")
-            if token_jti and await is_access_token_blacklisted_by_jti(token_jti):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail=ERROR.build(
-                        error_key="TOKEN_INVALID",
-                        details={
-                            "Reason": "Token has been revoked",
-                            "WWW-Authenticate": "Bearer",
-                            "Tips": [
-                                "This token has been revoked",
-                                "Please login again to get a new token"
-                            ]
-                        },
-                    )
-                )
-
-        # 2. Check session blacklist (if session_id exists)
-        if session_id and await is_session_blacklisted(session_id):
+        # 2. Session blacklist (if session_id exists)
+        if revoked == "session":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ERROR.build(
@@ -210,8 +189,8 @@ async def validate_user(request: Request, token: Optional[str] = Depends(extract
                 )
             )
 
-        # 3. Check user blacklist last (least common, but still important)
-        if user_id and await is_user_blacklisted(user_id):
+        # 3. User blacklist (least common, but still important)
+        if revoked == "user":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ERROR.build(
@@ -227,8 +206,8 @@ async def validate_user(request: Request, token: Optional[str] = Depends(extract
                 )
             )
 
-        # 4. Check if all refresh tokens for user have been revoked (complete logout)
-        if user_id and await is_user_refresh_token_revoked(user_id):
+        # 4. All refresh tokens for user have been revoked (complete logout)
+        if revoked == "user_refresh":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ERROR.build(
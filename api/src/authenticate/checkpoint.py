@@ -1,3 +1,4 @@
+import asyncio
 import os
 import re
 import uuid
@@ -8,6 +9,8 @@ from jose import jwt
 from fastapi import Request
 
 from src.db.postgres.postgres import connection as db
+from src.db.postgres.binding import uuid_param
+from src.db.postgres.prepared import prepared_statements
 from src.logger.logger import logger
 from src.authenticate.session_manager import (
     ACCESS_TOKEN_EXPIRY,
@@ -28,6 +31,32 @@ ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')  # Default: HS256, can be H
 email_validator = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 phone_validator = re.compile(r'^\+?[1-9]\d{1,14}$')
 
+# Hot user lookups (login and token authentication), prepared once per pooled connection
+# Only select columns that actually exist in the User table
+_USER_SELECT = """
+    SELECT user_id, email, password, first_name, last_name, user_name,
+           phone_number, is_active, is_verified, status,
+           profile_picture_url, country, dob, bio, theme,
+           profile_accessibility, user_type, language, timezone,
+           last_sign_in_at, email_verified_at, created_at, last_updated,
+           is_protected, is_trashed, auth_type, invited_by_user_id
+    FROM public."user"
+"""
+
+USER_BY_EMAIL_STATEMENT = prepared_statements.register(
+    "auth_user_by_email",
+    _USER_SELECT + "WHERE LOWER(email) = LOWER(%s) LIMIT 1"
+)
+USER_BY_PHONE_STATEMENT = prepared_statements.register(
+    "auth_user_by_phone",
+    _USER_SELECT + "WHERE phone_number->>'phone' LIKE %s OR phone_number->>'phone' LIKE %s LIMIT 1"
+)
+USER_BY_ID_STATEMENT = prepared_statements.register(
+    "auth_user_by_id",
+    _USER_SELECT + "WHERE user_id = %s LIMIT 1",
+    ["uuid"]
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
 
@@ -81,6 +110,16 @@ def hash_password(password: str) -> str:
         raise
 
 
+def _user_lookup(identifier: str):
+    """Prepared statement and parameters that find a user by email or phone number"""
+    if "@" in identifier:
+        # Email lookup (case-insensitive)
+        return USER_BY_EMAIL_STATEMENT, (identifier,)
+    # Phone number lookup (handle JSON field)
+    phone_clean = identifier.strip().replace("+", "")
+    return USER_BY_PHONE_STATEMENT, (f'%{phone_clean}%', f'%+{phone_clean}%')
+
+
 def get_user_by_email_or_phone(identifier: str) -> Optional[Dict[str, Any]]:
     """
     Get user from database by email or phone number.
@@ -88,39 +127,7 @@ def get_user_by_email_or_phone(identifier: str) -> Optional[Dict[str, Any]]:
     """
     try:
         with db as cursor:
-            # Determine if identifier is email or phone
-            if "@" in identifier:
-                # Email lookup (case-insensitive)
-                # Only select columns that actually exist in the User table
-                query = """
-                    SELECT user_id, email, password, first_name, last_name, user_name,
-                           phone_number, is_active, is_verified, status,
-                           profile_picture_url, country, dob, bio, theme,
-                           profile_accessibility, user_type, language, timezone,
-                           last_sign_in_at, email_verified_at, created_at, last_updated,
-                           is_protected, is_trashed, auth_type, invited_by_user_id
-                    FROM public."user"
-                    WHERE LOWER(email) = LOWER(%s)
-                    LIMIT 1
-                """
-                cursor.execute(query, (identifier,))
-            else:
-                # Phone number lookup (handle JSON field)
-                # Only select columns that actually exist in the User table
-                query = """
-                    SELECT user_id, email, password, first_name, last_name, user_name,
-                           phone_number, is_active, is_verified, status,
-                           profile_picture_url, country, dob, bio, theme,
-                           profile_accessibility, user_type, language, timezone,
-                           last_sign_in_at, email_verified_at, created_at, last_updated,
-                           is_protected, is_trashed, auth_type, invited_by_user_id
-                    FROM public."user"
-                    WHERE phone_number->>'phone' LIKE %s OR phone_number->>'phone' LIKE %s
-                    LIMIT 1
-                """
-                phone_clean = identifier.strip().replace("+", "")
-                cursor.execute(query, (f'%{phone_clean}%', f'%+{phone_clean}%'))
-
+            cursor.execute_prepared(*_user_lookup(identifier))
             row = cursor.fetchone()
             if row:
                 return dict(row)
@@ -130,6 +137,20 @@ def get_user_by_email_or_phone(identifier: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+async def get_user_by_email_or_phone_async(identifier: str) -> Optional[Dict[str, Any]]:
+    """Async variant of get_user_by_email_or_phone for request handlers (never blocks the event loop)"""
+    try:
+        async with db as cursor:
+            await cursor.execute_prepared(*_user_lookup(identifier))
+            row = await cursor.fetchone()
+            if row:
+                return dict(row)
+            return None
+    except Exception as e:
+        logger.error(f"Error fetching user: {e}", exc_info=True, module="Auth", label="FETCH_USER")
+        return None
+
+
 def check_user_availability_in_db(identifier: str) -> Optional[Dict[str, Any]]:
     """
     Check if a user is available (not taken) in the database.
@@ -157,6 +178,29 @@ def check_user_availability_in_db(identifier: str) -> Optional[Dict[str, Any]]:
         return False
 
 
+def _check_credentials(identifier: str, password: str, user: Optional[Dict[str, Any]]) -> bool:
+    """Whether a looked-up user may sign in with password (logs the reason when not)"""
+    if not user:
+        logger.warning(f"User not found: {identifier}", module="Auth", label="AUTH_FAILED")
+        return False
+
+    # Check if user is active and verified
+    if not user.get('is_active') or not user.get('is_verified'):
+        logger.warning(f"User account not active or verified: {identifier}", module="Auth", label="AUTH_FAILED")
+        return False
+
+    hashed_password = user.get('password')
+    if not hashed_password:
+        logger.warning(f"User has no password set: {identifier}", module="Auth", label="AUTH_FAILED")
+        return False
+
+    if not verify_password(password, hashed_password):
+        logger.warning(f"Invalid password for user: {identifier}", module="Auth", label="AUTH_FAILED")
+        return False
+
+    return True
+
+
 def authenticate_user(identifier: str, password: str) -> Optional[Dict[str, Any]]:
     """
     Authenticate a user by email/phone and password.
@@ -165,23 +209,7 @@ def authenticate_user(identifier: str, password: str) -> Optional[Dict[str, Any]
     try:
         # Get user from database
         user = get_user_by_email_or_phone(identifier)
-
-        if not user:
-            logger.warning(f"User not found: {identifier}", module="Auth", label="AUTH_FAILED")
-            return None
-
-        # Check if user is active and verified
-        if not user.get('is_active') or not user.get('is_verified'):
-            logger.warning(f"User account not active or verified: {identifier}", module="Auth", label="AUTH_FAILED")
-            return None
-
-        hashed_password = user.get('password')
-        if not hashed_password:
-            logger.warning(f"User has no password set: {identifier}", module="Auth", label="AUTH_FAILED")
-            return None
-
-        if not verify_password(password, hashed_password):
-            logger.warning(f"Invalid password for user: {identifier}", module="Auth", label="AUTH_FAILED")
+        if not _check_credentials(identifier, password, user):
             return None
 
         # Update last sign in asynchronously (non-blocking for faster response)
@@ -199,16 +227,46 @@ def authenticate_user(identifier: str, password: str) -> Optional[Dict[str, Any]
         return None
 
 
+async def authenticate_user_async(identifier: str, password: str) -> Optional[Dict[str, Any]]:
+    """
+    Async variant of authenticate_user for request handlers.
+    The lookups never block the event loop; bcrypt runs on a worker thread.
+    """
+    try:
+        user = await get_user_by_email_or_phone_async(identifier)
+        if not await asyncio.to_thread(_check_credentials, identifier, password, user):
+            return None
+
+        await update_last_sign_in_async(str(user['user_id']))
+        return user
+
+    except Exception as e:
+        logger.error(f"Authentication error: {e}", exc_info=True, module="Auth", label="AUTH_ERROR")
+        return None
+
+
+_LAST_SIGN_IN_UPDATE = """
+    UPDATE public."user"
+    SET last_sign_in_at = NOW()
+    WHERE user_id = %s
+"""
+
+
 def update_last_sign_in(user_id: str):
     """Update user's last sign in timestamp"""
     try:
         with db as cursor:
-            query = """
-                UPDATE public."user"
-                SET last_sign_in_at = NOW()
-                WHERE user_id::text = %s
-            """
-            cursor.execute(query, (str(user_id),))
+            cursor.execute(_LAST_SIGN_IN_UPDATE, (uuid_param(user_id),))
+    except Exception as e:
+        logger.error(f"Error updating last sign in: {e}", module="Auth", label="UPDATE_SIGN_IN")
+        # Don't fail authentication if this fails
+
+
+async def update_last_sign_in_async(user_id: str):
+    """Async variant of update_last_sign_in for request handlers"""
+    try:
+        async with db as cursor:
+            await cursor.execute(_LAST_SIGN_IN_UPDATE, (uuid_param(user_id),))
     except Exception as e:
         logger.error(f"Error updating last sign in: {e}", module="Auth", label="UPDATE_SIGN_IN")
         # Don't fail authentication if this fails
@@ -246,9 +304,9 @@ def update_user_verification_status(user_id: str, channel: str):
                         email_verified_at = NOW(),
                         is_verified = TRUE,
                         last_updated = NOW()
-                    WHERE user_id::text = %s
+                    WHERE user_id = %s
                 """
-                cursor.execute(query, (str(user_id),))
+                cursor.execute(query, (uuid_param(user_id),))
                 return True
 
             elif channel_lower in ["sms", "whatsapp"]:
@@ -259,9 +317,9 @@ def update_user_verification_status(user_id: str, channel: str):
                         phone_number_verified_at = NOW(),
                         is_verified = TRUE,
                         last_updated = NOW()
-                    WHERE user_id::text = %s
+                    WHERE user_id = %s
                 """
-                cursor.execute(query, (str(user_id),))
+                cursor.execute(query, (uuid_param(user_id),))
                 return True
             else:
                 logger.warning(f"Invalid channel for verification update: {channel} (user: {user_id})", module="Auth", label="UPDATE_VERIFICATION")
@@ -324,7 +382,8 @@ def _build_permissions_payload(user: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def generate_access_token(user: Dict[str, Any], origin: Optional[str] = None, session_id: Optional[str] = None) -> str:
+def generate_access_token(user: Dict[str, Any], origin: Optional[str] = None, session_id: Optional[str] = None,
+                          epochs: Optional[Dict[str, int]] = None) -> str:
     """
     Generate short-lived access token (1 hour) - Optimized for speed
     Minimal payload for faster token generation and validation
@@ -349,6 +408,8 @@ def generate_access_token(user: Dict[str, Any], origin: Optional[str] = None, se
             payload['origin'] = origin
         if session_id:
             payload['session_id'] = session_id
+        if epochs:
+            payload.update(epochs)
 
         if not SECRET_KEY:
             raise ValueError("JWT_SECRET_KEY environment variable is not set")
@@ -360,7 +421,8 @@ def generate_access_token(user: Dict[str, Any], origin: Optional[str] = None, se
         raise
 
 
-def generate_refresh_token(user: Dict[str, Any], origin: Optional[str] = None, session_id: Optional[str] = None) -> str:
+def generate_refresh_token(user: Dict[str, Any], origin: Optional[str] = None, session_id: Optional[str] = None,
+                           epochs: Optional[Dict[str, int]] = None) -> str:
     """Generate long-lived refresh token (30 days)"""
     try:
         now = datetime.utcnow()
@@ -377,6 +439,8 @@ def generate_refresh_token(user: Dict[str, Any], origin: Optional[str] = None, s
             payload['origin'] = origin
         if session_id:
             payload['session_id'] = session_id
+        if epochs:
+            payload.update(epochs)
 
         if not SECRET_KEY:
             raise ValueError("JWT_SECRET_KEY environment variable is not set")
@@ -388,7 +452,8 @@ def generate_refresh_token(user: Dict[str, Any], origin: Optional[str] = None, s
         raise
 
 
-def generate_session_token(user: Dict[str, Any], origin: Optional[str] = None, session_id: Optional[str] = None) -> str:
+def generate_session_token(user: Dict[str, Any], origin: Optional[str] = None, session_id: Optional[str] = None,
+                           epochs: Optional[Dict[str, int]] = None) -> str:
     """Generate medium-lived session token (7 days)"""
     try:
         user_profile = _build_user_profile_payload(user)
@@ -414,6 +479,8 @@ def generate_session_token(user: Dict[str, Any], origin: Optional[str] = None, s
             payload['origin'] = origin
         if session_id:
             payload['session_id'] = session_id
+        if epochs:
+            payload.update(epochs)
 
         if not SECRET_KEY:
             raise ValueError("JWT_SECRET_KEY environment variable is not set")
@@ -425,24 +492,31 @@ def generate_session_token(user: Dict[str, Any], origin: Optional[str] = None, s
         raise
 
 
-def generate_all_tokens(user: Dict[str, Any], origin: Optional[str] = None, request: Optional[Request] = None) -> Dict[str, Any]:
+def generate_all_tokens(user: Dict[str, Any], origin: Optional[str] = None, request: Optional[Request] = None,
+                        session_id: Optional[str] = None, epochs: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
     """
     Generate all tokens (access, refresh, session) with session_id - Optimized for speed.
     Stateless approach - session_id is embedded in tokens, no database storage.
     Returns dict with tokens and session_id.
+
+    session_id: keep an existing session (token refresh); a new one is created by default
+    epochs: the user's and session's revocation epochs ({"uep": ..., "sep": ...}, see
+    session_manager.get_token_epochs), embedded in every token. Defaults to 0 for both,
+    which is only right for a user and session that were never revoked.
     """
     try:
         # Generate session_id once - this will be embedded in all tokens
-        session_id = str(uuid.uuid4())
+        session_id = session_id or str(uuid.uuid4())
+        epochs = {"uep": 0, "sep": 0, **(epochs or {})}
 
         # Generate all tokens in parallel (they're independent)
         # Access token is lightweight for faster generation
-        access_token = generate_access_token(user, origin=origin, session_id=session_id)
-        refresh_token = generate_refresh_token(user, origin=origin, session_id=session_id)
-        session_token = generate_session_token(user, origin=origin, session_id=session_id)
+        access_token = generate_access_token(user, origin=origin, session_id=session_id, epochs=epochs)
+        refresh_token = generate_refresh_token(user, origin=origin, session_id=session_id, epochs=epochs)
+        session_token = generate_session_token(user, origin=origin, session_id=session_id, epochs=epochs)
 
         # No database storage - tokens are stateless
-        # Session invalidation is handled via blacklist in cache
+        # Session invalidation is handled via revocation epochs in cache
 
         return {
             'access_token': access_token,
@@ -477,12 +551,14 @@ def authenticate_user_token(identifier: str, password: str, origin: Optional[str
         return None
 
 
-def authenticate_user_with_data(identifier: str, password: str, origin: Optional[str] = None, request: Optional[Request] = None) -> Optional[Dict[str, Any]]:
+def authenticate_user_with_data(identifier: str, password: str, origin: Optional[str] = None, request: Optional[Request] = None,
+                                epochs: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
     """
     Authenticate user and return all tokens (access, refresh, session) with user data.
     Creates a session in the database.
 
-    Also clears any user-level blacklist entries to allow new sessions after logout.
+    epochs: the user's current revocation epochs (see generate_all_tokens); required for users
+    that may have logged out before, whose tokens would otherwise be issued already revoked.
     """
     try:
         # Authenticate user
@@ -494,7 +570,7 @@ def authenticate_user_with_data(identifier: str, password: str, origin: Optional
         user_id = str(user.get('user_id'))
 
         # Generate all tokens and create session
-        tokens = generate_all_tokens(user, origin=origin, request=request)
+        tokens = generate_all_tokens(user, origin=origin, request=request, epochs=epochs)
 
         # Return tokens and user data
         return {
@@ -525,19 +601,7 @@ def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     """Get user by user_id"""
     try:
         with db as cursor:
-            # Only select columns that actually exist in the User table
-            query = """
-                SELECT user_id, email, password, first_name, last_name, user_name,
-                       phone_number, is_active, is_verified, status,
-                       profile_picture_url, country, dob, bio, theme,
-                       profile_accessibility, user_type, language, timezone,
-                       last_sign_in_at, email_verified_at, created_at, last_updated,
-                       is_protected, is_trashed, auth_type, invited_by_user_id
-                FROM public."user"
-                WHERE user_id::text = %s
-                LIMIT 1
-            """
-            cursor.execute(query, (str(user_id),))
+            cursor.execute_prepared(USER_BY_ID_STATEMENT, (uuid_param(user_id),))
             row = cursor.fetchone()
             if row:
                 return dict(row)
@@ -547,6 +611,20 @@ def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+async def get_user_by_id_async(user_id: str) -> Optional[Dict[str, Any]]:
+    """Async variant of get_user_by_id for request handlers (never blocks the event loop)"""
+    try:
+        async with db as cursor:
+            await cursor.execute_prepared(USER_BY_ID_STATEMENT, (uuid_param(user_id),))
+            row = await cursor.fetchone()
+            if row:
+                return dict(row)
+            return None
+    except Exception as e:
+        logger.error(f"Error fetching user by ID: {e}", exc_info=True, module="Auth", label="FETCH_USER_BY_ID")
+        return None
+
+
 def update_user_password(user_id: str, new_password: str) -> bool:
     """
     Update user's password in the database.
@@ -558,9 +636,9 @@ def update_user_password(user_id: str, new_password: str) -> bool:
             query = """
                 UPDATE public."user"
                 SET password = %s, last_updated = NOW()
-                WHERE user_id::text = %s
+                WHERE user_id = %s
             """
-            cursor.execute(query, (hashed_password, str(user_id)))
+            cursor.execute(query, (hashed_password, uuid_param(user_id)))
             return cursor.rowcount > 0
     except Exception as e:
         logger.error(f"Error updating password: {e}", exc_info=True, module="Auth", label="UPDATE_PASSWORD")
@@ -0,0 +1,136 @@
+"""
+Revocation filter - answers blacklist lookups of pre-epoch tokens without Redis
+
+Blacklist keys are no longer written (tokens carry revocation epochs); the ones left only
+expire. Tokens issued before epochs existed are still checked against them, and nearly every
+lookup misses. Each worker keeps a Bloom filter of the blacklist keys in Redis: a key the
+filter does not contain is not blacklisted, and only filter hits (real entries and false
+positives) are read from Redis. With the epochs in L1, most pre-epoch tokens are then
+validated without a round trip.
+
+- Built from Redis (SCAN) at startup and rebuilt every BLACKLIST_FILTER_REFRESH_SECONDS,
+  which drops expired keys and picks up keys written meanwhile (by instances still running
+  code that blacklists)
+- Sized for BLACKLIST_FILTER_CAPACITY keys (twice the keys found at the last build if that is
+  more) at BLACKLIST_FILTER_FP_RATE false positives, within BLACKLIST_FILTER_MAX_BYTES
+- Not used (every lookup goes to the cache) until it is built, after a failed rebuild, or
+  without Redis
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from src.cache.bloom import BloomFilter
+from src.cache.cache import cache
+from src.logger.logger import logger
+
+BLACKLIST_FILTER_ENABLED = os.environ.get('BLACKLIST_FILTER_ENABLED', 'true').lower() == 'true'
+BLACKLIST_FILTER_CAPACITY = int(os.environ.get('BLACKLIST_FILTER_CAPACITY', '100000'))
+BLACKLIST_FILTER_FP_RATE = float(os.environ.get('BLACKLIST_FILTER_FP_RATE', '0.001'))
+BLACKLIST_FILTER_MAX_BYTES = int(os.environ.get('BLACKLIST_FILTER_MAX_BYTES', str(1024 * 1024)))
+BLACKLIST_FILTER_REFRESH_SECONDS = int(os.environ.get('BLACKLIST_FILTER_REFRESH_SECONDS', '60'))
+
+# Keys loaded into the filter
+_MATCH = "blacklist:*"
+# Delay before retrying a failed build (seconds)
+_RETRY_DELAY = 5
+
+
+class RevocationFilter:
+    def __init__(self, capacity: int, fp_rate: float, max_bytes: int, refresh_seconds: int,
+                 enabled: bool = True):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self.enabled = enabled
+        self.filter: Optional[BloomFilter] = None
+        self.built_at: Optional[float] = None
+        self.rebuilds = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+        # Lookups answered here (not blacklisted) / passed on to the cache
+        self.skipped = 0
+        self.passed = 0
+
+    @property
+    def ready(self) -> bool:
+        """Whether a key missing from the filter is certainly not blacklisted"""
+        return self.enabled and self.filter is not None and cache.use_redis
+
+    def might_contain(self, key: str) -> bool:
+        """False only if key is certainly not blacklisted"""
+        if not self.ready:
+            return True
+        if key in self.filter:
+            self.passed += 1
+            return True
+        self.skipped += 1
+        return False
+
+    async def start(self):
+        """Build the filter and keep it current on the running event loop (once per worker, after cache.init())"""
+        if not self.enabled or not cache.use_redis or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        """Stop rebuilding (application shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def build(self):
+        """Load the blacklist keys from Redis into a new filter, then use it"""
+        capacity = max(self.capacity, 2 * len(self.filter)) if self.filter is not None else self.capacity
+        bloom = BloomFilter(capacity, self.fp_rate, self.max_bytes)
+        async for key in cache.scan_keys(_MATCH):
+            bloom.add(key)
+        self.filter = bloom
+        self.built_at = time.monotonic()
+        self.rebuilds += 1
+
+    async def _refresh_forever(self):
+        while True:
+            try:
+                await self.build()
+                delay = self.refresh_seconds
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A filter missing keys would answer "not blacklisted" for them
+                self.filter = None
+                self.failures += 1
+                delay = _RETRY_DELAY
+                logger.warning(f"Revocation filter build failed (blacklist lookups use the cache): {e}", module="Auth", label="TOKEN_BLACKLIST")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Filter occupancy and how many lookups it answered (this worker only)"""
+        lookups = self.skipped + self.passed
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "refresh_seconds": self.refresh_seconds,
+            "age_seconds": round(time.monotonic() - self.built_at, 1) if self.built_at is not None else None,
+            "rebuilds": self.rebuilds,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "passed": self.passed,
+            "skip_ratio": round(self.skipped / lookups, 4) if lookups else None,
+            **(self.filter.stats() if self.filter is not None else {}),
+        }
+
+
+revocation_filter = RevocationFilter(
+    BLACKLIST_FILTER_CAPACITY,
+    BLACKLIST_FILTER_FP_RATE,
+    BLACKLIST_FILTER_MAX_BYTES,
+    BLACKLIST_FILTER_REFRESH_SECONDS,
+    enabled=BLACKLIST_FILTER_ENABLED,
+)
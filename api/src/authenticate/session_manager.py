@@ -1,13 +1,15 @@
 """
-Session Manager - Handles token blacklisting for stateless authentication
+Session Manager - Handles token revocation for stateless authentication
 Multi-token session management with access_token, refresh_token, session_token, and session_id
-Uses cache (Redis or in-memory) for blacklisting instead of database storage
+Uses cache (Redis or in-memory) revocation epochs instead of database storage; the blacklist
+keys are only read, for tokens issued before epochs existed
 Optimized for fast and secure authentication
 """
 import os
-from typing import Optional
+from typing import Any, Dict, Optional
 import hashlib
 
+from src.authenticate.revocation_filter import revocation_filter
 from src.cache.cache import cache
 from src.logger.logger import logger
 
@@ -16,276 +18,159 @@ ACCESS_TOKEN_EXPIRY = int(os.environ.get('ACCESS_TOKEN_EXPIRY_MINUTES', '60'))
 SESSION_TOKEN_EXPIRY = int(os.environ.get('SESSION_TOKEN_EXPIRY_MINUTES', '10080'))  # 7 days
 REFRESH_TOKEN_EXPIRY = int(os.environ.get('REFRESH_TOKEN_EXPIRY_MINUTES', '43200'))  # 30 days
 
+# Blacklist lookups are kept in each worker's L1 cache only briefly: a revocation made by another
+# worker is seen here once the cached miss expires (seconds)
+BLACKLIST_L1_TTL = int(os.environ.get('BLACKLIST_L1_TTL_SECONDS', '5'))
+BLACKLIST_L1_NEGATIVE_TTL = int(os.environ.get('BLACKLIST_L1_NEGATIVE_TTL_SECONDS', '2'))
+cache.set_policy("blacklist:", l1_ttl=BLACKLIST_L1_TTL, negative_ttl=BLACKLIST_L1_NEGATIVE_TTL)
+
+# Revocation epochs: tokens carry the epochs of their user and session at issue time (uep / sep
+# claims), and bumping an epoch revokes every token issued before. One key per user or session
+# that was ever revoked, however many tokens they hold. Epochs rarely change, so workers keep
+# them (and their absence) in L1 and evict them on change through the cache invalidation channel.
+EPOCH_L1_TTL = int(os.environ.get('EPOCH_L1_TTL_SECONDS', '300'))
+cache.set_policy("epoch:", l1_ttl=EPOCH_L1_TTL, negative_ttl=EPOCH_L1_TTL, invalidated=True)
+# An epoch must outlive every token that carries an older one
+EPOCH_TTL = max(ACCESS_TOKEN_EXPIRY, SESSION_TOKEN_EXPIRY, REFRESH_TOKEN_EXPIRY) * 60
+
 
 def hash_token(token: str) -> str:
     """Create a hash of a token for blacklisting"""
     return hashlib.sha256(token.encode('utf-8')).hexdigest()
 
 
-async def blacklist_token(token: str, token_type: str = "access", expires_in_minutes: Optional[int] = None) -> bool:
-    """
-    Add a token to the blacklist.
-    token_type can be 'access', 'refresh', or 'session'
-    Returns True if successful, False otherwise.
-    """
-    try:
-        token_hash = hash_token(token)
-        blacklist_key = f"blacklist:{token_type}:{token_hash}"
-
-        # Set expiration based on token type if not provided
-        if expires_in_minutes is None:
-            if token_type == "access":
-                expires_in_minutes = ACCESS_TOKEN_EXPIRY
-            elif token_type == "session":
-                expires_in_minutes = SESSION_TOKEN_EXPIRY
-            else:  # refresh
-                expires_in_minutes = REFRESH_TOKEN_EXPIRY
-
-        # Store in cache with TTL (convert minutes to seconds)
-        ttl_seconds = expires_in_minutes * 60
-        await cache.set(blacklist_key, "1", ttl=ttl_seconds)
-
-        return True
-
-    except Exception as e:
-        logger.error(f"Error blacklisting token: {e}", exc_info=True, module="Auth", label="TOKEN_BLACKLIST")
-        return False
-
-
-async def is_token_blacklisted(token: str, token_type: str = "access") -> bool:
-    """
-    Check if a token is blacklisted.
-    Returns True if blacklisted, False otherwise.
-    """
-    try:
-        token_hash = hash_token(token)
-        blacklist_key = f"blacklist:{token_type}:{token_hash}"
-
-        result = await cache.get(blacklist_key)
-        return result is not None
-
-    except Exception as e:
-        logger.error(f"Error checking token blacklist: {e}", exc_info=True, module="Auth", label="TOKEN_BLACKLIST_CHECK")
-        # On error, assume not blacklisted to avoid blocking valid requests
-        return False
-
-
-async def blacklist_session(session_id: str, expires_in_minutes: Optional[int] = None) -> bool:
-    """
-    Blacklist a session by session_id.
-    This will invalidate all tokens associated with this session.
-    """
-    try:
-        blacklist_key = f"blacklist:session:{session_id}"
-
-        # Default to refresh token expiry (longest)
-        if expires_in_minutes is None:
-            expires_in_minutes = REFRESH_TOKEN_EXPIRY
+# Blacklist keys (read only: checked for tokens issued without epochs)
+def _token_key(token: str, token_type: str) -> str:
+    return f"blacklist:{token_type}:{hash_token(token)}"
 
-        ttl_seconds = expires_in_minutes * 60
-        await cache.set(blacklist_key, "1", ttl=ttl_seconds)
 
-        return True
+def _jti_key(token_jti: str) -> str:
+    return f"blacklist:access:jti:{token_jti}"
 
-    except Exception as e:
-        logger.error(f"Error blacklisting session: {e}", exc_info=True, module="Auth", label="SESSION_BLACKLIST")
-        return False
 
+def _session_key(session_id: str) -> str:
+    return f"blacklist:session:{session_id}"
 
-async def is_session_blacklisted(session_id: str) -> bool:
-    """
-    Check if a session is blacklisted.
-    Returns True if blacklisted, False otherwise.
-    """
-    try:
-        blacklist_key = f"blacklist:session:{session_id}"
-        result = await cache.get(blacklist_key)
-        return result is not None
 
-    except Exception as e:
-        logger.error(f"Error checking session blacklist: {e}", exc_info=True, module="Auth", label="SESSION_BLACKLIST_CHECK")
-        # On error, assume not blacklisted to avoid blocking valid requests
-        return False
+def _user_key(user_id: str) -> str:
+    return f"blacklist:user:{user_id}"
 
 
-async def blacklist_all_user_sessions(user_id: str, expires_in_minutes: Optional[int] = None) -> int:
-    """
-    Blacklist all sessions for a user by storing a user-level blacklist entry.
-    This is a pattern-based approach - we'll check user_id in token validation.
-    Returns 1 if successful (we track it as a single operation).
-    """
-    try:
-        blacklist_key = f"blacklist:user:{user_id}"
-
-        if expires_in_minutes is None:
-            expires_in_minutes = REFRESH_TOKEN_EXPIRY
+def _user_refresh_key(user_id: str) -> str:
+    return f"blacklist:refresh:user:{user_id}"
 
-        ttl_seconds = expires_in_minutes * 60
-        await cache.set(blacklist_key, "1", ttl=ttl_seconds)
 
-        return 1
-
-    except Exception as e:
-        logger.error(f"Error blacklisting user sessions: {e}", exc_info=True, module="Auth", label="USER_SESSIONS_BLACKLIST")
-        return 0
+# Epoch keys
+def _user_epoch_key(user_id: str) -> str:
+    return f"epoch:user:{user_id}"
 
 
-async def is_user_blacklisted(user_id: str) -> bool:
-    """
-    Check if all sessions for a user are blacklisted.
-    Returns True if blacklisted, False otherwise.
-    """
-    try:
-        blacklist_key = f"blacklist:user:{user_id}"
-        result = await cache.get(blacklist_key)
-        return result is not None
-
-    except Exception as e:
-        logger.error(f"Error checking user blacklist: {e}", exc_info=True, module="Auth", label="USER_BLACKLIST_CHECK")
-        return False
+def _session_epoch_key(session_id: str) -> str:
+    return f"epoch:session:{session_id}"
 
 
-async def clear_user_blacklist(user_id: str) -> bool:
+async def check_revocations(token: str, payload: Dict[str, Any]) -> Optional[str]:
     """
-    Clear/remove user-level blacklist entry.
-    This allows the user to create new sessions after logout.
+    Run every revocation check of a decoded token in one cache round trip (none when the
+    epochs are in L1).
 
-    Args:
-        user_id: User ID whose blacklist should be cleared
+    Tokens carrying epochs (uep claim) are revoked when the user's or session's epoch has moved
+    past theirs. Tokens issued before epochs existed are also checked against the blacklist
+    keys, in this order: the token itself, its JTI (access tokens), its session, the user's
+    sessions (not for refresh tokens) and the user's refresh tokens. Only keys the revocation
+    filter may contain are read.
 
     Returns:
-        True if successful, False otherwise
+        The first check that matched ("token", "jti", "session", "user" or "user_refresh"),
+        or None if the token is not revoked
     """
     try:
-        blacklist_key = f"blacklist:user:{user_id}"
-        await cache.delete(blacklist_key)
-
-        return True
+        token_type = payload.get("type", "access")
+        session_id = payload.get("session_id")
+        user_id = payload.get("sub")
+        user_check = "user_refresh" if token_type == "refresh" else "user"
+
+        checks = []
+        if "uep" not in payload:
+            token_jti = payload.get("jti") if token_type == "access" else None
+            checks.append(("token", _token_key(token, token_type)))
+            if token_jti:
+                checks.append(("jti", _jti_key(token_jti)))
+            if session_id:
+                checks.append(("session", _session_key(session_id)))
+            if user_id:
+                if token_type != "refresh":
+                    checks.append(("user", _user_key(user_id)))
+                checks.append(("user_refresh", _user_refresh_key(user_id)))
+            # Keys the revocation filter rules out are not read
+            checks = [(check, key) for check, key in checks if revocation_filter.might_contain(key)]
+
+        # (check, key, epoch the token was issued with)
+        epoch_checks = []
+        if session_id:
+            epoch_checks.append(("session", _session_epoch_key(session_id), int(payload.get("sep", 0))))
+        if user_id:
+            epoch_checks.append((user_check, _user_epoch_key(user_id), int(payload.get("uep", 0))))
+
+        values = await cache.get_many([key for _, key in checks] + [key for _, key, _ in epoch_checks])
+        for check, key in checks:
+            if values.get(key) is not None:
+                return check
+        for check, key, issued in epoch_checks:
+            current = values.get(key)
+            if current is not None and int(current) > issued:
+                return check
+        return None
 
     except Exception as e:
-        logger.error(f"Error clearing user blacklist: {e}", exc_info=True, module="Auth", label="CLEAR_USER_BLACKLIST")
-        return False
+        logger.error(f"Error checking token revocations: {e}", exc_info=True, module="Auth", label="TOKEN_BLACKLIST_CHECK")
+        # On error, assume not revoked to avoid blocking valid requests
+        return None
 
 
-async def clear_user_refresh_token_blacklist(user_id: str) -> bool:
+async def get_token_epochs(user_id: str, session_id: Optional[str] = None) -> Dict[str, int]:
     """
-    Clear/remove user-level refresh token blacklist entry.
-    This allows the user to use refresh tokens after logout.
-
-    Args:
-        user_id: User ID whose refresh token blacklist should be cleared
+    Current revocation epochs to embed in new tokens (see checkpoint.generate_all_tokens).
 
     Returns:
-        True if successful, False otherwise
+        {"uep": user epoch, "sep": session epoch}; 0 for never revoked, and for a new session
     """
-    try:
-        # Check the actual key format used in revoke_all_user_refresh_tokens
-        blacklist_key = f"blacklist:user_refresh_revoke:{user_id}"
-        await cache.delete(blacklist_key)
-
-        return True
-
-    except Exception as e:
-        logger.error(f"Error clearing user refresh token blacklist: {e}", exc_info=True, module="Auth", label="CLEAR_REFRESH_BLACKLIST")
-        return False
+    keys = [_user_epoch_key(user_id)]
+    if session_id:
+        keys.append(_session_epoch_key(session_id))
+    values = await cache.get_many(keys)
+    return {
+        "uep": int(values[_user_epoch_key(user_id)] or 0),
+        "sep": int(values.get(_session_epoch_key(session_id)) or 0) if session_id else 0,
+    }
 
 
-async def blacklist_access_token_by_jti(token_jti: str, user_id: str, expires_in_seconds: Optional[int] = None) -> bool:
+async def revoke_user_tokens(user_id: str) -> bool:
     """
-    Blacklist an access token by its JTI (JWT ID).
-    This is more efficient than hashing the entire token.
-
-    Args:
-        token_jti: JWT ID from the token payload
-        user_id: User ID for logging purposes
-        expires_in_seconds: Optional expiration time in seconds (defaults to access token expiry)
-
-    Returns:
-        True if successful, False otherwise
-    """
-    try:
-        if not token_jti:
-            logger.warning(f"No JTI provided for blacklisting access token for user {user_id}", module="Auth", label="TOKEN_BLACKLIST_JTI")
-            return False
-
-        blacklist_key = f"blacklist:access:jti:{token_jti}"
-
-        # Default to access token expiry (convert minutes to seconds)
-        if expires_in_seconds is None:
-            expires_in_seconds = ACCESS_TOKEN_EXPIRY * 60
-
-        await cache.set(blacklist_key, "1", ttl=expires_in_seconds)
-
-        return True
-
-    except Exception as e:
-        logger.error(f"Error blacklisting access token by JTI: {e}", exc_info=True, module="Auth", label="TOKEN_BLACKLIST_JTI")
-        return False
+    Revoke every access, refresh and session token of the user issued so far (logout):
+    one epoch bump, whatever the number of tokens.
 
-
-async def is_access_token_blacklisted_by_jti(token_jti: str) -> bool:
-    """
-    Check if an access token is blacklisted by its JTI.
-
-    Args:
-        token_jti: JWT ID from the token payload
-
-    Returns:
-        True if blacklisted, False otherwise
-    """
-    try:
-        if not token_jti:
-            return False
-
-        blacklist_key = f"blacklist:access:jti:{token_jti}"
-        result = await cache.get(blacklist_key)
-        return result is not None
-
-    except Exception as e:
-        logger.error(f"Error checking access token blacklist by JTI: {e}", exc_info=True, module="Auth", label="TOKEN_BLACKLIST_CHECK_JTI")
-        return False
-
-
-async def revoke_all_user_refresh_tokens(user_id: str) -> bool:
-    """
-    Revoke all refresh tokens for a user by blacklisting them.
-    This is done by storing a user-level refresh token blacklist entry.
-
-    Args:
-        user_id: User ID whose refresh tokens should be revoked
-
-    Returns:
-        True if successful, False otherwise
+    Returns True if successful, False otherwise.
     """
     try:
-        blacklist_key = f"blacklist:refresh:user:{user_id}"
-
-        # Use refresh token expiry (longest)
-        ttl_seconds = REFRESH_TOKEN_EXPIRY * 60
-        await cache.set(blacklist_key, "1", ttl=ttl_seconds)
-
+        await cache.bump(_user_epoch_key(user_id), ttl=EPOCH_TTL)
         return True
 
     except Exception as e:
-        logger.error(f"Error revoking all refresh tokens for user: {e}", exc_info=True, module="Auth", label="REVOKE_REFRESH_TOKENS")
+        logger.error(f"Error revoking user tokens: {e}", exc_info=True, module="Auth", label="LOGOUT")
         return False
 
 
-async def is_user_refresh_token_revoked(user_id: str) -> bool:
+async def revoke_session_tokens(session_id: str) -> Optional[int]:
     """
-    Check if all refresh tokens for a user have been revoked.
-
-    Args:
-        user_id: User ID to check
+    Revoke every token of a session issued so far (refresh token rotation).
 
     Returns:
-        True if revoked, False otherwise
+        The session's new epoch, for the tokens that replace them, or None on failure
     """
     try:
-        blacklist_key = f"blacklist:refresh:user:{user_id}"
-        result = await cache.get(blacklist_key)
-        return result is not None
+        return await cache.bump(_session_epoch_key(session_id), ttl=EPOCH_TTL)
 
     except Exception as e:
-        logger.error(f"Error checking user refresh token revocation: {e}", exc_info=True, module="Auth", label="CHECK_REFRESH_REVOKED")
-        return False
+        logger.error(f"Error revoking session tokens: {e}", exc_info=True, module="Auth", label="TOKEN_BLACKLIST")
+        return None
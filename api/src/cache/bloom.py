@@ -0,0 +1,63 @@
+"""
+Bloom filter: a fixed-size set of strings that answers "certainly absent" or "maybe present"
+
+Sized from the number of items it should hold (capacity) and the false-positive rate wanted
+at that fill, within max_bytes. A smaller max_bytes keeps memory bounded at the cost of a
+higher false-positive rate. Items cannot be removed: rebuild the filter to drop them.
+Positions come from one 128-bit BLAKE2b digest split in two (double hashing).
+"""
+import hashlib
+import math
+from typing import Any, Dict, Iterator
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float, max_bytes: int):
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        bits = math.ceil(-self.capacity * math.log(fp_rate) / math.log(2) ** 2)
+        self.size = max(64, min(bits, max_bytes * 8))
+        # Optimal number of hash functions for this size and capacity
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        # Items added (those already present are not counted again)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> bool:
+        """Add item; False if it was (maybe) present already"""
+        added = False
+        for position in self._positions(item):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def expected_fp_rate(self) -> float:
+        """False-positive rate at the current fill"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": self.count,
+            "capacity": self.capacity,
+            "bytes": len(self._bits),
+            "hashes": self.hashes,
+            "target_fp_rate": self.fp_rate,
+            "expected_fp_rate": round(self.expected_fp_rate, 6),
+        }
@@ -1,7 +1,11 @@
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, NamedTuple, Optional, Union
+from src.cache.local_cache import LocalCache
 from src.logger.logger import logger
 import asyncio
+import fnmatch
+import json
 import os
+import time
 
 try:
     import redis.asyncio as redis
@@ -9,6 +13,65 @@ try:
 except ImportError:
     REDIS_AVAILABLE = False
 
+# Redis clients inherited from a parent process (gunicorn --preload). They are kept
+# referenced so their sockets, shared with the parent, are never closed by the child.
+_inherited_clients = []
+
+# L1: in-process LRU in front of Redis (per worker)
+L1_MAX_ENTRIES = int(os.environ.get("CACHE_L1_MAX_ENTRIES", 10000))
+L1_MAX_BYTES = int(os.environ.get("CACHE_L1_MAX_BYTES", 16 * 1024 * 1024))
+# In-memory store used when Redis is unavailable
+LOCAL_MAX_ENTRIES = int(os.environ.get("CACHE_LOCAL_MAX_ENTRIES", 100000))
+LOCAL_MAX_BYTES = int(os.environ.get("CACHE_LOCAL_MAX_BYTES", 64 * 1024 * 1024))
+# Pub/sub channel on which writes to keys with invalidated policies are announced to all workers
+INVALIDATION_CHANNEL = os.environ.get("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+
+# Sets KEYS[1] to the Redis server time in microseconds, or to its current value + 1 if that is
+# not lower, and returns it. Values only grow, even after the key expired or was evicted.
+# (%.0f: Lua numbers are doubles, exact for integers below 2^53, about 285 years of microseconds)
+_BUMP_SCRIPT = """
+local now = redis.call('TIME')
+local value = tonumber(now[1]) * 1000000 + tonumber(now[2])
+local current = tonumber(redis.call('GET', KEYS[1]))
+if current and current >= value then
+    value = current + 1
+end
+value = string.format('%.0f', value)
+redis.call('SET', KEYS[1], value, 'EX', ARGV[1])
+return value
+"""
+
+
+class CachePolicy(NamedTuple):
+    """
+    How long a key namespace is kept in L1, in seconds (0 = not at all)
+
+    l1_ttl: values read from or written to Redis
+    negative_ttl: misses (keys Redis has no value for)
+    invalidated: writes are announced on INVALIDATION_CHANNEL and evict the key from every
+        worker's L1; while a worker is not subscribed, it reads these keys from Redis
+
+    Otherwise other workers' writes are only seen once the L1 entry expires, so keys that must
+    change quickly everywhere need short TTLs (or invalidation); reference data can use long ones.
+    With invalidation, the TTL only bounds how long a lost announcement can go unnoticed.
+    Keys without a policy are not kept in L1 (CACHE_L1_TTL = 0): namespaces opt in with
+    set_policy(), since a stale value of a single-use key (an OTP) would stay valid for a while.
+    """
+    l1_ttl: int
+    negative_ttl: int = 0
+    invalidated: bool = False
+
+
+# What L1 does for invalidated keys while the invalidation listener is down
+_NO_L1 = CachePolicy(0, 0)
+
+
+DEFAULT_POLICY = CachePolicy(
+    l1_ttl=int(os.environ.get("CACHE_L1_TTL", 0)),
+    negative_ttl=int(os.environ.get("CACHE_L1_NEGATIVE_TTL", 0)),
+)
+
+
 class Cache:
     def __init__(
         self,
@@ -18,29 +81,146 @@ class Cache:
         default_ttl: int = int(os.environ.get("REDIS_DEFAULT_TTL", 600)),
     ):
         """
-        Hybrid Cache: Uses Redis if available, else falls back to in-memory dict.
+        Hybrid Cache: Uses Redis if available, else falls back to an in-memory store.
         default_ttl: default cache time in seconds (default 600s = 10 minutes)
+
+        With Redis, reads go through a bounded in-process L1 first; how long keys stay there
+        is set per key prefix with set_policy().
         """
         self.default_ttl = default_ttl
         self.redis = None
         self.use_redis = False
-        self.local_cache = {}
+        self.local_cache = LocalCache(LOCAL_MAX_ENTRIES, LOCAL_MAX_BYTES)
+        self.l1 = LocalCache(L1_MAX_ENTRIES, L1_MAX_BYTES)
+        self.policies: Dict[str, CachePolicy] = {}
+        self._prefixes = []
+        # Bumped by every local write and received invalidation: a read that awaited Redis across
+        # one must not put what it read into L1 (it may predate the write)
+        self._writes = 0
+        self._redis_params = {"host": host, "port": port, "db": db}
+        self._pid = os.getpid()
+        self._bump_script = None
+        # Invalidation listener (one task per worker) and whether it is subscribed
+        self._listener: Optional[asyncio.Task] = None
+        self.listening = False
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
 
         if REDIS_AVAILABLE:
-            self.redis = redis.Redis(host=host, port=port, db=db, decode_responses=True)
+            self.redis = self._create_client()
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=self._after_fork)
+
+    def _create_client(self):
+        self._bump_script = None
+        return redis.Redis(**self._redis_params, decode_responses=True)
+
+    def _after_fork(self):
+        """Give each forked worker its own Redis client instead of the parent's sockets."""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        if self.redis is not None:
+            _inherited_clients.append(self.redis)
+            self.redis = self._create_client()
+        # The parent's listener task does not run here
+        self._listener = None
+        self.listening = False
 
     async def init(self):
         """Check Redis availability at startup."""
+        self._after_fork()
         if self.redis:
             try:
                 await self.redis.ping()
                 self.use_redis = True
+                if self._listener is None or self._listener.done():
+                    self._listener = asyncio.create_task(self._listen())
             except Exception:
                 self.use_redis = False
-                self.local_cache = {}
+                self.local_cache.clear()
                 logger.warning("Redis not available, falling back to in-memory cache.", module="Cache", label="CACHE")
         else:
-            self.local_cache = {}
+            self.local_cache.clear()
+        self.l1.clear()
+
+    async def close(self):
+        """Stop the invalidation listener (application shutdown)"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+        self.listening = False
+
+    async def _listen(self):
+        """Evict keys announced on INVALIDATION_CHANNEL from L1; resubscribes after errors."""
+        delay = 1
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Announcements made while not subscribed were missed
+                self._drop_invalidated()
+                self.listening = True
+                delay = 1
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.invalidations_received += 1
+                        self._writes += 1
+                        for key in json.loads(message["data"]):
+                            self.l1.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener disconnected: {e}", module="Cache", label="CACHE")
+            finally:
+                self.listening = False
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def _drop_invalidated(self):
+        """Forget L1 entries of keys with invalidated policies"""
+        prefixes = tuple(prefix for prefix, policy in self.policies.items() if policy.invalidated)
+        if prefixes:
+            self.l1.delete_matching(lambda key: key.startswith(prefixes))
+
+    async def _announce(self, keys: Iterable[str]):
+        """Tell the other workers to evict the keys with invalidated policies among keys"""
+        keys = [key for key in keys if self.policy(key, effective=False).invalidated]
+        if not keys:
+            return
+        try:
+            await self.redis.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+            self.invalidations_sent += 1
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish failed: {e}", module="Cache", label="CACHE")
+
+    def set_policy(self, prefix: str, l1_ttl: int, negative_ttl: int = 0, invalidated: bool = False):
+        """
+        L1 policy for keys starting with prefix (the longest matching prefix wins)
+
+        Example:
+            cache.set_policy("blacklist:", l1_ttl=5, negative_ttl=2)
+        """
+        self.policies[prefix] = CachePolicy(l1_ttl, negative_ttl, invalidated)
+        self._prefixes = sorted(self.policies, key=len, reverse=True)
+
+    def policy(self, key: str, effective: bool = True) -> CachePolicy:
+        """L1 policy of key; unless effective is False, none for invalidated keys while not listening"""
+        for prefix in self._prefixes:
+            if key.startswith(prefix):
+                policy = self.policies[prefix]
+                if effective and policy.invalidated and not self.listening:
+                    return _NO_L1
+                return policy
+        return DEFAULT_POLICY
 
     async def set(self, key: str, value: Any, ttl: Optional[int] = None):
         ttl = ttl or self.default_ttl
@@ -51,6 +231,9 @@ class Cache:
                 except Exception as e:
                     logger.warning(f"Redis delete failed (non-critical): {e}", module="Cache", label="CACHE")
                 await self.redis.set(key, value, ex=ttl)
+                self._writes += 1
+                self._write_l1(key, value, ttl)
+                await self._announce([key])
                 return  # Successfully set in Redis
             except Exception as e:
                 logger.warning(f"Redis set failed, falling back to in-memory cache: {e}", module="Cache", label="CACHE")
@@ -58,43 +241,178 @@ class Cache:
                 # Fall through to in-memory cache
         # Use in-memory cache (either Redis not available or Redis failed)
         try:
-            self.local_cache[key] = {"value": value, "ttl": ttl, "set_time": asyncio.get_event_loop().time()}
+            self.local_cache.set(key, value, ttl)
         except Exception as e:
             logger.error(f"Failed to set value in in-memory cache: {e}", module="Cache", label="CACHE")
             raise
 
     async def get(self, key: str) -> Any:
         if self.use_redis:
+            policy = self.policy(key)
+            if policy.l1_ttl or policy.negative_ttl:
+                found, value = self.l1.lookup(key)
+                if found:
+                    return value
+            writes = self._writes
             try:
-                return await self.redis.get(key)
+                value = await self.redis.get(key)
             except Exception:
                 logger.error("Redis get failed, falling back to in-memory cache.", module="Cache", label="CACHE")
                 self.use_redis = False
                 return await self.get(key)
+            if writes == self._writes:
+                self._read_l1(key, value, policy)
+            return value
         else:
-            item = self.local_cache.get(key)
-            if not item:
-                return None
-            # Check TTL
-            if item["ttl"] is not None:
-                elapsed = asyncio.get_event_loop().time() - item["set_time"]
-                if elapsed > item["ttl"]:
-                    await self.delete(key)
-                    return None
-            return item["value"]
+            return self.local_cache.get(key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Values of several keys in one round trip (L1, then one MGET for the rest)
+
+        Returns {key: value} in the order of keys; missing keys map to None.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not self.use_redis:
+            return {key: self.local_cache.get(key) for key in keys}
+        values = {}
+        remote = []
+        for key in keys:
+            policy = self.policy(key)
+            if policy.l1_ttl or policy.negative_ttl:
+                found, value = self.l1.lookup(key)
+                if found:
+                    values[key] = value
+                    continue
+            remote.append(key)
+        if remote:
+            writes = self._writes
+            try:
+                fetched = await self.redis.mget(remote)
+            except Exception:
+                logger.error("Redis mget failed, falling back to in-memory cache.", module="Cache", label="CACHE")
+                self.use_redis = False
+                return await self.get_many(keys)
+            for key, value in zip(remote, fetched):
+                values[key] = value
+                if writes == self._writes:
+                    self._read_l1(key, value, self.policy(key))
+        return {key: values[key] for key in keys}
+
+    async def scan_keys(self, match: str, count: int = 1000) -> AsyncIterator[str]:
+        """Keys matching a glob-style pattern, without blocking Redis (SCAN, count keys per call)"""
+        if self.use_redis:
+            async for key in self.redis.scan_iter(match=match, count=count):
+                yield key
+        else:
+            for key in self.local_cache.keys():
+                if fnmatch.fnmatchcase(key, match):
+                    yield key
+
+    async def set_many(self, items: Dict[str, Any], ttl: Union[int, Dict[str, int], None] = None):
+        """
+        Set several keys in one round trip (pipelined SETs)
+
+        ttl is one TTL for all keys or {key: ttl}; keys without one get default_ttl.
+        """
+        if not items:
+            return
+        ttls = {key: (ttl.get(key) if isinstance(ttl, dict) else ttl) or self.default_ttl for key in items}
+        if self.use_redis:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key, value in items.items():
+                        pipe.set(key, value, ex=ttls[key])
+                    await pipe.execute()
+                self._writes += 1
+                for key, value in items.items():
+                    self._write_l1(key, value, ttls[key])
+                await self._announce(items)
+                return
+            except Exception as e:
+                logger.warning(f"Redis pipeline set failed, falling back to in-memory cache: {e}", module="Cache", label="CACHE")
+                self.use_redis = False
+        for key, value in items.items():
+            self.local_cache.set(key, value, ttls[key])
+
+    async def bump(self, key: str, ttl: Optional[int] = None) -> int:
+        """
+        Move a counter stored at key forward and return its new value (atomic)
+
+        The value is the current time in microseconds (Redis server time), or the previous value
+        + 1 if that is not lower: it grows even across expiry, eviction or a flush, unlike INCR,
+        so a value handed out before is never handed out again. Used for revocation epochs.
+        """
+        ttl = ttl or self.default_ttl
+        if self.use_redis:
+            try:
+                if self._bump_script is None:
+                    self._bump_script = self.redis.register_script(_BUMP_SCRIPT)
+                value = int(await self._bump_script(keys=[key], args=[ttl]))
+                self._writes += 1
+                self._write_l1(key, str(value), ttl)
+                await self._announce([key])
+                return value
+            except Exception as e:
+                logger.warning(f"Redis bump failed, falling back to in-memory cache: {e}", module="Cache", label="CACHE")
+                self.use_redis = False
+        value = max(time.time_ns() // 1000, int(self.local_cache.get(key) or 0) + 1)
+        self.local_cache.set(key, str(value), ttl)
+        return value
+
+    def _read_l1(self, key: str, value: Any, policy: CachePolicy):
+        """Keep what Redis returned for key in L1 as its policy allows"""
+        if value is not None:
+            if policy.l1_ttl:
+                self.l1.set(key, value, policy.l1_ttl)
+        elif policy.negative_ttl:
+            self.l1.set_missing(key, policy.negative_ttl)
+
+    def _write_l1(self, key: str, value: Any, ttl: int):
+        """Mirror a value just written to Redis in L1 (never past its Redis TTL)"""
+        l1_ttl = self.policy(key).l1_ttl
+        if l1_ttl:
+            self.l1.set(key, value, min(ttl, l1_ttl))
+        else:
+            self.l1.delete(key)
 
     async def delete(self, key: str):
+        self._writes += 1
+        self.l1.delete(key)
         if self.use_redis:
             try:
                 await self.redis.delete(key)
+                await self._announce([key])
             except Exception:
                 logger.error("Redis delete failed, using in-memory cache.", module="Cache", label="CACHE")
                 self.use_redis = False
                 await self.delete(key)
         else:
-            self.local_cache.pop(key, None)
+            self.local_cache.delete(key)
+
+    async def delete_many(self, keys: Iterable[str]):
+        """Delete several keys in one round trip (one DEL)"""
+        keys = list(keys)
+        if not keys:
+            return
+        self._writes += 1
+        for key in keys:
+            self.l1.delete(key)
+        if self.use_redis:
+            try:
+                await self.redis.delete(*keys)
+                await self._announce(keys)
+            except Exception:
+                logger.error("Redis delete failed, using in-memory cache.", module="Cache", label="CACHE")
+                self.use_redis = False
+                await self.delete_many(keys)
+        else:
+            for key in keys:
+                self.local_cache.delete(key)
 
     async def clear(self):
+        self._writes += 1
+        self.l1.clear()
         if self.use_redis:
             try:
                 await self.redis.flushdb()
@@ -105,6 +423,24 @@ class Cache:
         else:
             self.local_cache.clear()
 
+    def stats(self) -> Dict[str, Any]:
+        """Backend in use, L1 / in-memory store counters and L1 policies (this worker only)"""
+        return {
+            "backend": "redis" if self.use_redis else "memory",
+            "l1": self.l1.stats(),
+            "invalidation": {
+                "channel": INVALIDATION_CHANNEL,
+                "listening": self.listening,
+                "sent": self.invalidations_sent,
+                "received": self.invalidations_received,
+            },
+            "local": self.local_cache.stats(),
+            "policies": {
+                "default": DEFAULT_POLICY._asdict(),
+                **{prefix: policy._asdict() for prefix, policy in self.policies.items()},
+            },
+        }
+
 
 # Create cache instance using dynamic environment variables
 cache = Cache(default_ttl=600)
@@ -0,0 +1,117 @@
+"""
+In-process cache: a bounded LRU with per-key TTL
+
+Used as the L1 in front of Redis and as the store when Redis is unavailable. Once more than
+max_entries entries or max_bytes (approximate, from sys.getsizeof) are held, the least recently
+used entries are evicted. Misses can be cached too (negative entries), so repeated lookups of
+absent keys stay in-process. Not thread-safe: use it from the event loop.
+"""
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Marks a cached miss
+_NEGATIVE = object()
+
+# Approximate bytes per entry besides its key and value (dict slot, linked list node, tuple)
+_ENTRY_OVERHEAD = 150
+
+
+class LocalCache:
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, expires_at or None, size)
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """(found, value); value is None for cached misses"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        if entry[0] is _NEGATIVE:
+            self.negative_hits += 1
+            return True, None
+        self.hits += 1
+        return True, entry[0]
+
+    def get(self, key: str) -> Any:
+        """Cached value, or None"""
+        return self.lookup(key)[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Cache value for ttl seconds (None: until evicted)"""
+        if ttl is not None and ttl <= 0:
+            self.delete(key)
+            return
+        size = _ENTRY_OVERHEAD + sys.getsizeof(key) + (0 if value is _NEGATIVE else sys.getsizeof(value))
+        self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, None if ttl is None else time.monotonic() + ttl, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def set_missing(self, key: str, ttl: float):
+        """Remember for ttl seconds that key has no value"""
+        self.set(key, _NEGATIVE, ttl)
+
+    def delete(self, key: str) -> bool:
+        return self._remove(key)
+
+    def keys(self) -> List[str]:
+        """Keys held, expired ones included until they are looked up or evicted"""
+        return list(self._entries)
+
+    def delete_matching(self, predicate: Callable[[str], bool]) -> int:
+        """Delete the keys predicate returns True for; returns how many"""
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.bytes -= entry[2]
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy and hit / miss / eviction counters"""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -65,6 +65,9 @@ class ActivityLog(Base):
         Index('ix_activity_log_ip_address', 'ip_address'),
         Index('ix_activity_log_request_id', 'request_id'),
         Index('ix_activity_log_session_id', 'session_id'),
+        # Keyset pagination (ORDER BY created_at, log_id), overall and per user
+        Index('ix_activity_log_created_at_log_id', 'created_at', 'log_id'),
+        Index('ix_activity_log_user_id_created_at_log_id', 'user_id', 'created_at', 'log_id'),
     )
 
     def __repr__(self):
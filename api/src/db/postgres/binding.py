@@ -0,0 +1,70 @@
+"""
+Typed Parameters
+Bind values with their Postgres type instead of casting columns in SQL
+
+- uuid.UUID values are sent as '...'::uuid, so `WHERE user_id = %s` compares the uuid column
+  itself and can use its primary / foreign key index. Casting the column instead
+  (`user_id::text = %s`) hides it from the index and turns every lookup into a sequential scan
+- uuid_param() validates ids that come from clients: a value that is not a UUID becomes NULL,
+  which matches no row (as the text comparison did) instead of failing the statement with
+  "invalid input syntax for type uuid" and aborting the transaction
+- array_literal() binds a list as one untyped array literal ('{...}') for `= ANY(%s)`: Postgres
+  types it like the column it is compared with, as it does for single string parameters,
+  and the SQL text no longer depends on the number of values
+"""
+import datetime
+import uuid
+from decimal import Decimal
+from typing import Any, Iterable, List, Optional
+
+from psycopg2.extensions import register_adapter
+from psycopg2.extras import UUID_adapter
+
+# Adapter only: uuid columns are still returned as strings
+register_adapter(uuid.UUID, UUID_adapter)
+
+
+def uuid_param(value: Any) -> Optional[uuid.UUID]:
+    """
+    Parameter for a uuid column; None (matches no row) when value is not a UUID
+
+    Example:
+        cursor.execute('SELECT * FROM public."user" WHERE user_id = %s', (uuid_param(user_id),))
+    """
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def uuid_params(values: Iterable[Any]) -> List[uuid.UUID]:
+    """uuid[] parameter for `column = ANY(%s)`; values that are not UUIDs are left out"""
+    return [value for value in map(uuid_param, values) if value is not None]
+
+
+# Values whose str() is valid Postgres input for the matching column type
+_ARRAY_ELEMENT_TYPES = (str, int, float, Decimal, uuid.UUID, datetime.date, datetime.time)
+
+
+def array_literal(values: Iterable[Any]) -> Optional[str]:
+    """
+    Untyped Postgres array literal for `column = ANY(%s)` / `column <> ALL(%s)`
+
+    Returns None when an element has no plain text form (bytes, dicts, lists, adapters...);
+    bind such lists one placeholder per value instead.
+
+    Example:
+        cursor.execute("SELECT * FROM activity_log WHERE level = ANY(%s)", (array_literal(levels),))
+    """
+    items = []
+    for value in values:
+        if value is None:
+            items.append("NULL")
+        elif isinstance(value, _ARRAY_ELEMENT_TYPES):
+            text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{text}"')
+        else:
+            return None
+    return "{" + ",".join(items) + "}"
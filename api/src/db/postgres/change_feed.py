@@ -0,0 +1,364 @@
+"""
+Change Feed
+Row changes on the group and permission tables, broadcast to every worker with LISTEN / NOTIFY
+
+- An AFTER INSERT / UPDATE / DELETE trigger per table (registered through the TriggerManager,
+  see init_triggers.py) sends the changed row's key columns on DB_CHANGE_FEED_CHANNEL.
+  Postgres delivers notifications when the writing transaction commits and drops them when it
+  rolls back, so subscribers never see uncommitted changes
+- Each worker runs one listener task on a dedicated connection to the primary (not from the
+  pool: LISTEN keeps its connection for the life of the worker) and dispatches the events to
+  subscribed callbacks, e.g. to evict cache entries (see the permission cache in
+  src/permissions/permissions.py). Workers without subscribers do not listen
+- Bursts are debounced and coalesced: events are collected until DB_CHANGE_FEED_DEBOUNCE_MS
+  pass without a new one (at most DB_CHANGE_FEED_MAX_DELAY_MS after the first), a row changed
+  several times is delivered once, and a table with more than DB_CHANGE_FEED_MAX_KEYS changed
+  rows in one batch is delivered as a single RESET event (any row of the table may have changed)
+- Notifications sent while the listener is disconnected are lost: after reconnecting it
+  delivers a RESET for every table. `change_feed.live` tells whether changes are currently
+  being received; caches should fall back to short TTLs when it is False
+- DB_CHANGE_FEED=false turns the listener off
+"""
+import asyncio
+import inspect
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import psycopg2
+from psycopg2 import sql
+
+from src.db.postgres.pool import _env_int
+from src.db.postgres.triggers import TriggerDefinition, TriggerEvent
+from src.logger.logger import logger
+
+CHANNEL = os.environ.get("DB_CHANGE_FEED_CHANNEL", "table_change")
+DEBOUNCE_MS = _env_int("DB_CHANGE_FEED_DEBOUNCE_MS", 50)
+MAX_DELAY_MS = _env_int("DB_CHANGE_FEED_MAX_DELAY_MS", 500)
+MAX_KEYS = _env_int("DB_CHANGE_FEED_MAX_KEYS", 1000)
+
+# Table -> key columns sent with each change. Never whole rows: payloads are limited to
+# 8000 bytes. Only tables an in-process cache mirrors: every write to them sends a notification
+# (the user table, written on each sign-in, is not one of them).
+CHANGE_FEED_TABLES: Dict[str, Tuple[str, ...]] = {
+    "group": ("group_id", "codename"),
+    "permission": ("permission_id", "codename"),
+    "group_permission": ("group_id", "permission_id"),
+    "user_group": ("user_id", "group_id"),
+}
+
+RESET = "RESET"
+
+# Reconnect backoff of the listener, in seconds
+_RETRY_MIN = 1.0
+_RETRY_MAX = 30.0
+
+# Dead connections are noticed through TCP keepalives while the listener waits
+_KEEPALIVE = {"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 10, "keepalives_count": 3}
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """A changed row (op INSERT / UPDATE / DELETE) or, with op RESET, any row of the table"""
+    table: str
+    op: str
+    keys: Tuple[Tuple[str, Optional[str]], ...] = ()
+
+    @property
+    def reset(self) -> bool:
+        return self.op == RESET
+
+    def get(self, column: str) -> Optional[str]:
+        """Key column of the changed row (as text); None for RESET events"""
+        for name, value in self.keys:
+            if name == column:
+                return value
+        return None
+
+
+# ============================================================================
+# Triggers
+# ============================================================================
+
+def _notify(row: str, columns: Tuple[str, ...]) -> str:
+    keys = ", ".join(f"'{column}', {row}.{column}" for column in columns)
+    payload = f"json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'keys', json_build_object({keys}))::text"
+    channel = CHANNEL.replace("'", "''")
+    return f"PERFORM pg_notify('{channel}', {payload});"
+
+
+def _function_body(columns: Tuple[str, ...]) -> str:
+    # An update that changes a key column is sent for the old and the new key
+    old_keys = ", ".join(f"OLD.{column}" for column in columns)
+    new_keys = ", ".join(f"NEW.{column}" for column in columns)
+    return f"""
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {_notify('NEW', columns)}
+            ELSE
+                {_notify('OLD', columns)}
+                IF TG_OP = 'UPDATE' THEN
+                    IF ROW({old_keys}) IS DISTINCT FROM ROW({new_keys}) THEN
+                        {_notify('NEW', columns)}
+                    END IF;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+    """
+
+
+def change_feed_triggers() -> List[TriggerDefinition]:
+    """Trigger definitions that feed CHANGE_FEED_TABLES into the change feed"""
+    definitions = []
+    for table, columns in CHANGE_FEED_TABLES.items():
+        body = _function_body(columns)
+        for event, condition in (
+            (TriggerEvent.AFTER_INSERT, None),
+            # Statements that rewrite a row with the same values are not changes
+            (TriggerEvent.AFTER_UPDATE, "OLD.* IS DISTINCT FROM NEW.*"),
+            (TriggerEvent.AFTER_DELETE, None),
+        ):
+            operation = event.value.split()[1].lower()
+            definitions.append(TriggerDefinition(
+                name=f"change_feed_{table}_{operation}",
+                table_name=table,
+                function_name=f"change_feed_notify_{table}",
+                function_body=body,
+                event=event,
+                condition=condition,
+                description=f"Notify '{CHANNEL}' of {operation}s on {table}",
+            ))
+    return definitions
+
+
+# ============================================================================
+# Listener
+# ============================================================================
+
+class ChangeFeed:
+    """
+    Per-worker listener for the change feed channel
+
+    Example:
+        def evict(events: List[ChangeEvent]):
+            for event in events:
+                if event.reset:
+                    user_groups.clear()
+                else:
+                    user_groups.pop(event.get("user_id"), None)
+
+        change_feed.subscribe(["user_group"], evict)
+    """
+
+    def __init__(self, channel: str = CHANNEL, debounce_ms: int = DEBOUNCE_MS,
+                 max_delay_ms: int = MAX_DELAY_MS, max_keys: int = MAX_KEYS):
+        self.channel = channel
+        self.enabled = os.environ.get("DB_CHANGE_FEED", "true").lower() not in ("false", "0", "off")
+        self.debounce = debounce_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.max_keys = max_keys
+        self._subscribers: List[Tuple[frozenset, Callable]] = []
+        self._pending: Dict[str, Dict[tuple, ChangeEvent]] = {}
+        self._resets: Set[str] = set()
+        self._first_at: Optional[float] = None
+        self._last_at = 0.0
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._conn = None
+        self.received = 0
+        self.batches = 0
+        self.resets = 0
+        self.reconnects = 0
+        self.errors = 0
+
+    @property
+    def live(self) -> bool:
+        """Whether the listener is connected (changes are being received)"""
+        return self._conn is not None and not self._conn.closed
+
+    def subscribe(self, tables: Iterable[str], callback: Callable[[List[ChangeEvent]], Any]) -> Callable[[], None]:
+        """
+        Call callback(events) with each coalesced batch of changes to the given tables
+
+        callback may be a function or a coroutine function; it runs on the event loop, so it
+        should only evict or mark entries. Subscribe at import time: start() does not listen
+        without subscribers. Returns a function that unsubscribes.
+        """
+        tables = frozenset(tables)
+        unknown = tables - CHANGE_FEED_TABLES.keys()
+        if unknown:
+            raise ValueError(f"Tables not in the change feed: {', '.join(sorted(unknown))}")
+        entry = (tables, callback)
+        self._subscribers.append(entry)
+
+        def unsubscribe():
+            if entry in self._subscribers:
+                self._subscribers.remove(entry)
+
+        return unsubscribe
+
+    async def start(self):
+        """Start the listener and dispatcher on the running event loop (once per worker, if subscribed)"""
+        if not self.enabled or not self._subscribers or any(not task.done() for task in self._tasks):
+            return
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._tasks = [loop.create_task(self._listen_forever()), loop.create_task(self._dispatch_forever())]
+
+    async def stop(self):
+        """Stop listening and close the listener connection"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Listener state and counters"""
+        return {
+            "enabled": self.enabled,
+            "live": self.live,
+            "channel": self.channel,
+            "subscribers": len(self._subscribers),
+            "received": self.received,
+            "batches": self.batches,
+            "resets": self.resets,
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+        }
+
+    # ------------------------------------------------------------------ listening
+
+    def _connect(self):
+        from src.db.postgres.postgres import LazyPostgresConnection
+        params = LazyPostgresConnection._get_connection_params()
+        if not params:
+            raise ConnectionError("Database connection parameters are not configured")
+        conn = psycopg2.connect(**params, connect_timeout=10, **_KEEPALIVE)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+        return conn
+
+    async def _listen_forever(self):
+        loop = asyncio.get_running_loop()
+        delay = _RETRY_MIN
+        connected_before = False
+        while True:
+            conn = None
+            try:
+                conn = await loop.run_in_executor(None, self._connect)
+                self._conn = conn
+                delay = _RETRY_MIN
+                if connected_before:
+                    # Changes made while disconnected were not received
+                    self.reconnects += 1
+                    logger.info("Change feed listener reconnected; resetting subscribers", module="Postgres", label="CHANGE_FEED")
+                    for table in CHANGE_FEED_TABLES:
+                        self._add(ChangeEvent(table, RESET))
+                connected_before = True
+                await self._read(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Change feed listener disconnected: {e}. Retrying in {delay:.0f}s", module="Postgres", label="CHANGE_FEED")
+            finally:
+                self._conn = None
+                if conn is not None:
+                    conn.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _RETRY_MAX)
+
+    async def _read(self, conn):
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        fd = conn.fileno()
+        loop.add_reader(fd, readable.set)
+        try:
+            while True:
+                await readable.wait()
+                readable.clear()
+                conn.poll()  # raises when the connection is gone
+                while conn.notifies:
+                    self._receive(conn.notifies.pop(0).payload)
+        finally:
+            loop.remove_reader(fd)
+
+    def _receive(self, payload: str):
+        try:
+            message = json.loads(payload)
+            keys = tuple(sorted(
+                (column, None if value is None else str(value)) for column, value in message.get("keys", {}).items()
+            ))
+            event = ChangeEvent(message["table"], message["op"], keys)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            logger.warning(f"Ignoring malformed change feed payload: {payload[:200]}", module="Postgres", label="CHANGE_FEED")
+            return
+        self.received += 1
+        self._add(event)
+
+    # ------------------------------------------------------------------ coalescing
+
+    def _add(self, event: ChangeEvent):
+        table = event.table
+        if table not in self._resets:
+            if event.reset:
+                self._resets.add(table)
+                self._pending.pop(table, None)
+            else:
+                rows = self._pending.setdefault(table, {})
+                rows.pop(event.keys, None)  # keep the latest op, in arrival order
+                rows[event.keys] = event
+                if len(rows) > self.max_keys:
+                    self._resets.add(table)
+                    del self._pending[table]
+        now = time.monotonic()
+        if self._first_at is None:
+            self._first_at = now
+        self._last_at = now
+        if self._wake is not None:
+            self._wake.set()
+
+    def _take(self) -> List[ChangeEvent]:
+        events = [ChangeEvent(table, RESET) for table in sorted(self._resets)]
+        for rows in self._pending.values():
+            events.extend(rows.values())
+        self.resets += len(self._resets)
+        self._resets = set()
+        self._pending = {}
+        self._first_at = None
+        return events
+
+    async def _dispatch_forever(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while self._first_at is not None:
+                flush_at = min(self._last_at + self.debounce, self._first_at + self.max_delay)
+                wait = flush_at - time.monotonic()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self._first_at is None:
+                continue
+            await self._dispatch(self._take())
+
+    async def _dispatch(self, events: List[ChangeEvent]):
+        self.batches += 1
+        for tables, callback in list(self._subscribers):
+            batch = [event for event in events if event.table in tables]
+            if not batch:
+                continue
+            try:
+                result = callback(batch)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Change feed subscriber {getattr(callback, '__qualname__', callback)} failed: {e}", exc_info=True, module="Postgres", label="CHANGE_FEED")
+
+
+change_feed = ChangeFeed()
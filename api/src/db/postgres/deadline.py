@@ -0,0 +1,225 @@
+"""
+Request Deadlines
+Per-request database time budget: statement / lock timeouts and query cancellation
+
+- Every transaction started under a budget begins with SET LOCAL statement_timeout and
+  lock_timeout. The statement timeout is capped at the time left until the request deadline
+- When the deadline passes or the client disconnects, the queries running for the request
+  are cancelled on the server and further statements fail with DeadlineExceeded
+- DatabaseDeadlineMiddleware gives every request a budget and turns timeouts and
+  cancellations into 504 DATABASE_TIMEOUT / 503 DATABASE_BUSY responses
+- Defaults come from DB_STATEMENT_TIMEOUT_MS, DB_LOCK_TIMEOUT_MS and DB_REQUEST_TIMEOUT_MS
+  (0 disables a limit); routes and functions override them with @db_budget(...)
+"""
+import functools
+import inspect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+import psycopg2
+import psycopg2.errors
+
+from src.db.postgres.pool import _env_int
+from src.logger.logger import logger
+
+DEFAULT_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 30000)
+DEFAULT_LOCK_TIMEOUT_MS = _env_int("DB_LOCK_TIMEOUT_MS", 5000)
+# Below gunicorn's --timeout, so the request fails cleanly before the worker is killed
+DEFAULT_REQUEST_TIMEOUT_MS = _env_int("DB_REQUEST_TIMEOUT_MS", 60000)
+
+# SQLSTATEs of statements stopped by a budget
+_QUERY_CANCELED = "57014"  # statement_timeout or cancel request
+_LOCK_NOT_AVAILABLE = "55P03"  # lock_timeout
+
+
+class DeadlineExceeded(psycopg2.errors.QueryCanceled):
+    """A statement was refused because its request budget is used up or was cancelled"""
+
+
+class DbBudget:
+    """Time budget of one request (or @db_budget call) and the checkouts working for it"""
+
+    def __init__(self, statement_timeout_ms: int = DEFAULT_STATEMENT_TIMEOUT_MS,
+                 lock_timeout_ms: int = DEFAULT_LOCK_TIMEOUT_MS,
+                 request_timeout_ms: int = DEFAULT_REQUEST_TIMEOUT_MS):
+        self.started_at = time.monotonic()
+        self.statement_timeout_ms = statement_timeout_ms
+        self.lock_timeout_ms = lock_timeout_ms
+        self.request_timeout_ms = request_timeout_ms
+        self.active = True  # False once the response is sent (background tasks run unbounded)
+        self.cancelled: Optional[str] = None  # "deadline" or "disconnect"
+        self.failure: Optional[str] = None  # "timeout", "lock_timeout" or "cancelled"
+        self.failure_limits: Optional[dict] = None  # limits() when the failure happened
+        self._checkouts = set()
+        self._lock = threading.Lock()
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """Monotonic time the request must finish by, None without a request timeout"""
+        if not self.request_timeout_ms:
+            return None
+        return self.started_at + self.request_timeout_ms / 1000
+
+    def remaining_ms(self) -> Optional[float]:
+        deadline = self.deadline
+        return None if deadline is None else (deadline - time.monotonic()) * 1000
+
+    def elapsed_ms(self) -> int:
+        return round((time.monotonic() - self.started_at) * 1000)
+
+    def check(self):
+        """Raise DeadlineExceeded when no further statement may run"""
+        if self.cancelled is not None:
+            raise DeadlineExceeded(f"Query cancelled ({self.cancelled}) after {self.elapsed_ms()} ms")
+        remaining = self.remaining_ms()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"Request deadline of {self.request_timeout_ms} ms exceeded")
+
+    def begin(self, checkout, raw):
+        """Apply the budget to the transaction a checkout is starting on raw"""
+        with self._lock:
+            self._checkouts.add(checkout)
+        statement_timeout = self.statement_timeout_ms
+        remaining = self.remaining_ms()
+        if remaining is not None:
+            statement_timeout = max(1, min(statement_timeout or remaining, int(remaining)))
+        cursor = raw.cursor()
+        try:
+            cursor.execute(
+                "SELECT set_config('statement_timeout', %s, true), set_config('lock_timeout', %s, true)",
+                (str(int(statement_timeout)), str(int(self.lock_timeout_ms)))
+            )
+        finally:
+            cursor.close()
+
+    def release(self, checkout):
+        """Forget a checkout handed back to the pool"""
+        with self._lock:
+            self._checkouts.discard(checkout)
+
+    def cancel(self, reason: str):
+        """
+        Cancel the statements running for this budget and refuse new ones
+
+        Blocking (sends a cancel request per connection); run it off the event loop.
+        """
+        if self.cancelled is not None:
+            return
+        self.cancelled = reason
+        with self._lock:
+            checkouts = list(self._checkouts)
+        for checkout in checkouts:
+            try:
+                checkout.raw.cancel()
+            except Exception:
+                pass
+        if checkouts:
+            logger.warning(
+                f"Cancelled queries on {len(checkouts)} connection(s) after {self.elapsed_ms()} ms ({reason})",
+                module="Postgres", label="DB_DEADLINE"
+            )
+
+    def record_failure(self, error: Exception):
+        """Remember why a statement failed if the budget stopped it"""
+        code = getattr(error, "pgcode", None)
+        if isinstance(error, DeadlineExceeded) or code == _QUERY_CANCELED:
+            self.failure = "cancelled" if self.cancelled == "disconnect" else "timeout"
+        elif code == _LOCK_NOT_AVAILABLE:
+            self.failure = "lock_timeout"
+        else:
+            return
+        # Route overrides (@db_budget) are undone by the time the error response is built
+        self.failure_limits = self.limits()
+
+    def limits(self) -> dict:
+        return {
+            "statement_timeout_ms": self.statement_timeout_ms,
+            "lock_timeout_ms": self.lock_timeout_ms,
+            "request_timeout_ms": self.request_timeout_ms,
+            "elapsed_ms": self.elapsed_ms(),
+        }
+
+
+# Budget of the request being served; a mutable holder shared with the tasks it spawns
+_budget: ContextVar[Optional[DbBudget]] = ContextVar('postgres_db_budget', default=None)
+
+
+def begin_budget(budget: DbBudget):
+    """Bind a budget to the current context; returns a token for end_budget()"""
+    return _budget.set(budget)
+
+
+def end_budget(token):
+    _budget.reset(token)
+
+
+def current_budget() -> Optional[DbBudget]:
+    """Budget applying to statements run now, None when unbounded"""
+    budget = _budget.get()
+    return budget if budget is not None and budget.active else None
+
+
+def db_budget(statement_timeout_ms: Optional[int] = None, lock_timeout_ms: Optional[int] = None,
+              request_timeout_ms: Optional[int] = None) -> Callable:
+    """
+    Override the database time budget while a route or function runs
+
+    Inside a request the limits of the request's budget are changed for the duration of the
+    call (the request timeout still counts from the start of the request); outside a
+    request the call gets its own budget.
+
+    Example:
+        @router.get("/dashboard/overview")
+        @db_budget(statement_timeout_ms=10000, request_timeout_ms=20000)
+        async def dashboard_overview(...):
+            ...
+    """
+    overrides = {
+        key: value for key, value in (
+            ("statement_timeout_ms", statement_timeout_ms),
+            ("lock_timeout_ms", lock_timeout_ms),
+            ("request_timeout_ms", request_timeout_ms),
+        ) if value is not None
+    }
+
+    def enter():
+        budget = current_budget()
+        if budget is None:
+            return None, _budget.set(DbBudget(**overrides))
+        previous = {key: getattr(budget, key) for key in overrides}
+        for key, value in overrides.items():
+            setattr(budget, key, value)
+        return (budget, previous), None
+
+    def leave(state):
+        restore, token = state
+        if token is not None:
+            _budget.reset(token)
+            return
+        budget, previous = restore
+        for key, value in previous.items():
+            setattr(budget, key, value)
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                state = enter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    leave(state)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            state = enter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                leave(state)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,65 @@
+"""
+Estimated Counts
+Row counts from planner statistics instead of a full scan
+
+- Whole table: pg_class.reltuples scaled to the table's current size, as the planner does
+- Filtered query: the planner's row estimate from EXPLAIN (FORMAT JSON), which costs about as
+  much as planning the query and does not read the table
+- Estimates are only used from DB_COUNT_ESTIMATE_THRESHOLD rows up (default 100000): smaller
+  counts are counted exactly, where estimation errors would be noticeable and the exact count
+  is cheap. Tables that were never analyzed are always counted exactly
+"""
+import json
+from typing import Any, Optional, Sequence, Tuple
+
+from src.db.postgres.pool import _env_int
+
+COUNT_ESTIMATE_THRESHOLD = _env_int("DB_COUNT_ESTIMATE_THRESHOLD", 100000)
+
+# reltuples / relpages is the density at the last VACUUM / ANALYZE; times the current number of
+# pages it tracks growth since then. NULL when the table was never analyzed.
+_TABLE_ESTIMATE = """
+    SELECT CASE
+        WHEN c.reltuples < 0 OR c.relpages = 0 THEN NULL
+        ELSE c.reltuples / c.relpages * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+    END
+    FROM pg_class c
+    WHERE c.oid = to_regclass(%s)
+"""
+
+
+def table_row_estimate(cursor, table: str) -> Optional[float]:
+    """Estimated rows in a table (schema-qualified names allowed); None when unknown"""
+    cursor.execute(_TABLE_ESTIMATE, (table,))
+    row = cursor.fetchone()
+    return None if row is None or row[0] is None else float(row[0])
+
+
+def plan_row_estimate(cursor, query: str, params: Sequence[Any] = ()) -> Optional[float]:
+    """Rows the planner expects query to return (the query is planned, not run)"""
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return float(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(cursor, from_sql: str, where_sql: str = "", params: Sequence[Any] = (),
+               estimate: bool = True) -> Tuple[int, bool]:
+    """
+    (row count, is_estimate) of SELECT COUNT(*) FROM from_sql [WHERE where_sql]
+
+    With estimate=True, large counts come from planner statistics (see module docstring).
+
+    Example:
+        total, is_estimate = count_rows(cursor, "activity_log", "level = %s", ["error"])
+    """
+    if estimate:
+        if where_sql or " " in from_sql.strip():
+            rows = plan_row_estimate(cursor, f"SELECT 1 FROM {from_sql}" + (f" WHERE {where_sql}" if where_sql else ""), params)
+        else:
+            rows = table_row_estimate(cursor, from_sql)
+        if rows is not None and rows >= COUNT_ESTIMATE_THRESHOLD:
+            return int(round(rows)), True
+    cursor.execute(f"SELECT COUNT(*) FROM {from_sql}" + (f" WHERE {where_sql}" if where_sql else ""), params)
+    return cursor.fetchone()[0], False
@@ -4,14 +4,22 @@ Call this function on startup to auto-register and setup all triggers
 """
 
 from src.db.postgres.postgres import connection
+from src.db.postgres.change_feed import change_feed_triggers
 from src.logger.logger import logger
 
+# Session advisory lock held while triggers are created: every worker of every pod runs the
+# setup on startup, and concurrent CREATE TRIGGER statements for the same name fail
+TRIGGER_SETUP_LOCK = 7340114
+
 
 def init_all_triggers():
     """
     Initialize all triggers - registers and creates them in database
     Call this on FastAPI startup
 
+    Triggers that already exist are left as they are (drop them to pick up a changed definition).
+    Change feed triggers of tables no longer in the feed are dropped.
+
     Returns:
         Dictionary with initialization results
     """
@@ -19,6 +27,7 @@ def init_all_triggers():
         "registered": [],
         "created": [],
         "skipped": [],
+        "dropped": [],
         "failed": []
     }
 
@@ -26,11 +35,48 @@ def init_all_triggers():
         # Get trigger manager (auto-detects existing triggers)
         manager = connection.get_trigger_manager()
 
+        for trigger_def in change_feed_triggers():
+            manager.register_trigger(trigger_def)
+            results["registered"].append(trigger_def.name)
+
+        try:
+            cursor = manager.connection.cursor()
+            cursor.execute("SELECT pg_advisory_lock(%s)", (TRIGGER_SETUP_LOCK,))
+            cursor.close()
+            # Another worker may have created them while we waited for the lock
+            manager._detect_existing_triggers()
+
+            obsolete = {
+                name: trigger for name, trigger in manager.registered_triggers.items()
+                if name.startswith("change_feed_") and name not in results["registered"]
+            }
+            for trigger_name, trigger in obsolete.items():
+                if manager.drop_trigger(trigger_name, str(trigger["table_name"]).strip('"')):
+                    results["dropped"].append(trigger_name)
+            for function_name in {trigger["function_name"] for trigger in obsolete.values()}:
+                cursor = manager.connection.cursor()
+                cursor.execute(f"DROP FUNCTION IF EXISTS {function_name}()")
+                manager.connection.commit()
+                cursor.close()
+
+            for trigger_name in results["registered"]:
+                if trigger_name in manager.registered_triggers:
+                    results["skipped"].append(trigger_name)
+                elif manager.create_trigger_from_registry(trigger_name):
+                    results["created"].append(trigger_name)
+                else:
+                    results["failed"].append(trigger_name)
+        finally:
+            # Closing the session releases the advisory lock
+            manager.connection.close()
+
+        if results["created"]:
+            logger.info(f"Created triggers: {', '.join(results['created'])}", module="Trigger")
+        if results["dropped"]:
+            logger.info(f"Dropped triggers: {', '.join(results['dropped'])}", module="Trigger")
         return results
 
     except Exception as e:
         logger.error(f"Error initializing triggers: {e}", exc_info=True)
         results["failed"].append(f"init_error: {str(e)}")
         return results
-
-
@@ -0,0 +1,583 @@
+"""
+PostgreSQL Connection Pool
+Asyncio-aware pool of psycopg2 connections shared by sync and async callers
+
+- Bounded (min/max size) with an acquire timeout
+- Connections are recycled after a maximum lifetime
+- Idle connections above the minimum size are reaped in the background
+- Connections are only pinged when the validation policy asks for it
+- Async callers wait on futures instead of blocking the event loop and run
+  blocking driver calls on a dedicated executor sized to the pool
+- Fork-safe: a child process (gunicorn --preload workers) never reuses the
+  parent's sockets and opens its own connections
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import psycopg2
+
+from src.logger.logger import logger
+
+
+# Connections inherited from a parent process. They are kept referenced and never
+# closed in the child: closing (or garbage collecting) a psycopg2 connection sends a
+# Terminate message over the socket it shares with the parent, killing the parent's session.
+_inherited_connections: List[Any] = []
+
+_pools: 'weakref.WeakSet[ConnectionPool]' = weakref.WeakSet()
+
+
+def _reset_pools_after_fork():
+    for pool in list(_pools):
+        pool._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+class PoolTimeoutError(ConnectionError):
+    """Raised when no pooled connection becomes available within the acquire timeout"""
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back to default on bad values"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid {name} value: {os.environ.get(name)}. Using default {default}.", module="Postgres")
+        return default
+
+
+DISCONNECT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+def is_disconnect(error: BaseException, raw) -> bool:
+    """Whether an error means the server connection is gone (as opposed to a failed statement)"""
+    return isinstance(error, DISCONNECT_ERRORS) and bool(raw.closed)
+
+
+@dataclass
+class ValidationPolicy:
+    """
+    When to ping a pooled connection before handing it out
+
+    mode:
+        "idle"   - ping only connections idle longer than idle_threshold (default)
+        "always" - ping on every checkout
+        "never"  - never ping; rely on disconnect detection and retry
+    keepalive_interval:
+        Ping connections sitting idle this long from the background task so
+        they are not dropped by firewalls or server timeouts (0 disables)
+    """
+    mode: str = "idle"
+    idle_threshold: float = 10.0
+    keepalive_interval: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> 'ValidationPolicy':
+        mode = os.environ.get("DB_POOL_VALIDATION", "idle").lower()
+        if mode not in ("idle", "always", "never"):
+            logger.warning(f"Invalid DB_POOL_VALIDATION value: {mode}. Using default idle.", module="Postgres")
+            mode = "idle"
+        return cls(
+            mode=mode,
+            idle_threshold=_env_int("DB_POOL_VALIDATE_IDLE_AFTER", 10000) / 1000,
+            keepalive_interval=_env_int("DB_POOL_KEEPALIVE_INTERVAL", 60000) / 1000,
+        )
+
+    def should_validate(self, conn: 'PooledConnection', now: float, last_disconnect: float) -> bool:
+        if self.mode == "always":
+            return True
+        # Connections that predate a detected disconnect are suspect (e.g. server restart)
+        if conn.last_used_at < last_disconnect:
+            return True
+        if self.mode == "never":
+            return False
+        return conn.idle_for(now) > self.idle_threshold
+
+
+class PooledConnection:
+    """A psycopg2 connection plus the bookkeeping the pool needs"""
+
+    __slots__ = ("raw", "created_at", "last_used_at", "pid", "prepared")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.pid = os.getpid()
+        self.prepared = set()  # names of server-side prepared statements on this connection
+        now = time.monotonic()
+        self.created_at = now
+        self.last_used_at = now
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.raw.closed)
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now or time.monotonic()) - self.created_at
+
+    def idle_for(self, now: Optional[float] = None) -> float:
+        return (now or time.monotonic()) - self.last_used_at
+
+    def close(self):
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe connection pool usable from both sync code (`with db as cursor:`)
+    and async code (`async with db as cursor:`).
+
+    Sync callers block on a condition variable; async callers park on a future
+    that release() resolves, so waiting for a connection never blocks the loop.
+    """
+
+    def __init__(
+        self,
+        connection_params: Dict[str, Any],
+        min_size: int = 2,
+        max_size: int = 10,
+        acquire_timeout: float = 10.0,
+        max_lifetime: float = 1800.0,
+        idle_timeout: float = 30.0,
+        connect_retries: int = 10,
+        retry_delay: float = 2.0,
+        validation: Optional[ValidationPolicy] = None,
+    ):
+        if max_size < 1:
+            raise ValueError("Pool max_size must be at least 1")
+        self.connection_params = connection_params
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.connect_retries = connect_retries
+        self.retry_delay = retry_delay
+        self.validation = validation or ValidationPolicy()
+
+        self._idle: Deque[PooledConnection] = deque()
+        self._size = 0  # idle + checked out + currently being opened
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._last_disconnect = 0.0
+        self._pid = os.getpid()
+        # Counters (approximate under concurrency; reported by stats())
+        self.pings = 0
+        self.pings_avoided = 0
+        self.reconnects = 0
+        self.discarded = 0
+        _pools.add(self)
+
+    @classmethod
+    def from_env(cls, connection_params: Dict[str, Any], **overrides) -> 'ConnectionPool':
+        """
+        Build a pool from environment configuration.
+        Durations are given in milliseconds to match the existing DB_POOL_* variables.
+        """
+        settings = {
+            "min_size": _env_int("DB_POOL_MIN", 2),
+            "max_size": _env_int("DB_POOL_MAX", 10),
+            "acquire_timeout": _env_int("DB_POOL_CONNECTION_TIMEOUT", 10000) / 1000,
+            "max_lifetime": _env_int("DB_POOL_MAX_LIFETIME", 1800000) / 1000,
+            "idle_timeout": _env_int("DB_POOL_IDLE_TIMEOUT", 30000) / 1000,
+            "validation": ValidationPolicy.from_env(),
+        }
+        settings.update(overrides)
+        return cls(connection_params, **settings)
+
+    # ------------------------------------------------------------------
+    # Fork safety
+    # ------------------------------------------------------------------
+
+    def _after_fork(self):
+        """
+        Forget everything inherited from the parent process.
+        Idle connections are parked (not closed) and fresh ones are opened on demand;
+        locks, waiters, the executor and the maintenance task do not survive a fork.
+        """
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        _inherited_connections.extend(conn.raw for conn in self._idle)
+        self._idle = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._async_waiters = deque()
+        self._executor = None
+        self._reaper_task = None
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._after_fork()
+
+    # ------------------------------------------------------------------
+    # Connection lifecycle
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> PooledConnection:
+        """Open a new connection with retry logic"""
+        attempt = 0
+        while True:
+            try:
+                raw = psycopg2.connect(connect_timeout=10, **self.connection_params)
+                # Transactions are managed explicitly by the callers
+                raw.autocommit = False
+                return PooledConnection(raw)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.connect_retries:
+                    logger.error(
+                        f"Failed to establish database connection after {self.connect_retries} attempts: {e}",
+                        module="Postgres"
+                    )
+                    raise
+                logger.warning(
+                    f"Database connection attempt {attempt}/{self.connect_retries} failed: {e}. Retrying in {self.retry_delay}s...",
+                    module="Postgres"
+                )
+                time.sleep(self.retry_delay)
+
+    def _is_reusable(self, conn: PooledConnection, now: float) -> bool:
+        """Check whether an idle connection may be handed out again"""
+        if conn.closed:
+            return False
+        if self.max_lifetime and conn.age(now) > self.max_lifetime:
+            return False
+        return True
+
+    def _needs_validation(self, conn: PooledConnection) -> bool:
+        if self.validation.should_validate(conn, time.monotonic(), self._last_disconnect):
+            return True
+        self.pings_avoided += 1
+        return False
+
+    def _validate(self, conn: PooledConnection) -> bool:
+        """Test a connection with a simple query before handing it out"""
+        self.pings += 1
+        try:
+            cursor = conn.raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            # Leave the connection outside of a transaction
+            conn.raw.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _take_idle_locked(self, discarded: List[PooledConnection]) -> Optional[PooledConnection]:
+        """Pop the most recently used reusable idle connection (lock must be held)"""
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if self._is_reusable(conn, now):
+                return conn
+            self._size -= 1
+            discarded.append(conn)
+        return None
+
+    def _discard(self, conn: PooledConnection):
+        """Drop a connection that failed validation and free its slot"""
+        conn.close()
+        with self._lock:
+            self._size -= 1
+            self.discarded += 1
+            self._last_disconnect = time.monotonic()
+            self._wake_one_locked()
+
+    def _wake_one_locked(self):
+        """Let one waiter retry after capacity was freed (lock must be held)"""
+        while self._async_waiters:
+            loop, future = self._async_waiters.popleft()
+            if not future.done():
+                loop.call_soon_threadsafe(self._deliver, future, None)
+                return
+        self._available.notify()
+
+    # ------------------------------------------------------------------
+    # Acquire / release
+    # ------------------------------------------------------------------
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection, blocking the calling thread while the pool is exhausted"""
+        self._check_fork()
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        while True:
+            discarded: List[PooledConnection] = []
+            create = False
+            with self._lock:
+                if self._closed:
+                    raise ConnectionError("Connection pool is closed")
+                conn = self._take_idle_locked(discarded)
+                while conn is None and not create:
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.acquire_timeout}s waiting for a database connection "
+                            f"(pool size {self.max_size})"
+                        )
+                    self._available.wait(remaining)
+                    conn = self._take_idle_locked(discarded)
+            for stale in discarded:
+                stale.close()
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._wake_one_locked()
+                    raise
+                return conn
+
+            if not self._needs_validation(conn) or self._validate(conn):
+                return conn
+            self._discard(conn)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection without blocking the event loop"""
+        self._check_fork()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.acquire_timeout if timeout is None else timeout)
+        while True:
+            discarded: List[PooledConnection] = []
+            create = False
+            future: Optional[asyncio.Future] = None
+            with self._lock:
+                if self._closed:
+                    raise ConnectionError("Connection pool is closed")
+                conn = self._take_idle_locked(discarded)
+                if conn is None:
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                    else:
+                        future = loop.create_future()
+                        self._async_waiters.append((loop, future))
+            for stale in discarded:
+                stale.close()
+
+            if future is not None:
+                remaining = deadline - loop.time()
+                try:
+                    conn = await asyncio.wait_for(future, max(remaining, 0))
+                except asyncio.TimeoutError:
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.acquire_timeout}s waiting for a database connection "
+                        f"(pool size {self.max_size})"
+                    )
+                if conn is None:
+                    # Capacity was freed rather than a connection handed over; retry
+                    continue
+                # Handed-off connections were just in use and need no validation
+                return conn
+
+            if create:
+                try:
+                    return await self.run(self._connect)
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._wake_one_locked()
+                    raise
+
+            if not self._needs_validation(conn) or await self.run(self._validate, conn):
+                return conn
+            await self.run(self._discard, conn)
+
+    def _deliver(self, future: asyncio.Future, conn: Optional[PooledConnection]):
+        """Resolve an async waiter on its own loop; return the connection if it gave up"""
+        if future.done():
+            if conn is not None:
+                self.release(conn)
+            return
+        future.set_result(conn)
+
+    def release(self, conn: PooledConnection, discard: bool = False):
+        """Return a connection to the pool (or close it if it is broken or expired)"""
+        if conn.pid != os.getpid():
+            # Checked out before a fork; it belongs to the parent
+            _inherited_connections.append(conn.raw)
+            return
+        now = time.monotonic()
+        conn.last_used_at = now
+        close = discard or self._closed or not self._is_reusable(conn, now)
+        with self._lock:
+            if close:
+                self._size -= 1
+                if conn.closed:
+                    # Lost to the server rather than retired by us
+                    self.discarded += 1
+                    self._last_disconnect = now
+                self._wake_one_locked()
+            else:
+                while self._async_waiters:
+                    loop, future = self._async_waiters.popleft()
+                    if not future.done():
+                        loop.call_soon_threadsafe(self._deliver, future, conn)
+                        return
+                self._idle.append(conn)
+                self._available.notify()
+        if close:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Executor for blocking driver calls
+    # ------------------------------------------------------------------
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_size,
+                        thread_name_prefix="pg-pool"
+                    )
+        return self._executor
+
+    async def run(self, func: Callable, *args):
+        """Run a blocking driver call on the pool executor (with the caller's context variables)"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._get_executor(), context.run, func, *args)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def warm_up(self) -> int:
+        """Open connections until the pool holds min_size; returns how many were opened"""
+        self._check_fork()
+        opened = 0
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.min_size:
+                    return opened
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            self.release(conn)
+            opened += 1
+
+    def reap_idle(self) -> int:
+        """Close expired connections and idle ones above min_size; returns how many were closed"""
+        now = time.monotonic()
+        to_close: List[PooledConnection] = []
+        with self._lock:
+            keep: Deque[PooledConnection] = deque()
+            # Oldest-idle connections sit at the left of the deque
+            for conn in self._idle:
+                expired = not self._is_reusable(conn, now)
+                surplus = (
+                    self.idle_timeout
+                    and conn.idle_for(now) > self.idle_timeout
+                    and self._size - len(to_close) > self.min_size
+                )
+                if expired or surplus:
+                    to_close.append(conn)
+                else:
+                    keep.append(conn)
+            self._idle = keep
+            self._size -= len(to_close)
+        for conn in to_close:
+            conn.close()
+        return len(to_close)
+
+    def keepalive(self) -> int:
+        """Ping connections idle longer than the keepalive interval; returns how many were dropped"""
+        interval = self.validation.keepalive_interval
+        if not interval:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            stale = [conn for conn in self._idle if conn.idle_for(now) > interval]
+            for conn in stale:
+                self._idle.remove(conn)
+        dropped = 0
+        for conn in stale:
+            if self._validate(conn):
+                self.release(conn)
+            else:
+                self._discard(conn)
+                dropped += 1
+        return dropped
+
+    def record_reconnect(self):
+        """Count a transparent retry on a fresh connection after a disconnect"""
+        self.reconnects += 1
+
+    async def _maintain_forever(self, interval: float):
+        while not self._closed:
+            await asyncio.sleep(interval)
+            try:
+                await self.run(self.reap_idle)
+                await self.run(self.keepalive)
+            except Exception as e:
+                logger.warning(f"Connection pool maintenance failed: {e}", module="Postgres")
+
+    def start_maintenance(self, interval: Optional[float] = None):
+        """Start the background idle reaper and keepalive on the running event loop"""
+        if self._reaper_task and not self._reaper_task.done():
+            return
+        if interval is None:
+            periods = [p for p in (self.idle_timeout, self.validation.keepalive_interval) if p]
+            interval = max(1.0, min(periods + [30.0]))
+        self._reaper_task = asyncio.get_running_loop().create_task(self._maintain_forever(interval))
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of pool occupancy and validation counters"""
+        with self._lock:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "waiting": len(self._async_waiters),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "pings": self.pings,
+                "pings_avoided": self.pings_avoided,
+                "reconnects": self.reconnects,
+                "discarded": self.discarded,
+            }
+
+    def close(self):
+        """Close idle connections and refuse new checkouts"""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._available.notify_all()
+        for conn in idle:
+            conn.close()
+        if self._reaper_task:
+            self._reaper_task.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=False)
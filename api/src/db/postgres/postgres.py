@@ -1,9 +1,28 @@
+import asyncio
+import base64
+import concurrent.futures
+import contextvars
+import copy
+import itertools
+import json
 import os
+import threading
 import traceback
+from collections import deque, namedtuple
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
 import psycopg2
 from psycopg2.extras import DictCursor
 from src.logger.logger import logger
-from typing import Any, Dict, List, Optional, Union, Tuple
+from src.db.postgres.pool import ConnectionPool, PooledConnection, PoolTimeoutError, DISCONNECT_ERRORS, is_disconnect
+from src.db.postgres.prepared import prepared_statements
+from src.db.postgres.binding import array_literal  # registers the uuid adapter
+from src.db.postgres.query_stats import query_stats
+from src.db.postgres.deadline import DbBudget, current_budget
+from src.db.postgres.estimates import COUNT_ESTIMATE_THRESHOLD, plan_row_estimate, table_row_estimate
+from src.db.postgres.replica import replicas, in_read_only, mark_write
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Union, Tuple
 from enum import Enum
 
 
@@ -16,9 +35,378 @@ class JoinType(Enum):
 
 class QueryResult:
 
-    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+    def __init__(self, data: Union[List[Any], Dict[str, List[Any]]], count: Optional[int] = None,
+                 next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None,
+                 columns: Optional[Tuple[str, ...]] = None, count_is_estimate: bool = False):
+        # Rows in the builder's row_factory() format (list of dicts by default)
         self.data = data
         self.count = count
+        # count comes from planner statistics (count(estimate=True) on a large result)
+        self.count_is_estimate = count_is_estimate
+        # Result column names, in order (for tuple rows); None when nothing was fetched
+        self.columns = columns
+        # Keyset pagination tokens (see QueryBuilder.after()/before())
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+# Keyset pagination cursors are opaque to clients: URL-safe base64 of the JSON-encoded
+# ORDER BY values of a boundary row. Values are bound back as untyped literals, so
+# timestamps and UUIDs round-trip as strings and Postgres casts them to the column type.
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the ORDER BY values of a row as a pagination cursor"""
+    payload = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """Decode a pagination cursor holding `size` ORDER BY values (ValueError if malformed)"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor") from None
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid pagination cursor")
+    return values
+
+
+def page_cursors(first: Sequence[Any], last: Sequence[Any], full: bool,
+                 direction: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (next_cursor, prev_cursor) for a page, from the ORDER BY values of its first and last rows
+
+    full: the page holds `limit` rows (there may be more after it)
+    direction: 'after' / 'before' when the page was fetched with a cursor
+    """
+    if direction == 'before':
+        return encode_cursor(last), encode_cursor(first) if full else None
+    return encode_cursor(last) if full else None, encode_cursor(first) if direction == 'after' else None
+
+
+def _keyset_comparison(columns: Sequence[str], ascending: bool, before: bool) -> Tuple[str, str]:
+    """Row expression and operator selecting the rows after (or before) a cursor"""
+    return f"({', '.join(columns)})", '<' if ascending == before else '>'
+
+
+def keyset_predicate(columns: Sequence[str], ascending: bool, values: Sequence[Any], before: bool = False) -> Tuple[str, tuple]:
+    """
+    Row-value comparison selecting the rows after (or before) a cursor
+
+    Returns (sql, param); the param is a tuple that psycopg2 renders as a row literal.
+    All columns must share one sort direction and be NOT NULL, with a unique last column.
+    """
+    row, op = _keyset_comparison(columns, ascending, before)
+    return f"{row} {op} %s", tuple(values)
+
+
+# WHERE predicates are stored as plain tuples `(column, op, value, logic)` where logic
+# (AND/OR) joins the predicate to the previous one. Their *shape* `(column, op, logic, arity)`
+# is what determines the SQL text. IN lists are bound as one array parameter (arity None:
+# `= ANY(%s)` / `<> ALL(%s)`), so every list length shares one SQL text and fingerprint; lists with
+# elements that have no array text form fall back to one placeholder per value (arity = length).
+_LIST_OPS = frozenset(('IN', 'NOT IN'))
+_NO_PARAM_OPS = frozenset(('IS', 'IS NOT'))
+
+
+def _bind_where(predicates: List[tuple], params: List[Any]) -> Tuple[tuple, ...]:
+    """Append predicate parameters in placeholder order and return the predicates' shape"""
+    shape = []
+    for column, op, value, logic in predicates:
+        if op in _LIST_OPS:
+            literal = array_literal(value)
+            if literal is not None:
+                shape.append((column, op, logic, None))
+                params.append(literal)
+            else:
+                shape.append((column, op, logic, len(value)))
+                params.extend(value)
+            continue
+        shape.append((column, op, logic, None))
+        if op == 'BETWEEN':
+            params.extend(value)
+        elif op not in _NO_PARAM_OPS:
+            params.append(value)
+    return tuple(shape)
+
+
+# Compiled SQL cache (per statement type), keyed by query shape
+SQL_CACHE_SIZE = int(os.environ.get('DB_SQL_CACHE_SIZE', 512))
+
+# Default number of rows fetched per round trip by QueryBuilder.stream()
+STREAM_BATCH_SIZE = 1000
+_stream_ids = itertools.count(1)
+
+# Multi-row inserts with more rows than this are sent with COPY instead of one VALUES statement
+COPY_THRESHOLD = int(os.environ.get('DB_COPY_THRESHOLD', 1000))
+COPY_CHUNK_SIZE = 64 * 1024
+_copy_ids = itertools.count(1)
+
+# Result row formats for QueryBuilder.row_factory()
+ROW_FACTORIES = ("dict", "tuple", "record", "columns")
+
+
+@lru_cache(maxsize=SQL_CACHE_SIZE)
+def record_class(columns: Tuple[str, ...]) -> type:
+    """
+    Record class for a result shape, cached by column names
+
+    A namedtuple (empty __slots__, no per-row __dict__): attribute and positional
+    access, _asdict() for JSON. Invalid or duplicate names become _0, _1, ...
+    """
+    return namedtuple("Record", columns, rename=True)
+
+
+def _shape_rows(rows: List[tuple], columns: Tuple[str, ...], row_factory: str) -> Union[List[Any], Dict[str, List[Any]]]:
+    """Convert fetched tuples to the requested row format (one allocation per row at most)"""
+    if row_factory == "tuple":
+        return rows
+    if row_factory == "record":
+        return list(map(record_class(columns)._make, rows))
+    if row_factory == "columns":
+        if not rows:
+            return {column: [] for column in columns}
+        return {column: list(values) for column, values in zip(columns, zip(*rows))}
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _column_names(cursor) -> Tuple[str, ...]:
+    return tuple(column.name for column in cursor.description)
+
+
+def _compile_predicate(column: str, op: str, arity: Optional[int]) -> str:
+    if op in _LIST_OPS:
+        if arity is None:
+            return f"{column} = ANY(%s)" if op == 'IN' else f"{column} <> ALL(%s)"
+        placeholders = ','.join(['%s'] * arity)
+        return f"{column} {op} ({placeholders})"
+    if op == 'BETWEEN':
+        return f"{column} BETWEEN %s AND %s"
+    if op == 'IS':
+        return f"{column} IS NULL"
+    if op == 'IS NOT':
+        return f"{column} IS NOT NULL"
+    return f"{column} {op} %s"
+
+
+def _compile_where(where: Tuple[tuple, ...], search_fields: Tuple[str, ...] = ()) -> str:
+    """Compile WHERE predicates (and optional search columns) without the WHERE keyword"""
+    where_parts = []
+    for i, (column, op, logic, arity) in enumerate(where):
+        if i > 0:
+            where_parts.append(logic)
+        where_parts.append(_compile_predicate(column, op, arity))
+
+    # SEARCH (adds OR conditions)
+    if search_fields:
+        search_conditions = " OR ".join(f"{col} ILIKE %s" for col in search_fields)
+        if where_parts:
+            where_parts.append("AND")
+            where_parts.append(f"({search_conditions})")
+        else:
+            where_parts.append(search_conditions)
+
+    return " ".join(where_parts)
+
+
+def _compile_returning(returning: Tuple[str, ...]) -> str:
+    if not returning:
+        return ""
+    return f" RETURNING {', '.join(returning)}"
+
+
+@lru_cache(maxsize=SQL_CACHE_SIZE)
+def _compile_select(shape: tuple) -> str:
+    # Plain tuple rather than a NamedTuple: the key is rebuilt on every query, so it must be cheap
+    (table, fields, distinct, joins, where, search_fields, group_by, having,
+     order_by, has_limit, has_offset, ctes, unions) = shape
+    query_parts = []
+
+    # CTE (WITH clauses) - must come first
+    if ctes:
+        query_parts.append("WITH " + ", ".join(f"{name} AS ({query})" for name, query in ctes))
+
+    query_parts.append("SELECT")
+
+    if distinct:
+        query_parts.append("DISTINCT")
+
+    query_parts.append(", ".join(fields) if fields else "*")
+    query_parts.append(f"FROM {table}")
+
+    for join_type, join_table, on in joins:
+        query_parts.append(f"{join_type.value} JOIN {join_table} ON {on}")
+
+    where_sql = _compile_where(where, search_fields)
+    if where_sql:
+        query_parts.append("WHERE " + where_sql)
+
+    if group_by:
+        query_parts.append(f"GROUP BY {', '.join(group_by)}")
+
+    if having:
+        query_parts.append("HAVING " + " AND ".join(f"{col} {op} %s" for col, op in having))
+
+    if order_by:
+        query_parts.append("ORDER BY " + ", ".join(order_by))
+
+    if has_limit:
+        query_parts.append("LIMIT %s")
+
+    if has_offset:
+        query_parts.append("OFFSET %s")
+
+    query = " ".join(query_parts)
+    for union_type, union_query in unions:
+        query += f" {union_type} {union_query}"
+    return query
+
+
+def _compile_on_conflict(conflict: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]) -> str:
+    """ON CONFLICT clause for (conflict columns, columns to update); no update columns -> DO NOTHING"""
+    if conflict is None:
+        return ""
+    conflict_columns, update_columns = conflict
+    if not update_columns:
+        return f" ON CONFLICT ({', '.join(conflict_columns)}) DO NOTHING"
+    updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+    return f" ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {updates}"
+
+
+@lru_cache(maxsize=SQL_CACHE_SIZE)
+def _compile_insert(table: str, columns: Tuple[str, ...], row_count: Optional[int], returning: Tuple[str, ...],
+                    conflict: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]] = None) -> str:
+    placeholders = f"({','.join(['%s'] * len(columns))})"
+    values = ', '.join([placeholders] * (row_count or 1))
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values}"
+            + _compile_on_conflict(conflict) + _compile_returning(returning))
+
+
+@lru_cache(maxsize=SQL_CACHE_SIZE)
+def _compile_update(table: str, columns: Tuple[str, ...], where: Tuple[tuple, ...], returning: Tuple[str, ...]) -> str:
+    set_sql = ', '.join(f"{col} = %s" for col in columns)
+    return f"UPDATE {table} SET {set_sql} WHERE {_compile_where(where)}" + _compile_returning(returning)
+
+
+@lru_cache(maxsize=SQL_CACHE_SIZE)
+def _compile_update_many(table: str, keys: Tuple[str, ...], columns: Tuple[str, ...], types: Tuple[str, ...],
+                         row_count: int, returning: Tuple[str, ...]) -> str:
+    # VALUES literals are untyped: casting the first row to the target column types types the
+    # whole VALUES list, so uuid/timestamp/json columns compare and assign without errors
+    first_row = f"({', '.join(f'%s::{column_type}' for column_type in types)})"
+    other_rows = f"({', '.join(['%s'] * len(types))})"
+    values = ', '.join([first_row] + [other_rows] * (row_count - 1))
+    set_sql = ', '.join(f"{col} = _v.{col}" for col in columns)
+    match_sql = ' AND '.join(f"_t.{key} = _v.{key}" for key in keys)
+    returning = tuple(
+        field if '.' in field or '(' in field else f"_t.{field}" for field in returning
+    )
+    return (f"UPDATE {table} AS _t SET {set_sql} FROM (VALUES {values}) AS _v ({', '.join(keys + columns)}) "
+            f"WHERE {match_sql}" + _compile_returning(returning))
+
+
+# Column types per table for update_many() (column name -> SQL type), loaded once per table
+_column_types: Dict[str, Dict[str, str]] = {}
+_column_types_lock = threading.Lock()
+
+
+def _table_column_types(cursor, table: str) -> Dict[str, str]:
+    types = _column_types.get(table)
+    if types is None:
+        cursor.execute(
+            "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped",
+            (table,)
+        )
+        types = {row[0]: row[1] for row in cursor.fetchall()}
+        with _column_types_lock:
+            _column_types[table] = types
+    return types
+
+
+@lru_cache(maxsize=SQL_CACHE_SIZE)
+def _compile_delete(table: str, where: Tuple[tuple, ...], returning: Tuple[str, ...]) -> str:
+    return f"DELETE FROM {table} WHERE {_compile_where(where)}" + _compile_returning(returning)
+
+
+@lru_cache(maxsize=SQL_CACHE_SIZE)
+def _compile_copy(table: str, columns: Tuple[str, ...]) -> str:
+    return f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+
+
+def _copy_array(values: Sequence[Any]) -> str:
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append("NULL")
+        elif isinstance(value, (list, tuple)):
+            elements.append(_copy_array(value))
+        else:
+            text = _copy_text(value)
+            elements.append('"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"')
+    return "{" + ",".join(elements) + "}"
+
+
+def _copy_text(value: Any) -> str:
+    """Postgres input text for a value (what psycopg2 would send as a literal)"""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, (list, tuple)):
+        return _copy_array(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    return str(value)
+
+
+def _copy_field(value: Any) -> str:
+    """A value in COPY text format: \\N for NULL, backslash escapes for separators"""
+    if value is None:
+        return "\\N"
+    cls = type(value)
+    if cls is int or cls is float:
+        return str(value)
+    text = value if cls is str else _copy_text(value)
+    if "\\" in text or "\t" in text or "\n" in text or "\r" in text:
+        text = text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return text
+
+
+class _CopyReader:
+    """File-like source for COPY FROM STDIN that renders rows as they are read"""
+
+    def __init__(self, rows: List[Dict[str, Any]], columns: Tuple[str, ...]):
+        self._lines = ("\t".join([_copy_field(row.get(col)) for col in columns]) + "\n" for row in rows)
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            data, self._buffer = self._buffer + "".join(self._lines), ""
+            return data
+        parts, length = [self._buffer], len(self._buffer)
+        for line in self._lines:
+            parts.append(line)
+            length += len(line)
+            if length >= size:
+                break
+        data = "".join(parts)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def sql_cache_info() -> Dict[str, Dict[str, int]]:
+    """Hit/miss statistics of the compiled SQL cache per statement type"""
+    return {
+        name: compiler.cache_info()._asdict()
+        for name, compiler in (
+            ("select", _compile_select),
+            ("insert", _compile_insert),
+            ("update", _compile_update),
+            ("update_many", _compile_update_many),
+            ("delete", _compile_delete),
+            ("copy", _compile_copy),
+        )
+    }
 
 
 class QueryBuilder:
@@ -32,14 +420,22 @@ class QueryBuilder:
         self.where_conditions = []
         self.join_clauses = []
         self.order_by_clauses = []
+        self.order_keys = []  # (column, ascending) per order() call, for keyset pagination
+        self._keyset = None  # ('after' | 'before', cursor token)
         self.group_by_fields = []
         self.having_conditions = []
         self.limit_value = None
         self.offset_value = None
         self.insert_data = None
+        self.use_copy = None  # None: COPY automatically above COPY_THRESHOLD rows
+        self.conflict = None  # (conflict columns, update columns) for upsert()
         self.update_data = None
+        self.update_rows = None  # rows for update_many()
+        self.update_keys = ()
         self.returning_fields = []
+        self._row_factory = "dict"
         self._distinct = False
+        self._count_estimate = None  # alias of a count(estimate=True)
         self.search_fields = []
         self.search_term = None
         # Analytics features
@@ -64,10 +460,40 @@ class QueryBuilder:
             self.select_fields = list(fields)
         return self
 
-    def insert(self, data: Union[Dict[str, Any], List[Dict[str, Any]]]) -> 'QueryBuilder':
-        """Insert data into table"""
+    def insert(self, data: Union[Dict[str, Any], List[Dict[str, Any]]], use_copy: Optional[bool] = None) -> 'QueryBuilder':
+        """
+        Insert data into table
+
+        A list of more than COPY_THRESHOLD rows (DB_COPY_THRESHOLD, default 1000) is streamed
+        with COPY FROM STDIN instead of a single VALUES statement; with returning() the rows
+        are copied into a temp table and moved with INSERT ... SELECT ... RETURNING.
+        Pass use_copy=True/False to force either path.
+        """
         self.query_type = 'insert'
         self.insert_data = data
+        self.use_copy = use_copy
+        return self
+
+    def upsert(self, rows: Union[Dict[str, Any], List[Dict[str, Any]]], conflict_columns: Union[str, List[str]],
+               update_columns: Optional[List[str]] = None) -> 'QueryBuilder':
+        """
+        Insert rows, updating the existing row on a unique conflict (INSERT ... ON CONFLICT)
+
+        Args:
+            rows: Row dict or list of row dicts (same keys)
+            conflict_columns: Column(s) of the unique constraint or index to match on
+            update_columns: Columns to overwrite on conflict (default: every inserted column
+                except the conflict columns); an empty list means ON CONFLICT DO NOTHING
+
+        A single statement cannot touch the same row twice, so rows must have distinct keys.
+        """
+        if isinstance(conflict_columns, str):
+            conflict_columns = [conflict_columns]
+        first = rows[0] if isinstance(rows, list) and rows else rows
+        if update_columns is None:
+            update_columns = [col for col in (first or {}) if col not in conflict_columns]
+        self.insert(rows)
+        self.conflict = (tuple(conflict_columns), tuple(update_columns))
         return self
 
     def update(self, data: Dict[str, Any]) -> 'QueryBuilder':
@@ -76,6 +502,23 @@ class QueryBuilder:
         self.update_data = data
         return self
 
+    def update_many(self, rows: List[Dict[str, Any]], key: Union[str, List[str]]) -> 'QueryBuilder':
+        """
+        Update many rows with different values in one statement (UPDATE ... FROM (VALUES ...))
+
+        Each row holds the key column(s) plus the columns to set; rows are matched on the key.
+
+        Example:
+            db.table("user").update_many([
+                {"user_id": uid1, "status": "active"},
+                {"user_id": uid2, "status": "banned"},
+            ], key="user_id").execute()
+        """
+        self.query_type = 'update'
+        self.update_rows = rows
+        self.update_keys = (key,) if isinstance(key, str) else tuple(key)
+        return self
+
     def delete(self) -> 'QueryBuilder':
         """Delete from table"""
         self.query_type = 'delete'
@@ -120,11 +563,11 @@ class QueryBuilder:
         return self.where(column, 'ILIKE', pattern)
 
     def in_(self, column: str, values: List[Any]) -> 'QueryBuilder':
-        """IN condition"""
+        """IN condition, bound as one array parameter (`column = ANY(%s)`)"""
         return self.where(column, 'IN', values)
 
     def not_in(self, column: str, values: List[Any]) -> 'QueryBuilder':
-        """NOT IN condition"""
+        """NOT IN condition, bound as one array parameter (`column <> ALL(%s)`)"""
         return self.where(column, 'NOT IN', values)
 
     def is_null(self, column: str) -> 'QueryBuilder':
@@ -214,6 +657,7 @@ class QueryBuilder:
         direction = "ASC" if ascending else "DESC"
         nulls = "NULLS FIRST" if nulls_first else "NULLS LAST"
         self.order_by_clauses.append(f"{column} {direction} {nulls}")
+        self.order_keys.append((column, ascending))
         return self
 
     def order_by(self, column: str, ascending: bool = True) -> 'QueryBuilder':
@@ -236,6 +680,58 @@ class QueryBuilder:
         self.offset_value = from_index
         return self
 
+    # Keyset (cursor) pagination
+    def after(self, cursor: Optional[str]) -> 'QueryBuilder':
+        """
+        Return rows after a cursor in ORDER BY order
+
+        Unlike offset(), the cost does not grow with page depth. ORDER BY columns must be
+        NOT NULL, share one direction and end with a unique column (e.g. the primary key).
+        Cursors come from QueryResult.next_cursor / prev_cursor. A falsy cursor is ignored.
+
+        Example:
+            page = db.table("activity_log").select("*")\
+                .order("created_at", ascending=False).order("log_id", ascending=False)\
+                .limit(50).after(token).execute()
+            token = page.next_cursor
+        """
+        self._keyset = ('after', cursor) if cursor else None
+        return self
+
+    def before(self, cursor: Optional[str]) -> 'QueryBuilder':
+        """Return rows before a cursor in ORDER BY order (the previous page); see after()"""
+        self._keyset = ('before', cursor) if cursor else None
+        return self
+
+    def _order_values(self, row: Dict[str, Any]) -> List[Any]:
+        # ORDER BY columns are read from the row by unqualified name
+        return [row[column.rsplit('.', 1)[-1]] for column, _ in self.order_keys]
+
+    def cursor_for(self, row: Dict[str, Any]) -> str:
+        """Pagination cursor for a result row"""
+        return encode_cursor(self._order_values(row))
+
+    def _page_cursors(self, rows: List[tuple], columns: Tuple[str, ...]) -> Tuple[Optional[str], Optional[str]]:
+        """Next/previous page cursors for a page of fetched tuples (order() and limit() queries)"""
+        if not rows or not self.order_keys or self.limit_value is None:
+            return None, None
+        try:
+            first = self._order_values(dict(zip(columns, rows[0])))
+            last = self._order_values(dict(zip(columns, rows[-1])))
+        except KeyError:
+            # ORDER BY columns not selected
+            return None, None
+        direction = self._keyset[0] if self._keyset else ('after' if self.offset_value else None)
+        return page_cursors(first, last, len(rows) >= self.limit_value, direction)
+
+    def _keyset_ascending(self) -> bool:
+        if not self.order_keys:
+            raise ValueError("Keyset pagination requires order()")
+        ascending = self.order_keys[0][1]
+        if any(asc != ascending for _, asc in self.order_keys):
+            raise ValueError("Keyset pagination requires all order() columns to use the same direction")
+        return ascending
+
     # GROUP BY and HAVING
     def group_by(self, *columns: str) -> 'QueryBuilder':
         """Group by columns"""
@@ -254,11 +750,25 @@ class QueryBuilder:
         return self
 
     # COUNT
-    def count(self, column: str = "*", alias: Optional[str] = None) -> 'QueryBuilder':
-        """Count rows - can be used with other select fields"""
+    def count(self, column: str = "*", alias: Optional[str] = None, estimate: bool = False) -> 'QueryBuilder':
+        """
+        Count rows - can be used with other select fields
+
+        estimate=True answers large counts from planner statistics instead of scanning
+        (pg_class.reltuples without filters, the EXPLAIN row estimate with them); counts
+        below DB_COUNT_ESTIMATE_THRESHOLD are still exact. The estimate counts rows, so it
+        ignores NULLs in `column`. Check QueryResult.count_is_estimate. Only for a count on
+        its own (no other select fields, GROUP BY, HAVING, DISTINCT or UNION).
+
+        Example:
+            result = db.table("activity_log").count(estimate=True).eq("level", "error").execute()
+            result.count, result.count_is_estimate
+        """
         self.query_type = 'select'
         alias = alias or "count"
         self.select_fields.append(f"COUNT({column}) as {alias}")
+        if estimate:
+            self._count_estimate = alias
         return self
 
     # AGGREGATION FUNCTIONS (Analytics)
@@ -415,115 +925,80 @@ class QueryBuilder:
             self.returning_fields = fields
         return self
 
+    def row_factory(self, factory: str) -> 'QueryBuilder':
+        """
+        Choose the format of result rows (execute(), stream() and RETURNING)
+
+        - "dict": list of dicts (default)
+        - "tuple": list of tuples as fetched, no conversion; names in QueryResult.columns
+        - "record": list of record objects (record_class(), cached per column set)
+        - "columns": dict of column name -> list of values, for analytics
+
+        Example:
+            result = db.table("activity_log").select("level", "created_at").row_factory("columns").execute()
+            levels = result.data["level"]
+        """
+        if factory not in ROW_FACTORIES:
+            raise ValueError(f"Unknown row factory: {factory} (expected one of {', '.join(ROW_FACTORIES)})")
+        self._row_factory = factory
+        return self
+
     # Build SQL
+    # SQL text is compiled from the query *shape* (tables, fields, operators, IN-list
+    # arity, clause presence) and cached, so repeated queries only rebind parameters.
     def _build_select_query(self) -> Tuple[str, List[Any]]:
         """Build SELECT query"""
         params = []
-        query_parts = []
-
-        # CTE (WITH clauses) - must come first
+        ctes = unions = having = ()
         if self.cte_clauses:
-            cte_parts = []
-            for name, query, cte_params in self.cte_clauses:
-                cte_parts.append(f"{name} AS ({query})")
+            ctes = tuple([(name, query) for name, query, _ in self.cte_clauses])
+            for _, _, cte_params in self.cte_clauses:
                 params.extend(cte_params)
-            query_parts.append("WITH " + ", ".join(cte_parts))
-
-        query_parts.append("SELECT")
-
-        # DISTINCT
-        if self._distinct:
-            query_parts.append("DISTINCT")
-
-        # SELECT fields
-        if not self.select_fields:
-            query_parts.append("*")
-        else:
-            query_parts.append(", ".join(self.select_fields))
-
-        # FROM
-        query_parts.append(f"FROM {self.table_name}")
-
-        # JOINs
-        for join_type, table, on in self.join_clauses:
-            query_parts.append(f"{join_type.value} JOIN {table} ON {on}")
-
-        # WHERE
-        where_parts = []
-        for i, (col, op, val, logic) in enumerate(self.where_conditions):
-            if i > 0:
-                where_parts.append(logic)
-
-            if op == 'IN':
-                placeholders = ','.join(['%s'] * len(val))
-                where_parts.append(f"{col} IN ({placeholders})")
-                params.extend(val)
-            elif op == 'NOT IN':
-                placeholders = ','.join(['%s'] * len(val))
-                where_parts.append(f"{col} NOT IN ({placeholders})")
-                params.extend(val)
-            elif op == 'BETWEEN':
-                where_parts.append(f"{col} BETWEEN %s AND %s")
-                params.extend([val[0], val[1]])
-            elif op == 'IS':
-                where_parts.append(f"{col} IS NULL")
-            elif op == 'IS NOT':
-                where_parts.append(f"{col} IS NOT NULL")
-            else:
-                where_parts.append(f"{col} {op} %s")
-                params.append(val)
 
-        # SEARCH (adds OR conditions)
+        predicates = self.where_conditions
+        order_by = tuple(self.order_by_clauses)
+        if self._keyset:
+            direction, token = self._keyset
+            ascending = self._keyset_ascending()
+            columns = [column for column, _ in self.order_keys]
+            values = decode_cursor(token, len(columns))
+            row, op = _keyset_comparison(columns, ascending, before=direction == 'before')
+            predicates = predicates + [(row, op, tuple(values), 'AND')]
+            if direction == 'before':
+                # Walk backwards from the cursor; rows are put back in order after fetching
+                order_by = tuple(
+                    f"{column} {'DESC NULLS FIRST' if asc else 'ASC NULLS LAST'}" for column, asc in self.order_keys
+                )
+
+        where = _bind_where(predicates, params)
+
+        search_fields = ()
         if self.search_term and self.search_fields:
-            search_conditions = []
-            for i, col in enumerate(self.search_fields):
-                if i > 0:  # Add OR before each field except the first one
-                    search_conditions.append("OR")
-                search_conditions.append(f"{col} ILIKE %s")
-                params.append(f"%{self.search_term}%")
-
-            if where_parts:
-                where_parts.append("AND")
-                where_parts.append("(" + " ".join(search_conditions) + ")")
-            else:
-                where_parts.extend(search_conditions)
-
-        if where_parts:
-            query_parts.append("WHERE " + " ".join(where_parts))
+            search_fields = tuple(self.search_fields)
+            params.extend([f"%{self.search_term}%"] * len(search_fields))
 
-        # GROUP BY
-        if self.group_by_fields:
-            query_parts.append(f"GROUP BY {', '.join(self.group_by_fields)}")
-
-        # HAVING
         if self.having_conditions:
-            having_parts = []
-            for col, op, val in self.having_conditions:
-                having_parts.append(f"{col} {op} %s")
-                params.append(val)
-            query_parts.append("HAVING " + " AND ".join(having_parts))
-
-        # ORDER BY
-        if self.order_by_clauses:
-            query_parts.append("ORDER BY " + ", ".join(self.order_by_clauses))
+            having = tuple([(col, op) for col, op, _ in self.having_conditions])
+            params.extend([val for _, _, val in self.having_conditions])
 
-        # LIMIT
-        if self.limit_value is not None:
-            query_parts.append(f"LIMIT {self.limit_value}")
+        has_limit = self.limit_value is not None
+        if has_limit:
+            params.append(self.limit_value)
+        has_offset = self.offset_value is not None
+        if has_offset:
+            params.append(self.offset_value)
 
-        # OFFSET
-        if self.offset_value is not None:
-            query_parts.append(f"OFFSET {self.offset_value}")
-
-        # UNION queries
         if self.union_queries:
-            base_query = " ".join(query_parts)
-            for union_type, union_query, union_params in self.union_queries:
-                base_query += f" {union_type} {union_query}"
+            unions = tuple([(union_type, query) for union_type, query, _ in self.union_queries])
+            for _, _, union_params in self.union_queries:
                 params.extend(union_params)
-            return base_query, params
 
-        return " ".join(query_parts), params
+        shape = (
+            self.table_name, tuple(self.select_fields), self._distinct, tuple(self.join_clauses),
+            where, search_fields, tuple(self.group_by_fields), having, order_by,
+            has_limit, has_offset, ctes, unions,
+        )
+        return _compile_select(shape), params
 
     def _build_insert_query(self) -> Tuple[str, List[Any]]:
         """Build INSERT query"""
@@ -534,160 +1009,173 @@ class QueryBuilder:
             if not self.insert_data:
                 raise ValueError("Insert data cannot be empty")
 
-            columns = list(self.insert_data[0].keys())
-            values_list = []
-
+            columns = tuple(self.insert_data[0].keys())
             for row in self.insert_data:
-                placeholders = ','.join(['%s'] * len(columns))
-                values_list.append(f"({placeholders})")
                 params.extend([row.get(col) for col in columns])
-
-            query = f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES {', '.join(values_list)}"
+            row_count = len(self.insert_data)
         else:
             # Single row
-            columns = list(self.insert_data.keys())
-            placeholders = ','.join(['%s'] * len(columns))
-            values = [self.insert_data[col] for col in columns]
-            params.extend(values)
+            columns = tuple(self.insert_data.keys())
+            params.extend([self.insert_data[col] for col in columns])
+            row_count = None
 
-            query = f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+        return _compile_insert(self.table_name, columns, row_count, tuple(self.returning_fields), self.conflict), params
 
-        # RETURNING
-        if self.returning_fields:
-            if self.returning_fields == ['*']:
-                query += " RETURNING *"
-            else:
-                query += f" RETURNING {', '.join(self.returning_fields)}"
+    def _build_update_many_query(self, cursor) -> Tuple[str, List[Any]]:
+        """Build UPDATE ... FROM (VALUES ...) for update_many() (needs a cursor for column types)"""
+        if not self.update_rows:
+            raise ValueError("Update data cannot be empty")
+        keys = self.update_keys
+        columns = tuple(col for col in self.update_rows[0] if col not in keys)
+        if not columns:
+            raise ValueError("update_many() rows need at least one column besides the key")
+        table_types = _table_column_types(cursor, self.table_name)
+        try:
+            types = tuple(table_types[col] for col in keys + columns)
+        except KeyError as e:
+            raise ValueError(f"Unknown column for {self.table_name}: {e.args[0]}") from None
 
+        params = []
+        for row in self.update_rows:
+            params.extend([row[col] for col in keys])
+            params.extend([row.get(col) for col in columns])
+        query = _compile_update_many(
+            self.table_name, keys, columns, types, len(self.update_rows), tuple(self.returning_fields)
+        )
         return query, params
 
     def _build_update_query(self) -> Tuple[str, List[Any]]:
         """Build UPDATE query"""
         if not self.update_data:
             raise ValueError("Update data cannot be empty")
-
-        params = []
-        set_parts = []
-
-        for col, val in self.update_data.items():
-            set_parts.append(f"{col} = %s")
-            params.append(val)
-
-        query = f"UPDATE {self.table_name} SET {', '.join(set_parts)}"
-
-        # WHERE
-        where_parts = []
-        for i, (col, op, val, logic) in enumerate(self.where_conditions):
-            if i > 0:
-                where_parts.append(logic)
-
-            if op == 'IN':
-                placeholders = ','.join(['%s'] * len(val))
-                where_parts.append(f"{col} IN ({placeholders})")
-                params.extend(val)
-            elif op == 'NOT IN':
-                placeholders = ','.join(['%s'] * len(val))
-                where_parts.append(f"{col} NOT IN ({placeholders})")
-                params.extend(val)
-            elif op == 'BETWEEN':
-                where_parts.append(f"{col} BETWEEN %s AND %s")
-                params.extend([val[0], val[1]])
-            elif op == 'IS':
-                where_parts.append(f"{col} IS NULL")
-            elif op == 'IS NOT':
-                where_parts.append(f"{col} IS NOT NULL")
-            else:
-                where_parts.append(f"{col} {op} %s")
-                params.append(val)
-
-        if where_parts:
-            query += " WHERE " + " ".join(where_parts)
-        else:
+        if not self.where_conditions:
             raise ValueError("UPDATE query requires WHERE conditions for safety")
 
-        # RETURNING
-        if self.returning_fields:
-            if self.returning_fields == ['*']:
-                query += " RETURNING *"
-            else:
-                query += f" RETURNING {', '.join(self.returning_fields)}"
+        params = list(self.update_data.values())
+        where = _bind_where(self.where_conditions, params)
 
+        query = _compile_update(self.table_name, tuple(self.update_data), where, tuple(self.returning_fields))
         return query, params
 
     def _build_delete_query(self) -> Tuple[str, List[Any]]:
         """Build DELETE query"""
-        params = []
-        query = f"DELETE FROM {self.table_name}"
-
-        # WHERE
-        where_parts = []
-        for i, (col, op, val, logic) in enumerate(self.where_conditions):
-            if i > 0:
-                where_parts.append(logic)
-
-            if op == 'IN':
-                placeholders = ','.join(['%s'] * len(val))
-                where_parts.append(f"{col} IN ({placeholders})")
-                params.extend(val)
-            elif op == 'NOT IN':
-                placeholders = ','.join(['%s'] * len(val))
-                where_parts.append(f"{col} NOT IN ({placeholders})")
-                params.extend(val)
-            elif op == 'BETWEEN':
-                where_parts.append(f"{col} BETWEEN %s AND %s")
-                params.extend([val[0], val[1]])
-            elif op == 'IS':
-                where_parts.append(f"{col} IS NULL")
-            elif op == 'IS NOT':
-                where_parts.append(f"{col} IS NOT NULL")
-            else:
-                where_parts.append(f"{col} {op} %s")
-                params.append(val)
-
-        if where_parts:
-            query += " WHERE " + " ".join(where_parts)
-        else:
+        if not self.where_conditions:
             raise ValueError("DELETE query requires WHERE conditions for safety")
 
-        # RETURNING
-        if self.returning_fields:
-            if self.returning_fields == ['*']:
-                query += " RETURNING *"
-            else:
-                query += f" RETURNING {', '.join(self.returning_fields)}"
-
-        return query, params
-
-    def execute(self) -> QueryResult:
-        """Execute the query"""
-        if not self.query_type:
-            raise ValueError("No query type specified. Use select(), insert(), update(), or delete()")
+        params = []
+        where = _bind_where(self.where_conditions, params)
+
+        return _compile_delete(self.table_name, where, tuple(self.returning_fields)), params
+
+    def _build_query(self) -> Tuple[str, List[Any]]:
+        """Build the SQL and params for the current query type"""
+        if self.query_type == 'select':
+            return self._build_select_query()
+        elif self.query_type == 'insert':
+            return self._build_insert_query()
+        elif self.query_type == 'update':
+            return self._build_update_query()
+        elif self.query_type == 'delete':
+            return self._build_delete_query()
+        raise ValueError(f"Unknown query type: {self.query_type}")
+
+    def _copies(self) -> bool:
+        """Whether a list insert goes through COPY"""
+        if self.query_type != 'insert' or not isinstance(self.insert_data, list) or not self.insert_data:
+            return False
+        if self.use_copy is not None:
+            return self.use_copy
+        return len(self.insert_data) > COPY_THRESHOLD
+
+    def _run_copy(self, conn) -> QueryResult:
+        """Bulk insert through COPY FROM STDIN (no transaction handling)"""
+        columns = tuple(self.insert_data[0].keys())
+        cursor = conn.cursor()
+        try:
+            logger.debug(f"Copying {len(self.insert_data)} rows into {self.table_name}", module="Postgres")
+            if not self.returning_fields and self.conflict is None:
+                copy_sql = _compile_copy(self.table_name, columns)
+                query_stats.observe(copy_sql, None, cursor, cursor.copy_expert,
+                                    copy_sql, _CopyReader(self.insert_data, columns), COPY_CHUNK_SIZE)
+                return QueryResult(data=[], count=None)
 
+            # COPY has no RETURNING / ON CONFLICT: stage the rows in a temp table (column types
+            # only, no constraints) and move them with one INSERT ... SELECT
+            column_list = ', '.join(columns)
+            staging = f"_qb_copy_{next(_copy_ids)}"
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {self.table_name} WITH NO DATA"
+            )
+            copy_sql = _compile_copy(staging, columns)
+            query_stats.observe(copy_sql, None, cursor, cursor.copy_expert,
+                                copy_sql, _CopyReader(self.insert_data, columns), COPY_CHUNK_SIZE)
+            move_sql = (
+                f"INSERT INTO {self.table_name} ({column_list}) SELECT {column_list} FROM {staging}"
+                + _compile_on_conflict(self.conflict) + _compile_returning(tuple(self.returning_fields))
+            )
+            query_stats.observe(move_sql, None, cursor, cursor.execute, move_sql)
+            result = QueryResult(data=[], count=None)
+            if self.returning_fields:
+                names = _column_names(cursor)
+                result = QueryResult(data=_shape_rows(cursor.fetchall(), names, self._row_factory), columns=names)
+            cursor.execute(f"DROP TABLE {staging}")
+            return result
+        finally:
+            cursor.close()
+
+    def _estimate_count(self, conn) -> Optional[int]:
+        """Planner estimate for count(estimate=True); None when the exact count should run"""
+        if (len(self.select_fields) != 1 or self.group_by_fields or self.having_conditions
+                or self._distinct or self.union_queries):
+            raise ValueError("count(estimate=True) must be the only select field (no GROUP BY, HAVING, DISTINCT or UNION)")
+        cursor = conn.cursor()
         try:
-            cursor = self.connection.cursor(cursor_factory=DictCursor)
-
-            if self.query_type == 'select':
-                query, params = self._build_select_query()
-            elif self.query_type == 'insert':
-                query, params = self._build_insert_query()
-            elif self.query_type == 'update':
-                query, params = self._build_update_query()
-            elif self.query_type == 'delete':
-                query, params = self._build_delete_query()
+            if not (self.where_conditions or self.join_clauses or self.search_term or self.cte_clauses):
+                rows = table_row_estimate(cursor, self.table_name)
             else:
-                raise ValueError(f"Unknown query type: {self.query_type}")
-
-            logger.debug(f"Executing query: {query}", module="Postgres")
-            logger.debug(f"With params: {params}", module="Postgres")
+                # Same FROM / WHERE, without the aggregate (whose plan estimates one row)
+                probe = copy.copy(self)
+                probe.select_fields = ["1"]
+                probe.order_by_clauses = []
+                probe.limit_value = probe.offset_value = None
+                probe._keyset = None
+                rows = plan_row_estimate(cursor, *probe._build_select_query())
+        finally:
+            cursor.close()
+        if rows is None or rows < COUNT_ESTIMATE_THRESHOLD:
+            return None
+        return int(round(rows))
+
+    def _run(self, conn) -> QueryResult:
+        """Run the query on a raw connection and fetch results (no transaction handling)"""
+        if self._copies():
+            return self._run_copy(conn)
+        if self._count_estimate is not None and self.query_type == 'select':
+            estimate = self._estimate_count(conn)
+            if estimate is not None:
+                columns = (self._count_estimate,)
+                return QueryResult(data=_shape_rows([(estimate,)], columns, self._row_factory), count=estimate,
+                                   columns=columns, count_is_estimate=True)
+        # Plain tuple cursor: rows are converted once, to the row_factory() format
+        cursor = conn.cursor()
+        try:
+            if self.update_rows is not None:
+                query, params = self._build_update_many_query(cursor)
+            else:
+                query, params = self._build_query()
 
-            cursor.execute(query, params)
+            query_stats.observe(query, params, cursor, cursor.execute, query, params)
 
             # Fetch results
             if self.query_type in ['select', 'insert', 'update', 'delete'] and (
                 self.returning_fields or self.query_type == 'select'
             ):
                 rows = cursor.fetchall()
-                data = [dict(row) for row in rows]
+                columns = _column_names(cursor)
+                if self._keyset and self._keyset[0] == 'before':
+                    rows.reverse()
+                data = _shape_rows(rows, columns, self._row_factory)
 
                 # Get count for SELECT queries
                 # If count was explicitly requested, extract from result
@@ -696,32 +1184,181 @@ class QueryBuilder:
                     # Check if any select field contains COUNT
                     has_count = any('COUNT(' in str(field).upper() for field in self.select_fields)
                     if has_count:
-                        # Extract count from result - look for 'count' key or first value
-                        if data and len(data) > 0:
-                            if 'count' in data[0]:
-                                count = data[0]['count']
-                            else:
-                                # Try to get first value if it's a count query
-                                count = list(data[0].values())[0] if data[0] else 0
+                        # Extract count from result - look for 'count' column or first value
+                        if rows:
+                            count = rows[0][columns.index('count')] if 'count' in columns else rows[0][0]
                     else:
-                        count = len(data)
+                        count = len(rows)
 
-                cursor.close()
-                self.connection.commit()
+                    next_cursor, prev_cursor = self._page_cursors(rows, columns)
+                    return QueryResult(data=data, count=count, next_cursor=next_cursor, prev_cursor=prev_cursor,
+                                       columns=columns)
 
-                return QueryResult(data=data, count=count)
-            else:
-                # For INSERT/UPDATE/DELETE without RETURNING
-                cursor.close()
-                self.connection.commit()
+                return QueryResult(data=data, count=count, columns=columns)
 
-                return QueryResult(data=[], count=None)
+            # For INSERT/UPDATE/DELETE without RETURNING
+            return QueryResult(data=[], count=None)
+        finally:
+            cursor.close()
+
+    def execute(self) -> QueryResult:
+        """
+        Execute the query
+
+        Builders created from `db.table()` check out a pooled connection and commit
+        when they own it; inside an open `with db` block they join its transaction.
+        """
+        if not self.query_type:
+            raise ValueError("No query type specified. Use select(), insert(), update(), or delete()")
 
+        try:
+            if self.connection is not None:
+                try:
+                    result = self._run(self.connection)
+                    self.connection.commit()
+                    return result
+                except Exception:
+                    self.connection.rollback()
+                    raise
+
+            with connection.checkout(read=self.query_type == 'select') as checkout:
+                result = checkout.call(self._run)
+                if self.query_type != 'select':
+                    checkout.wrote = True
+                return result
         except Exception as e:
-            self.connection.rollback()
             logger.error(f"Query execution error: {e}", exc_info=True, module="Postgres")
             raise
 
+    async def execute_async(self) -> QueryResult:
+        """Execute the query without blocking the event loop"""
+        if not self.query_type:
+            raise ValueError("No query type specified. Use select(), insert(), update(), or delete()")
+
+        if self.connection is not None:
+            return await asyncio.get_running_loop().run_in_executor(None, self.execute)
+
+        try:
+            async with connection.checkout_async(read=self.query_type == 'select') as checkout:
+                result = await checkout.pool.run(checkout.call, self._run)
+                if self.query_type != 'select':
+                    checkout.wrote = True
+                return result
+        except Exception as e:
+            logger.error(f"Query execution error: {e}", exc_info=True, module="Postgres")
+            raise
+
+    def _build_stream_query(self, batch_size: int) -> Tuple[str, List[Any]]:
+        if self.query_type != 'select':
+            raise ValueError("stream() is only supported for select() queries")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        return self._build_select_query()
+
+    @staticmethod
+    def _declare_stream(conn, query: str, params: List[Any], batch_size: int):
+        """Open a named (server-side) cursor for the query"""
+        cursor = conn.cursor(name=f"qb_stream_{next(_stream_ids)}")
+        cursor.itersize = batch_size
+        query_stats.observe(query, params, cursor, cursor.execute, query, params)
+        return cursor
+
+    def _stream_batches(self, call, query: str, params: List[Any], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Fetch batch_size rows per round trip; call(func, *args) runs func on the connection"""
+        try:
+            cursor = call(self._declare_stream, query, params, batch_size)
+        except Exception as e:
+            logger.error(f"Query execution error: {e}", exc_info=True, module="Postgres")
+            raise
+        try:
+            columns = None
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                if columns is None:
+                    columns = _column_names(cursor)
+                yield _shape_rows(rows, columns, self._row_factory)
+        except Exception as e:
+            logger.error(f"Query streaming error: {e}", exc_info=True, module="Postgres")
+            raise
+        finally:
+            try:
+                cursor.close()
+            except psycopg2.Error:
+                pass
+
+    def stream(self, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield SELECT results in batches of up to batch_size rows (in the row_factory() format)
+
+        Rows come from a named server-side cursor, so memory stays bounded by one batch
+        whatever the result size. Inside a `with db` block the stream joins its transaction;
+        otherwise it holds its own pooled connection (not shared with code running between
+        batches) until the generator is exhausted or closed. On an explicit connection the
+        caller owns the transaction.
+
+        Example:
+            for batch in db.table("activity_log").select("*").order("created_at").stream(500):
+                writer.writerows(batch)
+        """
+        query, params = self._build_stream_query(batch_size)
+
+        if self.connection is not None:
+            yield from self._stream_batches(
+                lambda func, *args: func(self.connection, *args), query, params, batch_size
+            )
+            return
+
+        joined = _current_checkout.get()
+        checkout = joined if joined is not None else connection._acquire(read=True)
+        try:
+            yield from self._stream_batches(checkout.call, query, params, batch_size)
+        except Exception:
+            checkout.failed = True
+            raise
+        finally:
+            if joined is None:
+                checkout.finish()
+
+    async def stream_async(self, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Async variant of stream(); every fetch runs off the event loop"""
+        query, params = self._build_stream_query(batch_size)
+
+        if self.connection is not None:
+            loop = asyncio.get_running_loop()
+            batches = self._stream_batches(
+                lambda func, *args: func(self.connection, *args), query, params, batch_size
+            )
+            async for batch in _drain(batches, lambda func, *args: loop.run_in_executor(None, func, *args)):
+                yield batch
+            return
+
+        joined = _current_checkout.get()
+        checkout = joined if joined is not None else await connection._acquire_async(read=True)
+        try:
+            batches = self._stream_batches(checkout.call, query, params, batch_size)
+            async for batch in _drain(batches, checkout.pool.run):
+                yield batch
+        except Exception:
+            checkout.failed = True
+            raise
+        finally:
+            if joined is None:
+                await checkout.pool.run(checkout.finish)
+
+
+async def _drain(batches: Iterator, run) -> AsyncIterator:
+    """Step a blocking generator with run(func, *args) and re-yield its items"""
+    try:
+        while True:
+            batch = await run(next, batches, None)
+            if batch is None:
+                return
+            yield batch
+    finally:
+        await run(batches.close)
+
 
 class PostgresConnection:
     def __init__(self, host, database, user, password, port):
@@ -788,14 +1425,247 @@ class PostgresConnection:
         return initialize_trigger_workflow(self.connection)
 
 
+# Checkout of a pooled connection shared by nested `with db` blocks and query
+# builders running in the same context. Only the outermost block commits.
+_current_checkout: ContextVar[Optional['_Checkout']] = ContextVar('postgres_checkout', default=None)
+
+
+class _Checkout:
+    """A pooled connection checked out for one unit of work"""
+
+    __slots__ = ("pool", "conn", "frames", "failed", "statements", "wrote", "budget")
+
+    def __init__(self, pool: ConnectionPool, conn: PooledConnection):
+        self.pool = pool
+        self.conn = conn
+        self.frames = []  # [context token (outermost only), cursor] per open block
+        self.failed = False
+        self.statements = 0
+        self.wrote = False  # data was modified (read-your-writes, see replica.py)
+        self.budget: Optional[DbBudget] = None  # request budget the checkout works for (deadline.py)
+
+    @property
+    def raw(self):
+        return self.conn.raw
+
+    def call(self, func, *args):
+        """
+        Run func(raw_connection, *args)
+
+        If the first statement of the checkout fails because the connection is
+        dead, nothing has happened in the transaction yet, so it is retried once
+        on a fresh connection.
+
+        Under a request budget (deadline.py) each transaction starts with its statement and
+        lock timeouts, and statements are refused once the budget is used up.
+        """
+        budget = current_budget()
+        if budget is None:
+            return self._call(func, args, None)
+        try:
+            return self._call(func, args, budget)
+        except psycopg2.Error as e:
+            budget.record_failure(e)
+            raise
+
+    def _call(self, func, args, budget: Optional[DbBudget]):
+        first = self.statements == 0
+        self.statements += 1
+        try:
+            if budget is not None:
+                self._begin(budget, first)
+            return func(self.conn.raw, *args)
+        except DISCONNECT_ERRORS as e:
+            if not (first and is_disconnect(e, self.conn.raw)):
+                raise
+            logger.warning(f"Database connection lost ({e}). Retrying on a fresh connection.", module="Postgres")
+            self.reconnect()
+            if budget is not None:
+                self._begin(budget, True)
+            return func(self.conn.raw, *args)
+
+    def _begin(self, budget: DbBudget, first: bool):
+        budget.check()
+        if first:
+            budget.begin(self, self.conn.raw)
+            self.budget = budget
+
+    def commit(self):
+        """Commit the work done so far; the checkout stays open for further statements"""
+        self.conn.raw.commit()
+        self.failed = False
+        self.statements = 0
+
+    def rollback(self):
+        """Roll back the work done so far; the checkout stays open for further statements"""
+        self.conn.raw.rollback()
+        self.failed = False
+        self.statements = 0
+        self.wrote = False
+
+    def reconnect(self):
+        """Swap a dead connection for a fresh one from the pool"""
+        self.pool.release(self.conn, discard=True)
+        self.conn = self.pool.acquire()
+        self.pool.record_reconnect()
+
+    def finish(self):
+        """
+        Commit (or roll back after a failure) and hand the connection back to the pool
+
+        Callers run mark_write() for committed writes themselves: finish() may run on the
+        pool executor, where context variables set here would be lost.
+        """
+        raw = self.conn.raw
+        try:
+            if self.failed:
+                try:
+                    raw.rollback()
+                except psycopg2.Error:
+                    pass
+            else:
+                raw.commit()
+        except Exception:
+            try:
+                raw.rollback()
+            except psycopg2.Error:
+                pass
+            raise
+        finally:
+            if self.budget is not None:
+                self.budget.release(self)
+                self.budget = None
+            self.pool.release(self.conn, discard=bool(raw.closed))
+
+
+# Command tags (cursor.statusmessage) of statements that do not modify data; anything
+# else executed through a pooled cursor counts as a write for read-your-writes routing
+_READ_COMMAND_TAGS = (
+    "SELECT", "SHOW", "FETCH", "MOVE", "DECLARE", "CLOSE", "EXPLAIN", "PREPARE", "DEALLOCATE",
+    "SET", "RESET", "BEGIN", "START TRANSACTION", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "LISTEN",
+)
+
+
+class PooledCursor:
+    """
+    DictCursor proxy bound to a checkout rather than a single connection,
+    so it follows the checkout if a dead connection is replaced
+    """
+
+    __slots__ = ("_checkout", "_conn", "_cursor")
+
+    def __init__(self, checkout: _Checkout):
+        self._checkout = checkout
+        self._conn = checkout.conn
+        self._cursor = checkout.raw.cursor(cursor_factory=DictCursor)
+
+    def _bound(self):
+        if self._conn is not self._checkout.conn:
+            self._conn = self._checkout.conn
+            self._cursor = self._conn.raw.cursor(cursor_factory=DictCursor)
+        return self._cursor
+
+    def _track_write(self, cursor):
+        if not self._checkout.wrote and not (cursor.statusmessage or "").startswith(_READ_COMMAND_TAGS):
+            self._checkout.wrote = True
+
+    def _execute(self, raw, query, params):
+        cursor = self._bound()
+        query_stats.observe(query, params, cursor, cursor.execute, query, params)
+        self._track_write(cursor)
+
+    def _executemany(self, raw, query, params_seq):
+        cursor = self._bound()
+        # The first parameter set stands in for the batch if a slow batch is explained
+        params_seq = list(params_seq)
+        sample = params_seq[0] if params_seq else None
+        query_stats.observe(query, sample, cursor, cursor.executemany, query, params_seq)
+        self._track_write(cursor)
+
+    def _execute_prepared(self, raw, name, params):
+        # Resolved after a possible reconnect, so a fresh connection prepares the statement again
+        cursor = self._bound()
+        statement = prepared_statements.get(name)
+        query_stats.observe(statement.sql, params, cursor, prepared_statements.execute,
+                            cursor, self._checkout.conn.prepared, name, params)
+        self._track_write(cursor)
+
+    def execute(self, query, params=None):
+        return self._checkout.call(self._execute, query, params)
+
+    def executemany(self, query, params_seq):
+        return self._checkout.call(self._executemany, query, params_seq)
+
+    def execute_prepared(self, name: str, params=()):
+        """Execute a statement registered with prepared_statements (prepared lazily per connection)"""
+        return self._checkout.call(self._execute_prepared, name, params)
+
+    def close(self):
+        try:
+            self._cursor.close()
+        except Exception:
+            pass
+
+    def __iter__(self):
+        return iter(self._bound())
+
+    def __getattr__(self, name):
+        return getattr(self._bound(), name)
+
+
+class AsyncCursor:
+    """Pooled cursor wrapper whose blocking calls run on the pool executor"""
+
+    def __init__(self, cursor: PooledCursor, pool: ConnectionPool):
+        self._cursor = cursor
+        self._pool = pool
+
+    async def execute(self, query, params=None):
+        return await self._pool.run(self._cursor.execute, query, params)
+
+    async def executemany(self, query, params_seq):
+        return await self._pool.run(self._cursor.executemany, query, params_seq)
+
+    async def execute_prepared(self, name: str, params=()):
+        return await self._pool.run(self._cursor.execute_prepared, name, params)
+
+    async def fetchone(self):
+        return await self._pool.run(self._cursor.fetchone)
+
+    async def fetchmany(self, size: Optional[int] = None):
+        if size is None:
+            return await self._pool.run(self._cursor.fetchmany)
+        return await self._pool.run(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await self._pool.run(self._cursor.fetchall)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def raw(self):
+        """Underlying pooled cursor"""
+        return self._cursor
+
+    def close(self):
+        self._cursor.close()
+
+
 # Lazy Database Connection Manager
-# Connection is only created when first accessed, with retry logic
+# Pool is only created when first accessed; connections are opened with retry logic
 class LazyPostgresConnection:
-    """Lazy connection manager that retries on failure"""
-    _connection = None
+    """Lazy connection pool manager that retries on failure"""
+    _pool = None
     _connection_params = None
     _max_retries = 10
     _retry_delay = 2  # seconds
+    _lock = threading.Lock()
 
     @classmethod
     def _get_connection_params(cls):
@@ -850,7 +1720,7 @@ class LazyPostgresConnection:
 
     @classmethod
     def _create_connection(cls, retry_count=0):
-        """Create connection with retry logic"""
+        """Create a dedicated (non-pooled) connection with retry logic"""
         params = cls._get_connection_params()
         if not params:
             return None
@@ -886,87 +1756,512 @@ class LazyPostgresConnection:
                 return None
 
     @classmethod
-    def get_connection(cls):
-        """Get or create connection (lazy initialization)"""
-        if cls._connection is None:
-            cls._connection = cls._create_connection()
-        else:
-            # Check if connection is still valid
-            try:
-                if cls._connection.connection and cls._connection.connection.closed:
-                    # Reconnect if connection was closed
-                    cls._connection = cls._create_connection()
-                else:
-                    # Test connection with a simple query
-                    try:
-                        test_cursor = cls._connection.connection.cursor()
-                        test_cursor.execute("SELECT 1")
-                        test_cursor.close()
-                    except Exception:
-                        # Connection is dead, reconnect
-                        cls._connection = cls._create_connection()
-            except AttributeError:
-                # Connection object doesn't have connection attribute (shouldn't happen)
-                cls._connection = cls._create_connection()
-        return cls._connection
+    def get_pool(cls) -> Optional[ConnectionPool]:
+        """Get or create the connection pool (lazy initialization)"""
+        if cls._pool is None:
+            params = cls._get_connection_params()
+            if not params:
+                return None
+            with cls._lock:
+                if cls._pool is None:
+                    cls._pool = ConnectionPool.from_env(
+                        params,
+                        connect_retries=cls._max_retries,
+                        retry_delay=cls._retry_delay
+                    )
+        return cls._pool
 
     @classmethod
     def reset_connection(cls):
-        """Reset connection (force reconnect)"""
-        if cls._connection:
+        """Reset the pool (close idle connections, force reconnect on next use)"""
+        with cls._lock:
+            pool, cls._pool = cls._pool, None
+        if pool:
             try:
-                if cls._connection.connection:
-                    cls._connection.connection.close()
+                pool.close()
             except Exception:
                 pass
-        cls._connection = None
+        replicas.close()
+
+
+# Slow statements are explained on a primary pool connection
+query_stats.pool_factory = LazyPostgresConnection.get_pool
+
+
+# Lazy pool - only created when first accessed
+def get_db_connection() -> Optional[ConnectionPool]:
+    """Get database connection pool (lazy, connections opened with retry)"""
+    return LazyPostgresConnection.get_pool()
+
+
+def _require_pool() -> ConnectionPool:
+    pool = LazyPostgresConnection.get_pool()
+    if pool is None:
+        raise ConnectionError("Database connection not available. Check database is running and accessible.")
+    return pool
+
+
+# Savepoint names of nested transactions (unique per process)
+_savepoint_ids = itertools.count(1)
+
+
+def _run_sql(raw, sql: str):
+    cursor = raw.cursor()
+    try:
+        cursor.execute(sql)
+    finally:
+        cursor.close()
+
+
+class Transaction:
+    """
+    Explicit unit of work (see connection.transaction())
+
+    The outermost transaction checks out a connection; statements, query builders and
+    `with db` blocks inside it join it and commit once when it exits (or roll back together
+    if it raises). A transaction opened inside another unit of work is a savepoint: if it
+    raises, only its own work is rolled back and the enclosing transaction can continue.
+    """
+
+    def __init__(self, wrapper: '_LazyConnectionWrapper', read_only: bool = False):
+        self._wrapper = wrapper
+        self.read_only = read_only
+        self._checkout: Optional[_Checkout] = None
+        self._savepoint: Optional[str] = None
+        self._failed_before = False
+
+    def _begin(self, raw):
+        if self._savepoint is not None:
+            _run_sql(raw, f"SAVEPOINT {self._savepoint}")
+        elif self.read_only:
+            _run_sql(raw, "SET TRANSACTION READ ONLY")
 
+    def _open(self, checkout: _Checkout) -> PooledCursor:
+        self._checkout = checkout
+        if checkout.frames[-1][0] is None:
+            # Joined an enclosing unit of work; READ ONLY cannot be scoped to a savepoint
+            self._savepoint = f"qb_savepoint_{next(_savepoint_ids)}"
+            self._failed_before = checkout.failed
+        cursor = PooledCursor(checkout)
+        checkout.frames[-1][1] = cursor
+        return cursor
 
-# Lazy connection - only created when first accessed
-def get_db_connection():
-    """Get database connection (lazy, with retry)"""
-    return LazyPostgresConnection.get_connection()
+    def _end_savepoint(self, exc_type, exc_val) -> Tuple[Any, Any]:
+        """Release or roll back the savepoint; returns the exception the enclosing work sees"""
+        checkout = self._checkout
+        if exc_type is None:
+            _run_sql(checkout.raw, f"RELEASE SAVEPOINT {self._savepoint}")
+            return None, None
+        try:
+            _run_sql(checkout.raw, f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+        except psycopg2.Error:
+            return exc_type, exc_val  # connection unusable: the enclosing transaction fails too
+        # Failures inside the savepoint are undone; the enclosing work is as before it
+        checkout.failed = self._failed_before
+        return None, None
+
+    def _close(self, exc_type, exc_val):
+        """(exc_type, exc_val, error raised while closing the savepoint)"""
+        if self._savepoint is None:
+            return exc_type, exc_val, None
+        try:
+            return (*self._end_savepoint(exc_type, exc_val), None)
+        except psycopg2.Error as e:
+            return type(e), e, e
+
+    def __enter__(self) -> PooledCursor:
+        cursor = self._open(self._wrapper._open(read=self.read_only))
+        if self._savepoint is not None or self.read_only:
+            try:
+                self._checkout.call(self._begin)
+            except BaseException as e:
+                self._savepoint = None
+                self._wrapper.__exit__(type(e), e, e.__traceback__)
+                raise
+        return cursor
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        exc_type, exc_val, error = self._close(exc_type, exc_val)
+        self._wrapper.__exit__(exc_type, exc_val, exc_tb)
+        if error is not None:
+            raise error
+
+    async def __aenter__(self) -> AsyncCursor:
+        checkout = await self._wrapper._open_async(read=self.read_only)
+        cursor = self._open(checkout)
+        if self._savepoint is not None or self.read_only:
+            try:
+                await checkout.pool.run(checkout.call, self._begin)
+            except BaseException as e:
+                self._savepoint = None
+                await self._wrapper.__aexit__(type(e), e, e.__traceback__)
+                raise
+        return AsyncCursor(cursor, checkout.pool)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._savepoint is not None:
+            exc_type, exc_val, error = await self._checkout.pool.run(self._close, exc_type, exc_val)
+        else:
+            error = None
+        await self._wrapper.__aexit__(exc_type, exc_val, exc_tb)
+        if error is not None:
+            raise error
+
+
+# Connections one run_many() call uses at most (extra ones only while the pool has them free)
+RUN_MANY_CONCURRENCY = int(os.environ.get('DB_RUN_MANY_CONCURRENCY', 4))
 
 
-# For backward compatibility - create connection object that uses lazy connection
-# This allows existing code like `with db as cursor:` to work
+def _run_one(cursor: PooledCursor, query):
+    """Result of one run_many() entry: a QueryResult for builders, fetched rows for SQL"""
+    if isinstance(query, QueryBuilder):
+        return query.execute()
+    sql, params = (query, None) if isinstance(query, str) else query
+    cursor.execute(sql, params)
+    return cursor.fetchall() if cursor.description is not None else None
+
+
+def _run_pending(checkout: _Checkout, pending: deque, results: List[Any]):
+    """Run run_many() entries on checkout (the current one) until none are left"""
+    cursor = PooledCursor(checkout)
+    try:
+        while True:
+            try:
+                index, query = pending.popleft()
+            except IndexError:
+                return
+            results[index] = _run_one(cursor, query)
+    finally:
+        cursor.close()
+
+
+# For backward compatibility - connection object backed by the pool
+# This allows existing code like `with db as cursor:` to work, and adds `async with db as cursor:`
 class _LazyConnectionWrapper:
-    """Wrapper that provides lazy connection access with retry logic"""
+    """Wrapper that checks out pooled connections per unit of work"""
+
+    @staticmethod
+    def _acquire(read: bool = False) -> _Checkout:
+        """
+        Acquire a new pooled connection (not bound to the current context)
+
+        Read-only work (read=True or inside a @read_only function) goes to a replica when
+        one is configured and usable, see replica.py.
+        """
+        if read or in_read_only():
+            replica = replicas.acquire()
+            if replica is not None:
+                return _Checkout(*replica)
+        pool = _require_pool()
+        try:
+            return _Checkout(pool, pool.acquire())
+        except psycopg2.OperationalError as e:
+            raise ConnectionError("Failed to establish database connection after retries. Check database is running and accessible.") from e
+
+    @staticmethod
+    async def _acquire_async(read: bool = False) -> _Checkout:
+        """Async variant of _acquire that never blocks the event loop"""
+        if read or in_read_only():
+            replica = await replicas.acquire_async()
+            if replica is not None:
+                return _Checkout(*replica)
+        pool = _require_pool()
+        try:
+            return _Checkout(pool, await pool.acquire_async())
+        except psycopg2.OperationalError as e:
+            raise ConnectionError("Failed to establish database connection after retries. Check database is running and accessible.") from e
+
+    @staticmethod
+    def _leaves_for_replica(checkout: _Checkout) -> bool:
+        """
+        Whether @read_only work should not join checkout: it holds a primary connection but has
+        not written, so nothing it could see is missing on a replica
+        """
+        return (in_read_only() and replicas.enabled and not checkout.wrote
+                and checkout.pool is LazyPostgresConnection.get_pool())
+
+    def _open(self, read: bool = False) -> _Checkout:
+        """Join the current checkout or acquire a new pooled connection"""
+        checkout = _current_checkout.get()
+        if checkout is not None:
+            replica = replicas.acquire() if self._leaves_for_replica(checkout) else None
+            if replica is None:
+                checkout.frames.append([None, None])
+                return checkout
+            checkout = _Checkout(*replica)
+        else:
+            checkout = self._acquire(read)
+        checkout.frames.append([_current_checkout.set(checkout), None])
+        return checkout
+
+    async def _open_async(self, read: bool = False) -> _Checkout:
+        """Async variant of _open that never blocks the event loop"""
+        checkout = _current_checkout.get()
+        if checkout is not None:
+            replica = await replicas.acquire_async() if self._leaves_for_replica(checkout) else None
+            if replica is None:
+                checkout.frames.append([None, None])
+                return checkout
+            checkout = _Checkout(*replica)
+        else:
+            checkout = await self._acquire_async(read)
+        checkout.frames.append([_current_checkout.set(checkout), None])
+        return checkout
+
+    def _pop(self, checkout: _Checkout, exc_type) -> bool:
+        """Close the innermost block; returns True when it was the outermost one"""
+        token, cursor = checkout.frames.pop()
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        if exc_type is not None and issubclass(exc_type, Exception):
+            checkout.failed = True
+        if token is None:
+            return False
+        _current_checkout.reset(token)
+        return True
+
+    @staticmethod
+    def _finished(checkout: _Checkout):
+        """Bookkeeping after the outermost block committed"""
+        if checkout.wrote and not checkout.failed:
+            mark_write()
+
+    @staticmethod
+    def _log_failure(exc_type, exc_val):
+        if exc_type and issubclass(exc_type, psycopg2.Error):
+            logger.error(f"DB - {exc_type} - {exc_val} - {traceback.format_exc()}", module="Postgres")
+            raise exc_type(exc_val)
+        elif exc_type and issubclass(exc_type, Exception):
+            logger.error(f"DB Exception - {exc_type} - {exc_val} - {traceback.format_exc()}", module="Postgres")
+
     def __enter__(self):
-        conn = LazyPostgresConnection.get_connection()
-        if conn is None:
-            raise ConnectionError("Failed to establish database connection after retries. Check database is running and accessible.")
-        return conn.__enter__()
+        checkout = self._open()
+        cursor = PooledCursor(checkout)
+        checkout.frames[-1][1] = cursor
+        return cursor
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        conn = LazyPostgresConnection.get_connection()
-        if conn:
-            return conn.__exit__(exc_type, exc_val, exc_tb)
+        checkout = _current_checkout.get()
+        if checkout is None or not self._pop(checkout, exc_type):
+            return
+        checkout.finish()
+        self._finished(checkout)
+        self._log_failure(exc_type, exc_val)
+
+    async def __aenter__(self) -> AsyncCursor:
+        checkout = await self._open_async()
+        cursor = PooledCursor(checkout)
+        checkout.frames[-1][1] = cursor
+        return AsyncCursor(cursor, checkout.pool)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        checkout = _current_checkout.get()
+        if checkout is None or not self._pop(checkout, exc_type):
+            return
+        await checkout.pool.run(checkout.finish)
+        self._finished(checkout)
+        self._log_failure(exc_type, exc_val)
+
+    @contextmanager
+    def checkout(self, read: bool = False):
+        """
+        Check out (or join) a pooled connection without opening a cursor
+
+        read=True allows a replica connection when a new one is checked out.
+        """
+        checkout = self._open(read)
+        exc_type = None
+        try:
+            yield checkout
+        except BaseException as e:
+            exc_type = type(e)
+            raise
+        finally:
+            if self._pop(checkout, exc_type):
+                checkout.finish()
+                self._finished(checkout)
+
+    @asynccontextmanager
+    async def checkout_async(self, read: bool = False):
+        """Async variant of checkout()"""
+        checkout = await self._open_async(read)
+        exc_type = None
+        try:
+            yield checkout
+        except BaseException as e:
+            exc_type = type(e)
+            raise
+        finally:
+            if self._pop(checkout, exc_type):
+                await checkout.pool.run(checkout.finish)
+                self._finished(checkout)
+
+    @staticmethod
+    def _try_acquire(read: bool = False) -> Optional[_Checkout]:
+        """Extra connection for run_many() if one is free right now (never waits for the pool)"""
+        if read or in_read_only():
+            replica = replicas.acquire()
+            if replica is not None:
+                return _Checkout(*replica)
+        pool = _require_pool()
+        try:
+            return _Checkout(pool, pool.acquire(timeout=0))
+        except (PoolTimeoutError, psycopg2.OperationalError):
+            return None
+
+    @staticmethod
+    async def _try_acquire_async(read: bool = False) -> Optional[_Checkout]:
+        """Async variant of _try_acquire"""
+        if read or in_read_only():
+            replica = await replicas.acquire_async()
+            if replica is not None:
+                return _Checkout(*replica)
+        pool = _require_pool()
+        try:
+            return _Checkout(pool, await pool.acquire_async(timeout=0))
+        except (PoolTimeoutError, psycopg2.OperationalError):
+            return None
+
+    def _drain_on(self, checkout: _Checkout, pending: deque, results: List[Any]):
+        """Run run_many() entries on an extra checkout, then commit and release it"""
+        checkout.frames.append([_current_checkout.set(checkout), None])
+        exc_type = None
+        try:
+            _run_pending(checkout, pending, results)
+        except BaseException as e:
+            exc_type = type(e)
+            raise
+        finally:
+            if self._pop(checkout, exc_type):
+                checkout.finish()
+                self._finished(checkout)
+
+    def _run_many_extra(self, pending: deque, results: List[Any], read: bool):
+        # Runs in a copied context: the caller's checkout must not be joined from here
+        _current_checkout.set(None)
+        checkout = self._try_acquire(read) if pending else None
+        if checkout is not None:
+            self._drain_on(checkout, pending, results)
+
+    @staticmethod
+    def _run_many_plan(queries, concurrency: Optional[int]):
+        """(keys or None, pending entries, result slots, extra connections to try)"""
+        keys = list(queries) if isinstance(queries, dict) else None
+        entries = list(queries.values()) if keys is not None else list(queries)
+        pending = deque(enumerate(entries))
+        checkout = _current_checkout.get()
+        if checkout is not None and checkout.wrote:
+            # Other connections would not see the uncommitted writes
+            extra = 0
+        else:
+            extra = max(0, min(concurrency or RUN_MANY_CONCURRENCY, len(entries)) - 1)
+        return keys, pending, [None] * len(entries), extra
+
+    @staticmethod
+    def _run_many_results(keys, results: List[Any]):
+        return dict(zip(keys, results)) if keys is not None else results
+
+    def run_many(self, queries: Union[Sequence[Any], Dict[str, Any]], read: bool = False,
+                 concurrency: Optional[int] = None) -> Union[List[Any], Dict[str, Any]]:
+        """
+        Run independent statements concurrently and return all results together
+
+        Entries are SQL strings, (sql, params) tuples or query builders; SQL entries give their
+        fetched rows (None for statements without results), builders their QueryResult. Pass a
+        dict to get a dict of results by key. The statements are spread over up to `concurrency`
+        connections (DB_RUN_MANY_CONCURRENCY, default 4): the current unit of work (or a new
+        checkout) plus extra ones while the pool has them free, so the wall time is about that
+        of the slowest connection's share rather than the sum of all round trips.
+
+        Each extra connection is its own transaction; after the current unit of work has written,
+        everything runs on it in order, so the statements see its writes.
+
+        Example:
+            totals = db.run_many({
+                "users": "SELECT COUNT(*) FROM public.\"user\"",
+                "active": db.table('public."user"').count().eq("is_active", True),
+            })
+        """
+        keys, pending, results, extra = self._run_many_plan(queries, concurrency)
+        executor = _require_pool()._get_executor()
+        futures = [executor.submit(contextvars.copy_context().run, self._run_many_extra, pending, results, read)
+                   for _ in range(extra)]
+        try:
+            with self.checkout(read) as checkout:
+                _run_pending(checkout, pending, results)
+        finally:
+            # Workers that have not started yet are not needed any more
+            started = [future for future in futures if not future.cancel()]
+            concurrent.futures.wait(started)
+        for future in started:
+            future.result()
+        return self._run_many_results(keys, results)
+
+    async def run_many_async(self, queries: Union[Sequence[Any], Dict[str, Any]], read: bool = False,
+                             concurrency: Optional[int] = None) -> Union[List[Any], Dict[str, Any]]:
+        """Async variant of run_many (the statements run on the pool executor)"""
+        keys, pending, results, extra = self._run_many_plan(queries, concurrency)
+
+        async def main():
+            async with self.checkout_async(read) as checkout:
+                await checkout.pool.run(_run_pending, checkout, pending, results)
+
+        async def helper():
+            # Each task has its own copy of the context: clearing the checkout here is local
+            _current_checkout.set(None)
+            checkout = await self._try_acquire_async(read)
+            if checkout is not None:
+                await checkout.pool.run(self._drain_on, checkout, pending, results)
+
+        outcomes = await asyncio.gather(main(), *(helper() for _ in range(extra)), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        return self._run_many_results(keys, results)
+
+    def transaction(self, read_only: bool = False) -> Transaction:
+        """
+        Unit of work that commits once at the end (`with` or `async with`)
+
+        Builders, statements and `with db` blocks inside it defer their commit to the end of
+        the transaction. Nested inside another unit of work it becomes a savepoint.
+        read_only=True starts the transaction with SET TRANSACTION READ ONLY (it may then run
+        on a replica); it has no effect on a savepoint.
+
+        Example:
+            async with db.transaction() as cursor:
+                await cursor.execute("UPDATE ...")
+                await db.table("user_group").upsert(rows, ["user_id", "group_id"]).execute_async()
+        """
+        return Transaction(self, read_only)
 
     def table(self, table_name: str) -> QueryBuilder:
-        """Create a query builder for a table"""
-        conn = LazyPostgresConnection.get_connection()
-        if conn is None:
-            raise ConnectionError("Database connection not available. Check database is running and accessible.")
-        return conn.table(table_name)
+        """Create a query builder for a table (connection is checked out on execute)"""
+        return QueryBuilder(None, table_name)
 
     @property
     def cursor(self):
-        """Get cursor for manual queries"""
-        conn = LazyPostgresConnection.get_connection()
-        if conn is None:
-            raise ConnectionError("Database connection not available. Check database is running and accessible.")
-        return conn.cursor
+        """Get cursor for manual queries on the connection checked out by the enclosing `with db` block"""
+        checkout = _current_checkout.get()
+        if checkout is None:
+            raise ConnectionError("No database connection checked out. Use `with db as cursor:` instead.")
+        return PooledCursor(checkout)
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """Underlying connection pool"""
+        return _require_pool()
 
     def get_trigger_manager(self):
         """
         Get trigger manager instance for this connection
         Uses the workflow initialization which auto-detects existing triggers
         """
-        # from src.db.postgres.triggers import initialize_trigger_workflow
-        # return initialize_trigger_workflow(self.connection)
-
-        conn = LazyPostgresConnection.get_connection()
+        # Trigger DDL runs on a dedicated connection so it never holds a pool slot
+        conn = LazyPostgresConnection._create_connection()
         if conn is None:
             raise ConnectionError("Database connection not available. Check database is running and accessible.")
         # Delegate to the PostgresConnection's get_trigger_manager method
@@ -974,4 +2269,63 @@ class _LazyConnectionWrapper:
 
 # Create connection object for backward compatibility
 # Usage: with connection as cursor: ...
+#        async with connection as cursor: ...
 connection = _LazyConnectionWrapper()
+
+
+class RequestConnection:
+    """Connection checked out for the current request (see get_request_connection)"""
+
+    def __init__(self, checkout: _Checkout):
+        self._checkout = checkout
+
+    async def commit(self):
+        """
+        Commit the work done so far in this request
+
+        Raises InFailedSqlTransaction (after rolling back) if a statement of the request failed:
+        the server has already aborted the transaction and would silently roll it back.
+        """
+        checkout = self._checkout
+        if checkout.failed:
+            await checkout.pool.run(checkout.rollback)
+            raise psycopg2.errors.InFailedSqlTransaction("Request transaction failed earlier and was rolled back")
+        await checkout.pool.run(checkout.commit)
+        if checkout.wrote:
+            # Before the response is sent, so the read-your-writes cookie goes out with it
+            mark_write()
+            checkout.wrote = False
+
+    async def rollback(self):
+        """Roll back the work done so far in this request"""
+        await self._checkout.pool.run(self._checkout.rollback)
+
+
+async def get_request_connection():
+    """
+    FastAPI dependency that checks out one pooled connection for the whole request.
+
+    check_permission / check_group depend on it, so on protected routes the permission
+    lookups, service functions (`with db`) and query builders running in the handler all
+    join this connection and its transaction instead of checking out their own. FastAPI
+    resolves it once per request: handlers that write declare it too and commit explicitly
+    with `await conn.commit()` before they return. Work still uncommitted when the dependency
+    exits is rolled back, since that may happen after the response has been sent and a failed
+    commit could no longer be reported to the client.
+
+    Usage:
+        @router.post("/items")
+        async def create_item(current_user: User = Depends(check_permission("add_item")),
+                              conn: RequestConnection = Depends(get_request_connection)):
+            ...
+            await conn.commit()
+            return SUCCESS.response(...)
+    """
+    async with connection.checkout_async() as checkout:
+        try:
+            yield RequestConnection(checkout)
+        finally:
+            if checkout.statements:
+                if checkout.wrote:
+                    logger.warning("Request connection released with uncommitted writes; rolled back", module="Postgres")
+                await checkout.pool.run(checkout.rollback)
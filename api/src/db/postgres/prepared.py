@@ -0,0 +1,125 @@
+"""
+Prepared Statement Registry
+Named server-side prepared statements for hot queries
+
+- Statements are registered once (at import time) with %s placeholders
+- Each pooled connection PREPAREs a statement lazily on first use
+- A replacement connection (reconnect) starts empty, so statements are re-prepared
+- Set DB_PREPARED_STATEMENTS=false to run the same SQL unprepared
+  (e.g. behind a transaction-pooling proxy such as PgBouncer)
+"""
+import os
+import re
+from typing import Any, Dict, Optional, Sequence
+
+from src.logger.logger import logger
+
+_NAME_PATTERN = re.compile(r"^[a-z_][a-z0-9_]*$")
+_PLACEHOLDER_PATTERN = re.compile(r"%%|%s")
+
+
+def _to_server_placeholders(sql: str) -> str:
+    """Turn psycopg2-style %s placeholders into $1, $2, ... (and %% back into %)"""
+    position = 0
+
+    def replace(match):
+        nonlocal position
+        if match.group() == "%%":
+            return "%"
+        position += 1
+        return f"${position}"
+
+    return _PLACEHOLDER_PATTERN.sub(replace, sql)
+
+
+class PreparedStatement:
+    """A registered statement and its usage counters"""
+
+    __slots__ = ("name", "sql", "prepare_sql", "param_count", "executions", "prepares")
+
+    def __init__(self, name: str, sql: str, param_types: Optional[Sequence[str]] = None):
+        self.name = name
+        self.sql = sql
+        self.param_count = sum(1 for match in _PLACEHOLDER_PATTERN.finditer(sql) if match.group() == "%s")
+        types = f" ({', '.join(param_types)})" if param_types else ""
+        self.prepare_sql = f"PREPARE {name}{types} AS {_to_server_placeholders(sql)}"
+        self.executions = 0
+        self.prepares = 0
+
+    @property
+    def execute_sql(self) -> str:
+        if not self.param_count:
+            return f"EXECUTE {self.name}"
+        return f"EXECUTE {self.name} ({', '.join(['%s'] * self.param_count)})"
+
+
+class PreparedStatementRegistry:
+    """Registry of named statements shared by all pooled connections"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._statements: Dict[str, PreparedStatement] = {}
+
+    def register(self, name: str, sql: str, param_types: Optional[Sequence[str]] = None) -> str:
+        """
+        Register a statement under a name and return the name.
+
+        Args:
+            name: Statement name (lowercase identifier, unique per registry)
+            sql: SQL using %s placeholders (same as cursor.execute)
+            param_types: Optional Postgres types of the parameters, e.g. ["uuid", "text"]
+        """
+        if not _NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid prepared statement name: {name}")
+        existing = self._statements.get(name)
+        if existing and existing.sql != sql:
+            raise ValueError(f"Prepared statement '{name}' is already registered with different SQL")
+        if not existing:
+            self._statements[name] = PreparedStatement(name, sql, param_types)
+        return name
+
+    def get(self, name: str) -> PreparedStatement:
+        try:
+            return self._statements[name]
+        except KeyError:
+            raise KeyError(f"Prepared statement '{name}' is not registered") from None
+
+    def execute(self, cursor, prepared: set, name: str, params: Sequence[Any] = ()):
+        """
+        Execute a registered statement on a raw cursor.
+
+        `prepared` is the set of statement names already prepared on the cursor's connection;
+        it is updated when the statement is prepared here.
+        """
+        statement = self.get(name)
+        params = tuple(params)
+        if len(params) != statement.param_count:
+            raise ValueError(
+                f"Prepared statement '{name}' expects {statement.param_count} parameters, got {len(params)}"
+            )
+        if not self.enabled:
+            cursor.execute(statement.sql, params)
+        else:
+            if name not in prepared:
+                cursor.execute(statement.prepare_sql)
+                prepared.add(name)
+                statement.prepares += 1
+                logger.debug(f"Prepared statement '{name}' on connection", module="Postgres")
+            cursor.execute(statement.execute_sql, params)
+        statement.executions += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-statement counters; hits are executions that reused an existing preparation"""
+        return {
+            name: {
+                "executions": statement.executions,
+                "prepares": statement.prepares,
+                "hits": statement.executions - statement.prepares if self.enabled else 0,
+            }
+            for name, statement in self._statements.items()
+        }
+
+
+prepared_statements = PreparedStatementRegistry(
+    enabled=os.environ.get("DB_PREPARED_STATEMENTS", "true").lower() in ("1", "true", "yes")
+)
@@ -0,0 +1,416 @@
+"""
+Query Statistics
+Per-statement latency histograms, row counts and a slow-query log
+
+- Statements are grouped by fingerprint: literals, placeholders and IN / VALUES lists are
+  normalized away, so one QueryBuilder shape or service query is one entry
+- Latency goes into fixed histogram buckets; percentiles are reported as bucket upper bounds
+- Statements slower than DB_SLOW_QUERY_MS are logged with the route that issued them, and
+  their plan is captured with EXPLAIN (FORMAT JSON) on a background thread. EXPLAIN runs
+  without ANALYZE, so the statement itself is never executed again. A fingerprint is
+  explained at most once per DB_SLOW_QUERY_EXPLAIN_INTERVAL_MS
+- At most DB_QUERY_STATS_MAX fingerprints are tracked; DB_QUERY_STATS=false turns it off
+- N+1 detection: statements are also counted per request. A fingerprint that runs more than
+  DB_N_PLUS_ONE_THRESHOLD times in one request is logged when the request ends and reported
+  per route (DB_N_PLUS_ONE=warn), or fails the statement with NPlusOneError
+  (DB_N_PLUS_ONE=raise, the default when API_MODE=test); DB_N_PLUS_ONE=off disables it
+- Statistics are per process (each gunicorn worker keeps its own)
+"""
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import psycopg2
+
+from src.logger.logger import logger
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is unbounded)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_NORMALIZE_PATTERNS = (
+    (re.compile(r"--[^\n]*|/\*.*?\*/", re.S), " "),  # comments
+    (re.compile(r"'(?:[^']|'')*'"), "?"),  # string literals
+    (re.compile(r"%\(\w+\)s|%s|\$\d+"), "?"),  # placeholders
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),  # numbers
+    (re.compile(r"\b(_qb_copy_|qb_stream_)\d+\b"), r"\1?"),  # generated names
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),  # IN lists and VALUES rows
+    (re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+"), "(?)"),  # multi-row VALUES
+    (re.compile(r"\s+"), " "),
+)
+
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+
+class NPlusOneError(RuntimeError):
+    """Raised in DB_N_PLUS_ONE=raise mode when a statement repeats too often in one request"""
+
+
+class RequestQueries:
+    """The request being served (ASGI scope) and its statement counts by fingerprint"""
+
+    __slots__ = ("scope", "counts", "flagged")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.counts: Dict[str, int] = {}
+        self.flagged: Dict[str, str] = {}  # fingerprint -> normalized SQL, over the threshold
+
+
+# Request being served (set by QueryContextMiddleware); shared with the tasks it spawns
+_request: ContextVar[Optional[RequestQueries]] = ContextVar('postgres_request_queries', default=None)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> Tuple[str, str]:
+    """(fingerprint, normalized SQL) of a statement"""
+    normalized = sql
+    for pattern, replacement in _NORMALIZE_PATTERNS:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.strip()
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest(), normalized
+
+
+def _route_of(scope: dict) -> str:
+    # The router stores the matched route in the (shared) scope once routing is done
+    path = getattr(scope.get("route"), "path", None) or scope.get("path")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+def current_route() -> Optional[str]:
+    """'METHOD /path/template' of the request issuing queries, None outside requests"""
+    request = _request.get()
+    return _route_of(request.scope) if request is not None else None
+
+
+class StatementStats:
+    """Aggregates for one fingerprint"""
+
+    __slots__ = (
+        "fingerprint", "query", "calls", "errors", "rows", "total_ms", "max_ms", "buckets",
+        "slow_calls", "last_route", "plan", "plan_route", "explained_at",
+    )
+
+    def __init__(self, fingerprint_: str, query: str):
+        self.fingerprint = fingerprint_
+        self.query = query
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.slow_calls = 0
+        self.last_route: Optional[str] = None
+        self.plan: Optional[Any] = None
+        self.plan_route: Optional[str] = None
+        self.explained_at = 0.0  # monotonic time of the last EXPLAIN attempt
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding the given fraction of calls"""
+        if not self.calls:
+            return None
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return float(BUCKETS_MS[index]) if index < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self, include_plan: bool = False) -> Dict[str, Any]:
+        data = {
+            "fingerprint": self.fingerprint,
+            "query": self.query,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else None,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "slow_calls": self.slow_calls,
+            "last_route": self.last_route,
+            # Calls per bucket, keyed by upper bound in ms
+            "histogram": {
+                str(bound): count
+                for bound, count in zip(list(BUCKETS_MS) + ["inf"], self.buckets)
+                if count
+            },
+        }
+        if include_plan:
+            data["plan"] = self.plan
+            data["plan_route"] = self.plan_route
+        return data
+
+
+# Sort keys accepted by QueryStats.snapshot()
+SORT_KEYS: Dict[str, Callable[[StatementStats], float]] = {
+    "total_time": lambda entry: entry.total_ms,
+    "mean_time": lambda entry: entry.total_ms / entry.calls if entry.calls else 0.0,
+    "max_time": lambda entry: entry.max_ms,
+    "p95": lambda entry: entry.percentile(0.95) or 0.0,
+    "calls": lambda entry: entry.calls,
+    "rows": lambda entry: entry.rows,
+    "errors": lambda entry: entry.errors,
+    "slow_calls": lambda entry: entry.slow_calls,
+}
+
+
+class QueryStats:
+    """Registry of statement aggregates plus the slow-query log"""
+
+    def __init__(self, enabled: bool = True, slow_ms: float = 500.0, explain_interval: float = 60.0,
+                 max_statements: int = 500, n_plus_one: str = "warn", n_plus_one_threshold: int = 10):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.explain_interval = explain_interval
+        self.max_statements = max_statements
+        if n_plus_one not in ("off", "warn", "raise"):
+            raise ValueError(f"Invalid N+1 detection mode: {n_plus_one} (expected off, warn or raise)")
+        self.n_plus_one = n_plus_one
+        self.n_plus_one_threshold = n_plus_one_threshold
+        # route -> fingerprint -> offender report (see finish_request())
+        self._n_plus_one_routes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Pool used for background EXPLAINs (set by postgres.py)
+        self.pool_factory: Optional[Callable[[], Any]] = None
+        self._statements: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid = None
+        self._pending_explains = 0
+        self.untracked_calls = 0
+        self.started_at = time.time()
+
+    @classmethod
+    def from_env(cls) -> 'QueryStats':
+        def env_number(name: str, default: float) -> float:
+            try:
+                return float(os.environ.get(name, default))
+            except (TypeError, ValueError):
+                return default
+
+        return cls(
+            enabled=os.environ.get("DB_QUERY_STATS", "true").lower() in ("1", "true", "yes"),
+            slow_ms=env_number("DB_SLOW_QUERY_MS", 500),
+            explain_interval=env_number("DB_SLOW_QUERY_EXPLAIN_INTERVAL_MS", 60000) / 1000,
+            max_statements=int(env_number("DB_QUERY_STATS_MAX", 500)),
+            n_plus_one=(
+                os.environ.get("DB_N_PLUS_ONE") or ("raise" if os.environ.get("API_MODE") == "test" else "warn")
+            ).lower(),
+            n_plus_one_threshold=int(env_number("DB_N_PLUS_ONE_THRESHOLD", 10)),
+        )
+
+    def observe(self, sql: str, params: Any, cursor, func: Callable, *args):
+        """
+        Run func(*args) - a statement executed on cursor - and record it under sql's fingerprint
+
+        Example:
+            query_stats.observe(query, params, cursor, cursor.execute, query, params)
+        """
+        if not self.enabled:
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception:
+            self.record(sql, params, (time.perf_counter() - start) * 1000, None, error=True)
+            raise
+        self.record(sql, params, (time.perf_counter() - start) * 1000, cursor.rowcount)
+        return result
+
+    def record(self, sql: str, params: Any, elapsed_ms: float, rows: Optional[int], error: bool = False):
+        """Add one execution to the statement's aggregates"""
+        key, normalized = fingerprint(sql)
+        request = _request.get()
+        route = _route_of(request.scope) if request is not None else None
+        slow = elapsed_ms >= self.slow_ms
+        explain = False
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is None:
+                if len(self._statements) >= self.max_statements:
+                    self.untracked_calls += 1
+                    entry = None
+                else:
+                    entry = self._statements[key] = StatementStats(key, normalized)
+            if entry is not None:
+                entry.calls += 1
+                entry.total_ms += elapsed_ms
+                if elapsed_ms > entry.max_ms:
+                    entry.max_ms = elapsed_ms
+                entry.buckets[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+                if error:
+                    entry.errors += 1
+                elif rows is not None and rows > 0:
+                    entry.rows += rows
+                if route is not None:
+                    entry.last_route = route
+                if slow:
+                    entry.slow_calls += 1
+                    now = time.monotonic()
+                    if (not error and now - entry.explained_at >= self.explain_interval
+                            and normalized[:6].lower().startswith(_EXPLAINABLE)):
+                        entry.explained_at = now
+                        explain = True
+        if slow:
+            logger.warning(
+                f"Slow query ({elapsed_ms:.0f} ms, {rows if rows is not None and rows >= 0 else '?'} rows) "
+                f"[{key}] from {route or 'background task'}: {normalized[:1000]}",
+                module="Postgres", label="SLOW_QUERY"
+            )
+            if explain and entry is not None:
+                self._schedule_explain(entry, sql, params, route)
+        if request is not None and self.n_plus_one != "off" and not error:
+            self._count_in_request(request, key, normalized, route)
+
+    # ------------------------------------------------------------------
+    # N+1 detection
+    # ------------------------------------------------------------------
+
+    def begin_request(self, scope: dict):
+        """Start recording statements for a request; returns a token for finish_request()"""
+        return _request.set(RequestQueries(scope))
+
+    def _count_in_request(self, request: RequestQueries, key: str, normalized: str, route: Optional[str]):
+        count = request.counts.get(key, 0) + 1
+        request.counts[key] = count
+        if count <= self.n_plus_one_threshold or key in request.flagged:
+            return
+        request.flagged[key] = normalized
+        if self.n_plus_one == "raise":
+            raise NPlusOneError(
+                f"N+1 query: [{key}] ran more than {self.n_plus_one_threshold} times in {route}: {normalized[:1000]}"
+            )
+
+    def finish_request(self, token):
+        """Stop recording for the request; log and aggregate statements over the N+1 threshold"""
+        request = _request.get()
+        _request.reset(token)
+        if request is None or not request.flagged:
+            return
+        route = _route_of(request.scope)
+        with self._lock:
+            offenders = self._n_plus_one_routes.setdefault(route, {})
+            for key, normalized in request.flagged.items():
+                count = request.counts[key]
+                report = offenders.get(key)
+                if report is None:
+                    if sum(len(route_offenders) for route_offenders in self._n_plus_one_routes.values()) >= self.max_statements:
+                        continue
+                    report = offenders[key] = {"fingerprint": key, "query": normalized, "requests": 0, "max_count": 0}
+                report["requests"] += 1
+                report["max_count"] = max(report["max_count"], count)
+                report["last_count"] = count
+        for key, normalized in request.flagged.items():
+            logger.warning(
+                f"N+1 query: [{key}] ran {request.counts[key]} times in {route}: {normalized[:1000]}",
+                module="Postgres", label="N_PLUS_ONE"
+            )
+
+    def n_plus_one_report(self, limit: int = 10) -> Dict[str, Any]:
+        """Per route, the statements that repeated most within a request (worst first)"""
+        with self._lock:
+            routes = {
+                route: sorted(offenders.values(), key=lambda report: report["max_count"], reverse=True)[:limit]
+                for route, offenders in self._n_plus_one_routes.items()
+                if offenders
+            }
+        worst_first = sorted(routes.items(), key=lambda item: item[1][0]["max_count"], reverse=True)
+        return {
+            "mode": self.n_plus_one,
+            "threshold": self.n_plus_one_threshold,
+            "routes": [{"route": route, "offenders": [dict(report) for report in reports]} for route, reports in worst_first],
+        }
+
+    # ------------------------------------------------------------------
+    # Background EXPLAIN
+    # ------------------------------------------------------------------
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            # A forked worker cannot use the parent's executor thread
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pg-explain")
+            self._executor_pid = pid
+            self._pending_explains = 0
+        return self._executor
+
+    def _schedule_explain(self, entry: StatementStats, sql: str, params: Any, route: Optional[str]):
+        if self.pool_factory is None or self._pending_explains >= 8:
+            return
+        self._pending_explains += 1
+        self._get_executor().submit(self._explain, entry, sql, params, route)
+
+    def _explain(self, entry: StatementStats, sql: str, params: Any, route: Optional[str]):
+        try:
+            pool = self.pool_factory()
+            if pool is None:
+                return
+            # Do not wait for a busy pool; the next slow call retries after the interval
+            conn = pool.acquire(timeout=1.0)
+            try:
+                cursor = conn.raw.cursor()
+                try:
+                    cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                    plan = cursor.fetchone()[0]
+                finally:
+                    cursor.close()
+                    conn.raw.rollback()
+            finally:
+                pool.release(conn, discard=bool(conn.raw.closed))
+            entry.plan, entry.plan_route = plan, route
+            logger.warning(
+                f"Plan for slow query [{entry.fingerprint}] from {route or 'background task'}: "
+                f"{json.dumps(plan, separators=(',', ':'), default=str)}",
+                module="Postgres", label="SLOW_QUERY"
+            )
+        except (psycopg2.Error, ConnectionError) as e:
+            logger.warning(f"EXPLAIN for slow query [{entry.fingerprint}] failed: {e}", module="Postgres")
+        except Exception as e:
+            logger.error(f"EXPLAIN for slow query [{entry.fingerprint}] failed: {e}", exc_info=True, module="Postgres")
+        finally:
+            self._pending_explains -= 1
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def snapshot(self, sort: str = "total_time", limit: int = 50, include_plans: bool = False) -> Dict[str, Any]:
+        """Top statements by the given sort key, plus totals"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort} (expected one of {', '.join(SORT_KEYS)})")
+        with self._lock:
+            entries = list(self._statements.values())
+        entries.sort(key=SORT_KEYS[sort], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "pid": os.getpid(),
+            "since": self.started_at,
+            "slow_query_ms": self.slow_ms,
+            "tracked": len(entries),
+            "untracked_calls": self.untracked_calls,
+            "calls": sum(entry.calls for entry in entries),
+            "total_ms": round(sum(entry.total_ms for entry in entries), 2),
+            "statements": [entry.to_dict(include_plans) for entry in entries[:limit]],
+        }
+
+    def reset(self):
+        """Forget all aggregates"""
+        with self._lock:
+            self._statements.clear()
+            self._n_plus_one_routes.clear()
+            self.untracked_calls = 0
+            self.started_at = time.time()
+
+
+query_stats = QueryStats.from_env()
@@ -0,0 +1,326 @@
+"""
+Read Replica Routing
+Sends read-only units of work to streaming replicas, keeping writes on the primary
+
+- Replicas are configured with DATABASE_REPLICA_URLS (comma-separated DSNs); one pool each
+- QueryBuilder selects and functions marked with @read_only check out a replica connection
+  when they do not join an open transaction (`with db` blocks and request connections
+  keep everything on the connection they already hold). @read_only functions called while
+  a primary connection is held that has not written anything still go to a replica
+- Read-your-writes: after a session commits a write, its reads stay on the primary for
+  DB_REPLICA_STICKY_MS. Within a task the session is tracked in a context variable;
+  ReplicaSessionMiddleware carries it across requests (and workers) in a cookie
+- Lag-aware: replay lag is measured at most every DB_REPLICA_LAG_CHECK_MS per replica and
+  replicas behind by more than DB_REPLICA_MAX_LAG_MS are skipped. Unreachable replicas are
+  skipped for DB_REPLICA_RETRY_MS. With no usable replica the read goes to the primary
+"""
+import functools
+import inspect
+import itertools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+
+from src.db.postgres.pool import ConnectionPool, PooledConnection, _env_int
+from src.logger.logger import logger
+
+# Replay lag in seconds; 0 when the replica has replayed everything it received
+# (pg_last_xact_replay_timestamp() alone keeps growing while the primary is idle)
+_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class ReplicaSession:
+    """Read-your-writes state of one client session"""
+
+    __slots__ = ("last_write", "wrote")
+
+    def __init__(self, last_write: float = 0.0):
+        self.last_write = last_write  # wall clock (time.time()) of the last committed write
+        self.wrote = False  # a write was committed while this session was active
+
+
+# Current session; a mutable holder so writes made in child tasks are seen by the middleware
+_session: ContextVar[Optional[ReplicaSession]] = ContextVar('postgres_replica_session', default=None)
+
+# Set while a @read_only function runs
+_read_only: ContextVar[bool] = ContextVar('postgres_read_only', default=False)
+
+
+def begin_session(last_write: float = 0.0):
+    """Start tracking writes for a client session; returns a token for end_session()"""
+    return _session.set(ReplicaSession(last_write))
+
+
+def end_session(token):
+    _session.reset(token)
+
+
+def current_session() -> Optional[ReplicaSession]:
+    return _session.get()
+
+
+def mark_write():
+    """Record a committed write for the current session (starts the stickiness window)"""
+    session = _session.get()
+    if session is None:
+        session = ReplicaSession()
+        _session.set(session)
+    session.last_write = time.time()
+    session.wrote = True
+
+
+def read_only(func: Callable) -> Callable:
+    """
+    Mark a service function as read-only so its queries may run on a replica
+
+    Works for sync and async functions. Writes inside it fail on a replica
+    ("cannot execute ... in a read-only transaction").
+
+    Example:
+        @read_only
+        def get_activity_statistics(filters):
+            with db as cursor:
+                ...
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _read_only.set(True)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _read_only.reset(token)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+
+def in_read_only() -> bool:
+    """Whether the caller runs inside a @read_only function"""
+    return _read_only.get()
+
+
+class Replica:
+    """One replica: its pool plus lag and availability state"""
+
+    def __init__(self, name: str, pool: ConnectionPool):
+        self.name = name
+        self.pool = pool
+        self.lag: Optional[float] = None  # seconds, None until measured
+        self.lag_checked_at = 0.0
+        self.down_until = 0.0
+        self.reads = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def mark_down(self, retry_after: float, error: Exception):
+        self.down_until = time.monotonic() + retry_after
+        self.lag = None
+        logger.warning(
+            f"Replica {self.name} unavailable ({error}). Reading from the primary for {retry_after:g}s.",
+            module="Postgres"
+        )
+
+    def check_lag(self, conn: PooledConnection):
+        """Measure replay lag on a checked-out connection (ends its transaction)"""
+        cursor = conn.raw.cursor()
+        try:
+            cursor.execute(_LAG_QUERY)
+            self.lag = float(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+            conn.raw.rollback()
+        self.lag_checked_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lag_ms": None if self.lag is None else round(self.lag * 1000),
+            "available": self.available(time.monotonic()),
+            "reads": self.reads,
+            "pool": self.pool.stats(),
+        }
+
+
+class ReplicaSet:
+    """Replica pools and the routing decision for read-only checkouts"""
+
+    def __init__(self, dsns: List[str], max_lag: float = 1.0, sticky_window: float = 5.0,
+                 lag_check_interval: float = 1.0, retry_after: float = 5.0):
+        self.dsns = dsns
+        self.max_lag = max_lag
+        self.sticky_window = sticky_window
+        self.lag_check_interval = lag_check_interval
+        self.retry_after = retry_after
+        self._replicas: Optional[List[Replica]] = None
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+        # Reads sent to the primary, by reason (approximate under concurrency)
+        self.sticky_reads = 0
+        self.lagging_reads = 0
+        self.unavailable_reads = 0
+
+    @classmethod
+    def from_env(cls) -> 'ReplicaSet':
+        dsns = [dsn.strip() for dsn in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if dsn.strip()]
+        return cls(
+            dsns,
+            max_lag=_env_int("DB_REPLICA_MAX_LAG_MS", 1000) / 1000,
+            sticky_window=_env_int("DB_REPLICA_STICKY_MS", 5000) / 1000,
+            lag_check_interval=_env_int("DB_REPLICA_LAG_CHECK_MS", 1000) / 1000,
+            retry_after=_env_int("DB_REPLICA_RETRY_MS", 5000) / 1000,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.dsns)
+
+    def replicas(self) -> List[Replica]:
+        """Replica pools (created on first use)"""
+        if self._replicas is None:
+            with self._lock:
+                if self._replicas is None:
+                    # No connect retries: an unreachable replica falls back to the primary at once
+                    self._replicas = [
+                        Replica(f"replica{index}", ConnectionPool.from_env({"dsn": dsn}, connect_retries=0))
+                        for index, dsn in enumerate(self.dsns, start=1)
+                    ]
+        return self._replicas
+
+    def sticky(self) -> bool:
+        """Whether the current session wrote recently enough that it must read from the primary"""
+        session = _session.get()
+        return session is not None and time.time() - session.last_write < self.sticky_window
+
+    def _candidates(self) -> List[Replica]:
+        """Available replicas, rotated for round-robin"""
+        replicas = self.replicas()
+        start = next(self._next) % len(replicas)
+        now = time.monotonic()
+        return [replica for replica in replicas[start:] + replicas[:start] if replica.available(now)]
+
+    def _route(self) -> bool:
+        if not self.enabled:
+            return False
+        if self.sticky():
+            self.sticky_reads += 1
+            return False
+        return True
+
+    def _accept(self, replica: Replica) -> bool:
+        if replica.lag is not None and replica.lag <= self.max_lag:
+            replica.reads += 1
+            return True
+        return False
+
+    def acquire(self) -> Optional[Tuple[ConnectionPool, PooledConnection]]:
+        """Check out a connection from a usable replica; None means read from the primary"""
+        if not self._route():
+            return None
+        lagging = False
+        for replica in self._candidates():
+            try:
+                conn = replica.pool.acquire()
+            except (psycopg2.Error, ConnectionError) as e:
+                replica.mark_down(self.retry_after, e)
+                continue
+            if time.monotonic() - replica.lag_checked_at >= self.lag_check_interval:
+                try:
+                    replica.check_lag(conn)
+                except psycopg2.Error as e:
+                    replica.pool.release(conn, discard=True)
+                    replica.mark_down(self.retry_after, e)
+                    continue
+            if self._accept(replica):
+                return replica.pool, conn
+            replica.pool.release(conn)
+            lagging = True
+        self._count_fallback(lagging)
+        return None
+
+    async def acquire_async(self) -> Optional[Tuple[ConnectionPool, PooledConnection]]:
+        """Async variant of acquire that never blocks the event loop"""
+        if not self._route():
+            return None
+        lagging = False
+        for replica in self._candidates():
+            try:
+                conn = await replica.pool.acquire_async()
+            except (psycopg2.Error, ConnectionError) as e:
+                replica.mark_down(self.retry_after, e)
+                continue
+            if time.monotonic() - replica.lag_checked_at >= self.lag_check_interval:
+                try:
+                    await replica.pool.run(replica.check_lag, conn)
+                except psycopg2.Error as e:
+                    await replica.pool.run(replica.pool.release, conn, True)
+                    replica.mark_down(self.retry_after, e)
+                    continue
+            if self._accept(replica):
+                return replica.pool, conn
+            replica.pool.release(conn)
+            lagging = True
+        self._count_fallback(lagging)
+        return None
+
+    def _count_fallback(self, lagging: bool):
+        if lagging:
+            self.lagging_reads += 1
+        else:
+            self.unavailable_reads += 1
+
+    def warm_up(self):
+        """Open min_size connections on every reachable replica"""
+        for replica in self.replicas():
+            try:
+                replica.pool.warm_up()
+            except (psycopg2.Error, ConnectionError) as e:
+                replica.mark_down(self.retry_after, e)
+
+    def start_maintenance(self):
+        for replica in self.replicas():
+            replica.pool.start_maintenance()
+
+    def stats(self) -> Dict[str, Any]:
+        """Routing counters and per-replica lag / pool stats"""
+        return {
+            "enabled": self.enabled,
+            "max_lag_ms": round(self.max_lag * 1000),
+            "sticky_ms": round(self.sticky_window * 1000),
+            "primary_reads": {
+                "sticky": self.sticky_reads,
+                "lagging": self.lagging_reads,
+                "unavailable": self.unavailable_reads,
+            },
+            "replicas": {replica.name: replica.stats() for replica in self.replicas()} if self.enabled else {},
+        }
+
+    def close(self):
+        """Close the replica pools (they are recreated on next use)"""
+        with self._lock:
+            replicas, self._replicas = self._replicas, None
+        for replica in replicas or []:
+            try:
+                replica.pool.close()
+            except Exception:
+                pass
+
+
+replicas = ReplicaSet.from_env()
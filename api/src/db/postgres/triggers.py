@@ -489,8 +489,8 @@ class TriggerManager:
                 create_sql = f"""
                 CREATE TRIGGER {trigger_name}
                 {event.value} ON {quoted_table_name}
-                WHEN ({condition})
                 FOR EACH ROW
+                WHEN ({condition})
                 EXECUTE FUNCTION {function_name}();
                 """
             else:
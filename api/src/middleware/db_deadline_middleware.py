@@ -0,0 +1,110 @@
+import asyncio
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.db.postgres.deadline import DbBudget, begin_budget, end_budget
+from src.logger.logger import logger
+from src.response.error import ERROR
+
+# Error response (key, status) per budget failure
+BUDGET_ERRORS = {
+    "timeout": ("DATABASE_TIMEOUT", 504),
+    "lock_timeout": ("DATABASE_BUSY", 503),
+    "cancelled": ("DATABASE_QUERY_CANCELLED", 503),
+}
+
+# How often the deadline is re-checked (routes may change it with @db_budget)
+_WATCH_INTERVAL = 1.0
+
+
+class DatabaseDeadlineMiddleware:
+    """
+    Database time budget per request (see src/db/postgres/deadline.py)
+
+    Starts the request's budget, cancels its running queries when the client disconnects or
+    the request deadline passes, and answers requests whose queries were stopped by the
+    budget with a structured 504 (timeout) or 503 (lock timeout, cancelled) instead of a
+    generic 500. Plain ASGI middleware: it must own the receive channel to see disconnects
+    while the endpoint runs.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = DbBudget()
+        messages: asyncio.Queue = asyncio.Queue()
+        started = False
+        replaced = False
+
+        async def cancel(reason: str):
+            await asyncio.get_running_loop().run_in_executor(None, budget.cancel, reason)
+
+        async def pump():
+            # Sole reader of the server's channel; the endpoint reads from the queue
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if budget.active:
+                        await cancel("disconnect")
+                    return
+
+        async def watch_deadline():
+            while budget.active:
+                remaining = budget.remaining_ms()
+                if remaining is not None and remaining <= 0:
+                    await cancel("deadline")
+                    return
+                await asyncio.sleep(_WATCH_INTERVAL if remaining is None else min(remaining / 1000, _WATCH_INTERVAL))
+
+        async def receive_message() -> Message:
+            return await messages.get()
+
+        async def send_error():
+            key, status_code = BUDGET_ERRORS[budget.failure]
+            route = getattr(scope.get("route"), "path", None) or scope.get("path")
+            logger.warning(
+                f"{scope.get('method')} {route} stopped by its database budget ({budget.failure}) after {budget.elapsed_ms()} ms",
+                module="Postgres", label="DB_DEADLINE"
+            )
+            response = ERROR.response(
+                key,
+                status_code=status_code,
+                details={"reason": budget.cancelled or budget.failure, **(budget.failure_limits or budget.limits())},
+                show_trace=False
+            )
+            if budget.failure == "lock_timeout":
+                response.headers["Retry-After"] = "1"
+            await response(scope, receive_message, send)
+
+        async def send_message(message: Message):
+            nonlocal started, replaced
+            if replaced:
+                return  # the endpoint's own error response is dropped
+            if message["type"] == "http.response.start":
+                started = True
+                if message["status"] >= 500 and budget.failure is not None:
+                    replaced = True
+                    await send_error()
+                    return
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Response sent: background tasks run without the request's budget
+                budget.active = False
+
+        token = begin_budget(budget)
+        watchers = [asyncio.create_task(pump()), asyncio.create_task(watch_deadline())]
+        try:
+            await self.app(scope, receive_message, send_message)
+        except Exception:
+            if started or budget.failure is None:
+                raise
+            await send_error()
+        finally:
+            budget.active = False
+            for watcher in watchers:
+                watcher.cancel()
+            end_budget(token)
@@ -7,9 +7,10 @@ from typing import Union, List
 from fastapi import Depends, HTTPException, status
 from src.authenticate.authenticate import validate_request
 from src.authenticate.models import User
+from src.db.postgres.postgres import RequestConnection, get_request_connection
 from src.permissions.permissions import (
-    get_user_groups,
-    user_has_permission
+    get_user_groups_async,
+    user_has_permission_async
 )
 from src.response.error import ERROR
 from src.logger.logger import logger
@@ -28,6 +29,11 @@ def check_permission(
 
     Both checks must pass for the request to proceed.
 
+    The checks run on the request connection (get_request_connection), and the handler's
+    database work joins the same connection and transaction. Handlers that write declare
+    `conn: RequestConnection = Depends(get_request_connection)` and `await conn.commit()`
+    before returning; uncommitted work is rolled back.
+
     Args:
         required_permissions: Single permission codename or list of permission codenames
         require_all: If True, user must have ALL permissions. If False, user needs ANY permission
@@ -46,7 +52,8 @@ def check_permission(
             # current_user is guaranteed to be authenticated AND have BOTH permissions
             ...
     """
-    def permission_checker(current_user: User = Depends(validate_request)):
+    async def permission_checker(current_user: User = Depends(validate_request),
+                                 conn: RequestConnection = Depends(get_request_connection)):
         """
         Permission checker that validates:
         1. User authentication (via validate_request) - CHECKED FIRST
@@ -101,7 +108,7 @@ def check_permission(
 
             # 2.1: Check superuser bypass first (super_admin group bypasses all permission checks)
             try:
-                user_groups = get_user_groups(user_id)
+                user_groups = await get_user_groups_async(user_id)
                 is_superuser = any(g.get('codename') == 'super_admin' for g in user_groups)
                 if is_superuser:
                     return current_user
@@ -116,7 +123,7 @@ def check_permission(
             if require_all:
                 # User must have ALL permissions
                 for permission in permissions:
-                    has_perm = user_has_permission(user_id, permission)
+                    has_perm = await user_has_permission_async(user_id, permission)
                     if not has_perm:
                         logger.warning(f"Permission check FAILED: User {user_id} missing permission '{permission}'", module="Permissions", label="PERMISSION_CHECK")
                         raise HTTPException(
@@ -137,7 +144,7 @@ def check_permission(
                 has_any_permission = False
                 found_permission = None
                 for permission in permissions:
-                    if user_has_permission(user_id, permission):
+                    if await user_has_permission_async(user_id, permission):
                         has_any_permission = True
                         found_permission = permission
                         break
@@ -182,6 +189,11 @@ def check_group(required_groups: Union[str, List[str]]):
 
     Both checks must pass for the request to proceed.
 
+    The checks run on the request connection (get_request_connection), and the handler's
+    database work joins the same connection and transaction. Handlers that write declare
+    `conn: RequestConnection = Depends(get_request_connection)` and `await conn.commit()`
+    before returning; uncommitted work is rolled back.
+
     Args:
         required_groups: Single group codename or list of group codenames
 
@@ -199,7 +211,8 @@ def check_group(required_groups: Union[str, List[str]]):
             # current_user is guaranteed to be authenticated AND have one of the groups
             ...
     """
-    def group_checker(current_user: User = Depends(validate_request)):
+    async def group_checker(current_user: User = Depends(validate_request),
+                            conn: RequestConnection = Depends(get_request_connection)):
         """
         Group checker that validates:
         1. User authentication (via validate_request) - CHECKED FIRST
@@ -252,18 +265,13 @@ def check_group(required_groups: Union[str, List[str]]):
             # ============================================================
             # Now that authentication is confirmed, check groups
 
-            # 2.1: Check superuser bypass first (super_admin group bypasses all group checks)
-            try:
-                user_groups = get_user_groups(user_id)
-                is_superuser = any(g.get('codename') == 'super_admin' for g in user_groups)
-                if is_superuser:
-                    return current_user
-            except Exception as error:
-                logger.warning(f"Error checking superuser status: {error}", module="Permissions", label="GROUP_CHECK")
-                # Continue with normal group check if superuser check fails
+            # 2.1: Get user groups
+            user_groups = await get_user_groups_async(user_id)
+
+            # 2.2: Check superuser bypass first (super_admin group bypasses all group checks)
+            if any(g.get('codename') == 'super_admin' for g in user_groups):
+                return current_user
 
-            # 2.2: Get user groups
-            user_groups = get_user_groups(user_id)
             user_group_codenames = [g.get('codename') for g in user_groups]
 
             # 2.3: Normalize groups to list
@@ -0,0 +1,20 @@
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from src.db.postgres.query_stats import query_stats
+
+
+class QueryContextMiddleware(BaseHTTPMiddleware):
+    """
+    Binds each request to the database queries it issues
+
+    Query statistics and the slow-query log report the route (e.g. "GET /activity/logs")
+    that ran a statement, and statements repeated within one request are reported by the
+    N+1 detector when the request ends.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        token = query_stats.begin_request(request.scope)
+        try:
+            return await call_next(request)
+        finally:
+            query_stats.finish_request(token)
@@ -0,0 +1,43 @@
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from src.db.postgres.replica import replicas, begin_session, end_session, current_session
+import math
+
+# Cookie holding the time (epoch ms) of the client's last committed write
+REPLICA_COOKIE = "db_last_write"
+
+
+class ReplicaSessionMiddleware(BaseHTTPMiddleware):
+    """
+    Read-your-writes across requests for read replica routing
+
+    A request that commits a write sets a short-lived cookie; while it is fresh the
+    client's reads go to the primary, whichever worker serves them.
+    Does nothing unless replicas are configured (DATABASE_REPLICA_URLS).
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        if not replicas.enabled:
+            return await call_next(request)
+
+        try:
+            last_write = int(request.cookies.get(REPLICA_COOKIE, 0)) / 1000
+        except ValueError:
+            last_write = 0.0
+
+        token = begin_session(last_write)
+        try:
+            response = await call_next(request)
+            session = current_session()
+        finally:
+            end_session(token)
+
+        if session is not None and session.wrote:
+            response.set_cookie(
+                REPLICA_COOKIE,
+                str(int(session.last_write * 1000)),
+                max_age=max(1, math.ceil(replicas.sticky_window)),
+                httponly=True,
+                samesite="lax"
+            )
+        return response
@@ -3,9 +3,84 @@ Permission Management Service
 Handles group and permission operations
 """
 
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
+from src.cache.local_cache import LocalCache
 from src.db.postgres.postgres import connection as db
+from src.db.postgres.change_feed import ChangeEvent, change_feed
+from src.db.postgres.binding import array_literal, uuid_param, uuid_params
+from src.db.postgres.prepared import prepared_statements
 from src.logger.logger import logger
+import os
+import uuid
+
+# Hot authorization queries, executed on every protected request
+USER_GROUPS_STATEMENT = prepared_statements.register("permissions_user_groups", """
+    SELECT g.group_id, g.name, g.codename, g.description, g.is_system, g.is_active
+    FROM "group" g
+    INNER JOIN user_group ug ON g.group_id = ug.group_id
+    WHERE ug.user_id = %s AND g.is_active = TRUE
+""", ["uuid"])
+
+USER_HAS_PERMISSION_STATEMENT = prepared_statements.register("permissions_user_has_permission", """
+    SELECT COUNT(*) as count
+    FROM user_group ug
+    INNER JOIN "group" g ON ug.group_id = g.group_id
+    INNER JOIN group_permission gp ON g.group_id = gp.group_id
+    INNER JOIN permission p ON gp.permission_id = p.permission_id
+    WHERE ug.user_id = %s
+      AND g.is_active = TRUE
+      AND p.codename = %s
+""", ["uuid", "text"])
+
+# Per-worker cache of the two lookups above, used by the async variants (the permission checks).
+# The change feed evicts entries when groups, permissions or assignments change, so they can be
+# kept long; while the feed is not live nothing is cached.
+PERMISSION_CACHE_TTL = int(os.environ.get('PERMISSION_CACHE_TTL_SECONDS', '300'))
+_permission_cache = LocalCache(
+    int(os.environ.get('PERMISSION_CACHE_MAX_ENTRIES', '10000')),
+    int(os.environ.get('PERMISSION_CACHE_MAX_BYTES', str(8 * 1024 * 1024))),
+)
+# Bumped by every change batch: a lookup that awaited the database across one is not cached
+_permission_changes = 0
+
+
+def _permission_cache_key(kind: str, user_id: str, *rest: str) -> str:
+    return ":".join((kind, str(user_id).lower(), *rest))
+
+
+def _evict_permissions(events: List[ChangeEvent]):
+    """Change feed subscriber: forget the users whose groups changed, or everyone"""
+    global _permission_changes
+    _permission_changes += 1
+    users = set()
+    for event in events:
+        if event.reset or event.table != "user_group":
+            _permission_cache.clear()
+            return
+        users.add(event.get("user_id"))
+    _permission_cache.delete_matching(lambda key: key.split(":", 2)[1] in users)
+
+
+change_feed.subscribe(["group", "permission", "group_permission", "user_group"], _evict_permissions)
+
+
+def _cached_permission(key: str):
+    """(found, value) of a cached lookup"""
+    if not change_feed.live:
+        return False, None
+    return _permission_cache.lookup(key)
+
+
+def _cache_permission(key: str, value: Any, changes: int):
+    """Cache a lookup made while _permission_changes was changes"""
+    if change_feed.live and changes == _permission_changes:
+        _permission_cache.set(key, value, PERMISSION_CACHE_TTL)
+
+
+def permission_cache_stats() -> Dict[str, Any]:
+    """Occupancy and counters of this worker's permission cache"""
+    return {"ttl": PERMISSION_CACHE_TTL, **_permission_cache.stats()}
 
 def get_all_permissions() -> List[Dict[str, Any]]:
     """Get all permissions"""
@@ -42,9 +117,9 @@ def get_permission_by_id(permission_id: str) -> Optional[Dict[str, Any]]:
             query = """
                 SELECT permission_id, name, codename, description, category, created_at, last_updated
                 FROM permission
-                WHERE permission_id::text = %s
+                WHERE permission_id = %s
             """
-            cursor.execute(query, (permission_id,))
+            cursor.execute(query, (uuid_param(permission_id),))
             row = cursor.fetchone()
 
             if not row:
@@ -118,13 +193,13 @@ def update_permission(permission_id: str, permission_data: Dict[str, Any]) -> Op
             return get_permission_by_id(permission_id)
 
         set_clauses.append("last_updated = NOW()")
-        values.append(permission_id)
+        values.append(uuid_param(permission_id))
 
         with db as cursor:
             query = f"""
                 UPDATE permission
                 SET {', '.join(set_clauses)}
-                WHERE permission_id::text = %s
+                WHERE permission_id = %s
                 RETURNING permission_id, name, codename, description, category, created_at, last_updated
             """
             cursor.execute(query, values)
@@ -150,8 +225,8 @@ def delete_permission(permission_id: str) -> bool:
     """Delete permission"""
     try:
         with db as cursor:
-            query = "DELETE FROM permission WHERE permission_id::text = %s"
-            cursor.execute(query, (permission_id,))
+            query = "DELETE FROM permission WHERE permission_id = %s"
+            cursor.execute(query, (uuid_param(permission_id),))
             return cursor.rowcount > 0
     except Exception as e:
         logger.error(f"Error deleting permission: {e}", exc_info=True, module="Permissions", label="DELETE_PERMISSION")
@@ -170,18 +245,22 @@ def get_all_groups() -> List[Dict[str, Any]]:
             cursor.execute(query)
             groups = cursor.fetchall()
 
+            # Permissions of every listed group in one query (not one per group)
+            permissions_by_group: Dict[str, List[Any]] = {str(group[0]): [] for group in groups}
+            if groups:
+                cursor.execute("""
+                    SELECT gp.group_id, p.permission_id, p.name, p.codename, p.description, p.category
+                    FROM permission p
+                    INNER JOIN group_permission gp ON p.permission_id = gp.permission_id
+                    WHERE gp.group_id = ANY(%s)
+                """, (uuid_params(permissions_by_group),))
+                for row in cursor.fetchall():
+                    permissions_by_group[str(row[0])].append(row[1:])
+
             result = []
             for group in groups:
                 group_id = str(group[0])
-                # Get permissions for this group
-                perm_query = """
-                    SELECT p.permission_id, p.name, p.codename, p.description, p.category
-                    FROM permission p
-                    INNER JOIN group_permission gp ON p.permission_id = gp.permission_id
-                    WHERE gp.group_id::text = %s
-                """
-                cursor.execute(perm_query, (group_id,))
-                permissions = cursor.fetchall()
+                permissions = permissions_by_group[group_id]
 
                 result.append({
                     "group_id": group_id,
@@ -216,9 +295,9 @@ def get_group_by_id(group_id: str) -> Optional[Dict[str, Any]]:
             query = """
                 SELECT group_id, name, codename, description, is_system, is_active, created_at, last_updated
                 FROM "group"
-                WHERE group_id::text = %s
+                WHERE group_id = %s
             """
-            cursor.execute(query, (group_id,))
+            cursor.execute(query, (uuid_param(group_id),))
             group = cursor.fetchone()
 
             if not group:
@@ -229,9 +308,9 @@ def get_group_by_id(group_id: str) -> Optional[Dict[str, Any]]:
                 SELECT p.permission_id, p.name, p.codename, p.description, p.category
                 FROM permission p
                 INNER JOIN group_permission gp ON p.permission_id = gp.permission_id
-                WHERE gp.group_id::text = %s
+                WHERE gp.group_id = %s
             """
-            cursor.execute(perm_query, (group_id,))
+            cursor.execute(perm_query, (uuid_param(group_id),))
             permissions = cursor.fetchall()
 
             return {
@@ -316,13 +395,13 @@ def update_group(group_id: str, group_data: Dict[str, Any]) -> Optional[Dict[str
             return get_group_by_id(group_id)
 
         set_clauses.append("last_updated = NOW()")
-        values.append(group_id)
+        values.append(uuid_param(group_id))
 
         with db as cursor:
             query = f"""
                 UPDATE "group"
                 SET {', '.join(set_clauses)}
-                WHERE group_id::text = %s
+                WHERE group_id = %s
                 RETURNING group_id, name, codename, description, is_system, is_active, created_at, last_updated
             """
             cursor.execute(query, values)
@@ -341,8 +420,8 @@ def delete_group(group_id: str) -> bool:
     try:
         with db as cursor:
             # Check if system group
-            check_query = "SELECT is_system FROM \"group\" WHERE group_id::text = %s"
-            cursor.execute(check_query, (group_id,))
+            check_query = "SELECT is_system FROM \"group\" WHERE group_id = %s"
+            cursor.execute(check_query, (uuid_param(group_id),))
             row = cursor.fetchone()
 
             if not row:
@@ -351,8 +430,8 @@ def delete_group(group_id: str) -> bool:
             if row[0]:  # is_system
                 return False
 
-            query = "DELETE FROM \"group\" WHERE group_id::text = %s"
-            cursor.execute(query, (group_id,))
+            query = "DELETE FROM \"group\" WHERE group_id = %s"
+            cursor.execute(query, (uuid_param(group_id),))
             return cursor.rowcount > 0
     except Exception as e:
         logger.error(f"Error deleting group: {e}", exc_info=True, module="Permissions", label="DELETE_GROUP")
@@ -361,51 +440,69 @@ def delete_group(group_id: str) -> bool:
 def assign_permissions_to_group(group_id: str, permission_ids: List[str]) -> None:
     """Assign permissions to group (replaces existing permissions)"""
     try:
-        with db as cursor:
-            # Delete existing permissions
-            delete_query = "DELETE FROM group_permission WHERE group_id::text = %s"
-            cursor.execute(delete_query, (group_id,))
+        permission_ids = list(dict.fromkeys(permission_ids or []))
+        with db:
+            # Remove permissions that are no longer assigned (kept ones are left untouched)
+            stale = db.table("group_permission").delete().eq("group_id", group_id)
+            if permission_ids:
+                stale = stale.not_in("permission_id", permission_ids)
+            stale.execute()
 
-            # Insert new permissions
+            # Add the missing ones in a single statement
             if permission_ids:
-                insert_query = """
-                    INSERT INTO group_permission (group_id, permission_id)
-                    VALUES (%s, %s)
-                """
-                for perm_id in permission_ids:
-                    cursor.execute(insert_query, (group_id, perm_id))
+                db.table("group_permission").upsert(
+                    [
+                        {"id": str(uuid.uuid4()), "group_id": group_id, "permission_id": perm_id}
+                        for perm_id in permission_ids
+                    ],
+                    ["group_id", "permission_id"],
+                    update_columns=[]
+                ).execute()
     except Exception as e:
         logger.error(f"Error assigning permissions to group: {e}", exc_info=True, module="Permissions", label="ASSIGN_PERMISSIONS")
         raise
 
+def _user_group(row) -> Dict[str, Any]:
+    return {
+        "group_id": str(row[0]),
+        "name": row[1],
+        "codename": row[2],
+        "description": row[3],
+        "is_system": row[4],
+        "is_active": row[5]
+    }
+
 def get_user_groups(user_id: str) -> List[Dict[str, Any]]:
     """Get all groups assigned to a user"""
     try:
         with db as cursor:
-            query = """
-                SELECT g.group_id, g.name, g.codename, g.description, g.is_system, g.is_active
-                FROM "group" g
-                INNER JOIN user_group ug ON g.group_id = ug.group_id
-                WHERE ug.user_id::text = %s AND g.is_active = TRUE
-            """
-            cursor.execute(query, (user_id,))
-            rows = cursor.fetchall()
-
-            return [
-                {
-                    "group_id": str(row[0]),
-                    "name": row[1],
-                    "codename": row[2],
-                    "description": row[3],
-                    "is_system": row[4],
-                    "is_active": row[5]
-                }
-                for row in rows
-            ]
+            cursor.execute_prepared(USER_GROUPS_STATEMENT, (uuid_param(user_id),))
+            return [_user_group(row) for row in cursor.fetchall()]
     except Exception as e:
         logger.error(f"Error getting user groups: {e}", exc_info=True, module="Permissions", label="GET_USER_GROUPS")
         raise
 
+async def get_user_groups_async(user_id: str) -> List[Dict[str, Any]]:
+    """
+    Async variant of get_user_groups for request handlers (never blocks the event loop)
+
+    Served from the permission cache while the change feed is live.
+    """
+    key = _permission_cache_key("groups", user_id)
+    found, groups = _cached_permission(key)
+    if not found:
+        changes = _permission_changes
+        try:
+            async with db as cursor:
+                await cursor.execute_prepared(USER_GROUPS_STATEMENT, (uuid_param(user_id),))
+                groups = [_user_group(row) for row in await cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting user groups: {e}", exc_info=True, module="Permissions", label="GET_USER_GROUPS")
+            raise
+        _cache_permission(key, groups, changes)
+    # Copies: callers may change what they get
+    return [dict(group) for group in groups]
+
 def get_user_permissions(user_id: str) -> List[Dict[str, Any]]:
     """Get all permissions for a user (from all groups)"""
     try:
@@ -415,9 +512,9 @@ def get_user_permissions(user_id: str) -> List[Dict[str, Any]]:
                 FROM permission p
                 INNER JOIN group_permission gp ON p.permission_id = gp.permission_id
                 INNER JOIN user_group ug ON gp.group_id = ug.group_id
-                WHERE ug.user_id::text = %s
+                WHERE ug.user_id = %s
             """
-            cursor.execute(query, (user_id,))
+            cursor.execute(query, (uuid_param(user_id),))
             rows = cursor.fetchall()
 
             return [
@@ -457,12 +554,11 @@ def assign_groups_to_user(user_id: str, group_codenames: List[str], assigned_by_
                 raise ValueError("group_codenames cannot be empty")
 
             # Get group IDs from codenames
-            placeholders = ','.join(['%s'] * len(group_codenames))
-            group_query = f"""
+            group_query = """
                 SELECT group_id, codename FROM "group"
-                WHERE codename IN ({placeholders}) AND is_active = TRUE
+                WHERE codename = ANY(%s) AND is_active = TRUE
             """
-            cursor.execute(group_query, tuple(group_codenames))
+            cursor.execute(group_query, (array_literal(group_codenames),))
             group_rows = cursor.fetchall()
             found_group_ids = {row[0]: row[1] for row in group_rows}  # {group_id: codename}
 
@@ -472,18 +568,28 @@ def assign_groups_to_user(user_id: str, group_codenames: List[str], assigned_by_
                 missing = set(group_codenames) - found_codenames
                 raise ValueError(f"Groups not found or inactive: {', '.join(missing)}")
 
-            # Delete existing groups for this user
-            delete_query = "DELETE FROM user_group WHERE user_id::text = %s"
-            cursor.execute(delete_query, (user_id,))
-
-            # Insert new groups with proper UUID generation
-            if found_group_ids:
-                insert_query = """
-                    INSERT INTO user_group (id, user_id, group_id, assigned_by_user_id, assigned_at)
-                    VALUES (gen_random_uuid(), %s, %s, %s, NOW())
-                """
-                for group_id, codename in found_group_ids.items():
-                    cursor.execute(insert_query, (user_id, group_id, assigned_by_user_id))
+            group_ids = [str(group_id) for group_id in found_group_ids]
+
+            # Remove groups that are no longer assigned
+            db.table("user_group").delete().eq("user_id", user_id).not_in("group_id", group_ids).execute()
+
+            # Assign the new set in a single statement; groups the user already had get
+            # the new assigner and timestamp, as if re-inserted
+            assigned_at = datetime.now(timezone.utc)
+            db.table("user_group").upsert(
+                [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "user_id": user_id,
+                        "group_id": group_id,
+                        "assigned_by_user_id": assigned_by_user_id,
+                        "assigned_at": assigned_at
+                    }
+                    for group_id in group_ids
+                ],
+                ["user_id", "group_id"],
+                update_columns=["assigned_by_user_id", "assigned_at"]
+            ).execute()
     except Exception as e:
         logger.error(f"Error assigning groups to user {user_id}: {e}", exc_info=True, module="Permissions", label="ASSIGN_GROUPS_TO_USER")
         raise
@@ -501,17 +607,7 @@ def user_has_permission(user_id: str, permission_codename: str) -> bool:
     """
     try:
         with db as cursor:
-            query = """
-                SELECT COUNT(*) as count
-                FROM user_group ug
-                INNER JOIN "group" g ON ug.group_id = g.group_id
-                INNER JOIN group_permission gp ON g.group_id = gp.group_id
-                INNER JOIN permission p ON gp.permission_id = p.permission_id
-                WHERE ug.user_id::text = %s
-                  AND g.is_active = TRUE
-                  AND p.codename = %s
-            """
-            cursor.execute(query, (user_id, permission_codename))
+            cursor.execute_prepared(USER_HAS_PERMISSION_STATEMENT, (uuid_param(user_id), permission_codename))
             result = cursor.fetchone()
 
             return result[0] > 0 if result else False
@@ -519,3 +615,25 @@ def user_has_permission(user_id: str, permission_codename: str) -> bool:
         logger.error(f"Error checking user permission: {e}", exc_info=True, module="Permissions", label="USER_HAS_PERMISSION")
         return False
 
+async def user_has_permission_async(user_id: str, permission_codename: str) -> bool:
+    """
+    Async variant of user_has_permission for request handlers (never blocks the event loop)
+
+    Served from the permission cache while the change feed is live.
+    """
+    key = _permission_cache_key("permission", user_id, permission_codename)
+    found, allowed = _cached_permission(key)
+    if found:
+        return allowed
+    changes = _permission_changes
+    try:
+        async with db as cursor:
+            await cursor.execute_prepared(USER_HAS_PERMISSION_STATEMENT, (uuid_param(user_id), permission_codename))
+            result = await cursor.fetchone()
+
+            allowed = result[0] > 0 if result else False
+    except Exception as e:
+        logger.error(f"Error checking user permission: {e}", exc_info=True, module="Permissions", label="USER_HAS_PERMISSION")
+        return False
+    _cache_permission(key, allowed, changes)
+    return allowed
@@ -90,6 +90,9 @@ ERRORS = {
         "INTEGRITY_ERROR": {"code": 1501, "message": "Data integrity error (constraint violation)", "http_status": 400},
         "TRANSACTION_ERROR": {"code": 1502, "message": "Transaction rollback due to internal error", "http_status": 500},
         "UNEXPECTED_ERROR": {"code": 1503, "message": "An unexpected database error occurred", "http_status": 500},
+        "DATABASE_TIMEOUT": {"code": 1506, "message": "Database query timed out", "reason": "The request exceeded its database time budget", "http_status": 504},
+        "DATABASE_BUSY": {"code": 1507, "message": "Database is busy, please retry", "reason": "Waiting for a database lock took too long", "http_status": 503},
+        "DATABASE_QUERY_CANCELLED": {"code": 1508, "message": "Database query cancelled", "reason": "The client disconnected before the query finished", "http_status": 503},
 
         # 🏥 Health Check Errors (1800-1899)
         "HEALTH_CHECK_FAILED": {"code": 1800, "message": "Health check failed", "reason": "Failed to perform health check."},
@@ -15,6 +15,7 @@ echo "  Timeout: $G_TIMEOUT"
 echo "  Worker Class: $G_WORKER_CLASS"
 
 exec gunicorn server:app \
+    --config gunicorn.conf.py \
     --workers "$G_WORKERS" \
     --worker-class "$G_WORKER_CLASS" \
     --bind "0.0.0.0:$API_PORT" \